@@ -1,17 +1,62 @@
 import sqlite3
 import json
-from web3 import Web3
+from hexbytes import HexBytes
 from certificate_generator import CertificateGenerator
 from email_service import EmailService
 import os
 from dotenv import load_dotenv
 import time
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-import threading
 
 load_dotenv()
+from logging_config import get_logger, debug_enabled
 from database import db_manager, convert_sql_for_postgres
+from rpc_pool import rpc_pool
+from chain_context import chain_context
+from receipt_waiter import receipt_waiter
+
+logger = get_logger(__name__)
+
+class ProcessingCancelled(Exception):
+    """Raised at a checkpoint once processing was cancelled (or its worker is shutting down)"""
+
+
+class ProcessingControl:
+    """Cancellation token and pause gate checked between pipeline stages.
+
+    Checkpoints sit before each step that costs something (render, pin, mint). Once a mint has been broadcast
+    the participant always runs to completion, so in-flight transactions are drained rather than abandoned.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self.reason = None
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+
+    @property
+    def paused(self):
+        return not self._resumed.is_set()
+
+    def pause(self):
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    def cancel(self, reason="cancelled"):
+        if not self.cancelled:
+            self.cancelled = True
+            self.reason = reason
+        # Wake anything held at the pause gate so it can observe the cancellation
+        self._resumed.set()
+
+    async def checkpoint(self):
+        """Wait while paused; raise ProcessingCancelled once cancelled"""
+        await self._resumed.wait()
+        if self.cancelled:
+            raise ProcessingCancelled(self.reason)
+
 
 class BulkCertificateProcessor:
     def __init__(self):
@@ -24,12 +69,8 @@ class BulkCertificateProcessor:
         self.cert_generator = CertificateGenerator()
         self.email_service = EmailService()
         
-        # Initialize Web3
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
-        
-        # Nonce management for parallel operations
-        self._nonce_lock = asyncio.Lock()
-        self._current_nonce = None
+        # Shared Web3/account/contract objects (built once per process)
+        self.w3 = chain_context.w3
         
         # Contract ABI (matches actual deployed contract)
         self.contract_abi = [
@@ -75,24 +116,13 @@ class BulkCertificateProcessor:
             }
         ]
         
-        self.contract = self.w3.eth.contract(
-            address=self.contract_address,
-            abi=self.contract_abi
-        )
+        self.contract = chain_context.contract(self.contract_abi) if chain_context.configured else None
 
     async def get_next_nonce(self):
         """Get the next available nonce for blockchain transactions"""
-        async with self._nonce_lock:
-            account = self.w3.eth.account.from_key(self.private_key)
-            
-            if self._current_nonce is None:
-                # Initialize with current network nonce
-                self._current_nonce = self.w3.eth.get_transaction_count(account.address)
-            
-            nonce = self._current_nonce
-            self._current_nonce += 1
-            print(f"Allocated nonce: {nonce}")
-            return nonce
+        nonce = await chain_context.next_nonce()
+        logger.debug("Allocated nonce: %s", nonce)
+        return nonce
 
     async def get_poa_holders_for_event(self, event_id, participant_ids=None):
         """Get participants who have PoA tokens for a specific event, optionally filtered by participant IDs"""
@@ -107,7 +137,7 @@ class BulkCertificateProcessor:
                 AND p.poa_token_id IS NOT NULL AND p.poa_token_id > 0
             """
             params = [event_id] + participant_ids
-            print(f"[DEBUG] CERTIFICATES - Querying selected participants: {participant_ids}")
+            logger.debug("CERTIFICATES - Querying selected participants: %s", participant_ids)
         else:
             # Get participants with minted/transferred PoA but no certificates generated yet
             query = """
@@ -120,13 +150,13 @@ class BulkCertificateProcessor:
                 AND (p.certificate_status IS NULL OR p.certificate_status NOT IN ('completed', 'transferred'))
             """
             params = [event_id]
-            print(f"[DEBUG] CERTIFICATES - Querying participants who need certificates for event {event_id}")
+            logger.debug("CERTIFICATES - Querying participants who need certificates for event %s", event_id)
         
         converted_query, converted_params = convert_sql_for_postgres(query, params)
         participants_result = await db_manager.execute_query(converted_query, converted_params, fetch=True)
 
         # Debug: If no participants found and specific IDs were requested, check their actual status
-        if not participants_result and participant_ids:
+        if not participants_result and participant_ids and debug_enabled(logger):
             debug_query = f"""
                 SELECT p.id, p.name, p.poa_status, p.poa_token_id
                 FROM participants p
@@ -135,7 +165,7 @@ class BulkCertificateProcessor:
             debug_params = [event_id] + participant_ids
             converted_debug_query, converted_debug_params = convert_sql_for_postgres(debug_query, debug_params)
             debug_result = await db_manager.execute_query(converted_debug_query, converted_debug_params, fetch=True)
-            print(f"[DEBUG] Participant status check: {debug_result}")
+            logger.debug("Participant status check: %s", debug_result)
         
         return [
             {
@@ -166,155 +196,97 @@ class BulkCertificateProcessor:
             }
         return None
 
-    async def mint_certificate_nft(self, wallet_address, event_id, ipfs_hash, retry_count=0, max_retries=3):
-        """Mint a certificate NFT with retry logic for rate limiting"""
+    async def mint_certificate_nft(self, wallet_address, event_id, ipfs_hash, retry_count=0, max_retries=3, on_submitted=None,
+                                   wait_for_receipt=True):
+        """Mint a certificate NFT with retry logic for rate limiting.
+
+        With wait_for_receipt=False it returns as soon as the transaction is broadcast (settle it later with
+        settle_certificate_mint), so a single sender can keep nonces in order without waiting on blocks.
+        """
+        tx_hash = None
+        nonce = None
         try:
-            # Get account from private key
-            account = self.w3.eth.account.from_key(self.private_key)
+            account = chain_context.account
             
-            print(f"Minting certificate for {wallet_address}, event {event_id}, IPFS: {ipfs_hash}")
-            print(f"Contract: {self.contract_address}")
-            print(f"From: {account.address}")
+            logger.debug("Minting certificate for %s, event %s, IPFS: %s", wallet_address, event_id, ipfs_hash)
+            logger.debug("Contract: %s", self.contract_address)
+            logger.debug("From: %s", account.address)
             
-            # Check account balance
-            balance = self.w3.eth.get_balance(account.address)
-            print(f"Account balance: {self.w3.from_wei(balance, 'ether')} ETH")
-            
-            # Get managed nonce for parallel operations
-            nonce = await self.get_next_nonce()
-            print(f"Using managed nonce: {nonce}")
+            # Check account balance (an extra RPC round trip, so only when debugging)
+            if debug_enabled(logger):
+                balance = await asyncio.to_thread(self.w3.eth.get_balance, account.address)
+                logger.debug("Account balance: %s ETH", self.w3.from_wei(balance, 'ether'))
             
             # Use mintCertificateByOwner function only (as requested by user)
-            print("Using mintCertificateByOwner function")
+            logger.debug("Using mintCertificateByOwner function")
             
             # Try to estimate gas first to catch potential revert
             try:
-                gas_estimate = self.contract.functions.mintCertificateByOwner(
-                    wallet_address,
-                    event_id,
-                    ipfs_hash
-                ).estimate_gas({'from': account.address})
-                print(f"Gas estimate: {gas_estimate}")
+                gas_estimate = await asyncio.to_thread(
+                    self.contract.functions.mintCertificateByOwner(wallet_address, event_id, ipfs_hash).estimate_gas,
+                    {'from': account.address}
+                )
+                logger.debug("Gas estimate: %s", gas_estimate)
             except Exception as gas_error:
-                print(f"Gas estimation failed for mintCertificateByOwner: {gas_error}")
-                print(f"Account address: {account.address}")
+                logger.warning("Gas estimation failed for mintCertificateByOwner: %s", gas_error)
+                logger.warning("Account address: %s", account.address)
                 
                 # Check contract owner
                 try:
-                    contract_owner = self.contract.functions.owner().call()
-                    print(f"Contract owner: {contract_owner}")
-                    print(f"Is account owner? {account.address.lower() == contract_owner.lower()}")
+                    contract_owner = await asyncio.to_thread(self.contract.functions.owner().call)
+                    logger.debug("Contract owner: %s", contract_owner)
+                    logger.debug("Is account owner? %s", account.address.lower() == contract_owner.lower())
                 except Exception as owner_error:
-                    print(f"Could not check contract owner: {owner_error}")
+                    logger.warning("Could not check contract owner: %s", owner_error)
                 
                 # Check if this is an owner permission issue
                 if "revert" in str(gas_error).lower() or "execution reverted" in str(gas_error).lower():
-                    print("This might be an owner permission issue or contract requirement not met")
+                    logger.warning("This might be an owner permission issue or contract requirement not met")
                 
                 return {
                     "success": False,
                     "error": f"mintCertificateByOwner failed: {str(gas_error)}"
                 }
             
+            gas_price = await asyncio.to_thread(lambda: self.w3.eth.gas_price)
+            
+            # Allocate the managed nonce only once the mint is known to go through; released below if unsent
+            nonce = await self.get_next_nonce()
+            logger.debug("Using managed nonce: %s", nonce)
+            
             transaction = self.contract.functions.mintCertificateByOwner(
                 wallet_address,
                 event_id,
                 ipfs_hash
             ).build_transaction({
-                'chainId': 1001,  # Kaia Testnet Kairos
+                'chainId': chain_context.chain_id,
                 'gas': int(gas_estimate * 1.1),  # Only 10% buffer instead of 2x
-                'gasPrice': int(self.w3.eth.gas_price * 1.1),  # Use network gas price + 10%
+                'gasPrice': int(gas_price * 1.1),  # Use network gas price + 10%
                 'nonce': nonce,
             })
             
             # Sign transaction
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, private_key=self.private_key)
+            signed_txn = chain_context.sign_transaction(transaction)
             
             # Send transaction
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+            tx_hash = await asyncio.to_thread(self.w3.eth.send_raw_transaction, signed_txn.rawTransaction)
+            if on_submitted:
+                # Let the caller record the hash before waiting, so a broadcast mint is never lost
+                await on_submitted(tx_hash.hex())
+            if not wait_for_receipt:
+                return {"success": True, "submitted": True, "tx_hash": tx_hash.hex()}
             
             # Wait for confirmation
-            tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
-            
-            # Extract token ID from transaction logs
-            token_id = None
-            
-            # First try to extract from Transfer event (ERC721 standard)
-            for log in tx_receipt.logs:
-                try:
-                    # Look for Transfer event (ERC721 standard)
-                    # Topic 0: Transfer event signature
-                    # Topic 1: from address (0x0 for minting)
-                    # Topic 2: to address (recipient)
-                    # Topic 3: token ID
-                    if (len(log.topics) >= 4 and 
-                        log.topics[0].hex() == '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'):
-                        token_id = int(log.topics[3].hex(), 16)
-                        print(f"Extracted token ID from Transfer event: {token_id}")
-                        break
-                except Exception as e:
-                    print(f"Failed to extract token ID from log: {e}")
-                    continue
-            
-            # If Transfer event extraction failed, try CertificateMinted event using proper ABI decoding
-            if token_id is None:
-                try:
-                    # Process logs to find CertificateMinted event
-                    certificate_logs = self.contract.events.CertificateMinted().process_receipt(tx_receipt)
-                    if certificate_logs:
-                        # Get the first CertificateMinted event
-                        cert_event = certificate_logs[0]
-                        token_id = cert_event['args']['tokenId']
-                        print(f"Extracted token ID from CertificateMinted event: {token_id}")
-                except Exception as e:
-                    print(f"Failed to decode CertificateMinted event: {e}")
-                    
-                    # Fallback: manual parsing of event data
-                    for log in tx_receipt.logs:
-                        try:
-                            if log.address.lower() == self.contract_address.lower():
-                                # CertificateMinted event signature: keccak256("CertificateMinted(address,uint256,uint256,string)")
-                                cert_minted_signature = '0x2a8d8eae6c0c9a7a0baeb37df4a4f3a5f18c9f0ab5b07f4e7a8b5a5e0d5a1b2c'
-                                if len(log.topics) > 0:
-                                    # Try to decode the data field for token ID (first 32 bytes after recipient)
-                                    if len(log.data) >= 64:  # At least 64 bytes for tokenId + eventId
-                                        potential_token_id = int(log.data[2:66], 16)  # Skip 0x, take first 32 bytes
-                                        if potential_token_id > 0 and potential_token_id < 10000000:  # Reasonable range
-                                            token_id = potential_token_id
-                                            print(f"Extracted token ID from manual parsing: {token_id}")
-                                            break
-                        except Exception as parse_error:
-                            print(f"Failed to manually parse event data: {parse_error}")
-                            continue
-            
-            # If transaction succeeded, consider it successful regardless of token ID extraction
-            if tx_receipt.status == 1:
-                print(f"Certificate NFT minted successfully! Hash: {tx_hash.hex()}")
-                
-                # Use extracted token ID or generate placeholder if extraction failed
-                final_token_id = token_id if token_id is not None else f"minted_{int(time.time())}"
-                note = "Certificate minted successfully"
-                if token_id is None:
-                    note += " - using placeholder token ID"
-                else:
-                    note += f" - token ID: {token_id}"
-                
-                return {
-                    "success": True,
-                    "tx_hash": tx_hash.hex(),
-                    "token_id": final_token_id,
-                    "gas_used": tx_receipt.gasUsed,
-                    "note": note
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"Transaction failed with status {tx_receipt.status}"
-                }
+            tx_receipt = await receipt_waiter.wait_async(tx_hash, timeout=120)
+            return self._mint_result_from_receipt(tx_hash, tx_receipt)
 
         except Exception as e:
             error_msg = str(e)
-            print(f"Error minting certificate: {error_msg}")
+            logger.warning("Error minting certificate: %s", error_msg)
+
+            if tx_hash is None and nonce is not None:
+                # Never broadcast: hand the nonce back so later mints do not queue behind a gap
+                await chain_context.release_nonce(nonce)
 
             # Check if this is a rate limiting or network issue
             is_retryable = any(keyword in error_msg.lower() for keyword in [
@@ -322,13 +294,24 @@ class BulkCertificateProcessor:
                 'network', 'rpc', 'execution reverted', 'gas'
             ])
 
+            # Never re-send once a transaction was broadcast: it may still be mined
+            if tx_hash is not None:
+                return {
+                    "success": False,
+                    "error": f"Certificate mint not confirmed: {error_msg}",
+                    "tx_hash": tx_hash.hex(),
+                    "retryable": False
+                }
+
             if is_retryable and retry_count < max_retries:
-                print(f"Retrying mint operation ({retry_count + 1}/{max_retries}) after rate limiting/network error")
-                # Exponential backoff: 2^retry_count * 5 seconds (5, 10, 20 seconds)
-                delay = (2 ** retry_count) * 5
-                print(f"Waiting {delay} seconds before retry...")
+                logger.warning("Retrying mint operation (%s/%s) after rate limiting/network error", retry_count + 1, max_retries)
+                # The pool already failed over between endpoints; only wait until one of them has budget again
+                delay = rpc_pool.retry_delay(retry_count)
+                logger.warning("Waiting %.1f seconds before retry...", delay)
                 await asyncio.sleep(delay)
-                return await self.mint_certificate_nft(wallet_address, event_id, ipfs_hash, retry_count + 1, max_retries)
+                return await self.mint_certificate_nft(
+                    wallet_address, event_id, ipfs_hash, retry_count + 1, max_retries, on_submitted, wait_for_receipt
+                )
 
             # Provide more detailed error message
             detailed_error = f"Certificate minting failed"
@@ -350,6 +333,92 @@ class BulkCertificateProcessor:
                 "retryable": is_retryable and retry_count < max_retries
             }
 
+    async def settle_certificate_mint(self, tx_hash, timeout=120):
+        """Wait for an already broadcast certificate mint and return the same result as mint_certificate_nft"""
+        tx_hash = HexBytes(tx_hash)
+        tx_receipt = await receipt_waiter.wait_async(tx_hash, timeout=timeout)
+        return self._mint_result_from_receipt(tx_hash, tx_receipt)
+
+    def _mint_result_from_receipt(self, tx_hash, tx_receipt):
+        """Build the mint result (token ID from Transfer/CertificateMinted logs) from a receipt"""
+        # Extract token ID from transaction logs
+        token_id = None
+        
+        # First try to extract from Transfer event (ERC721 standard)
+        for log in tx_receipt.logs:
+            try:
+                # Look for Transfer event (ERC721 standard)
+                # Topic 0: Transfer event signature
+                # Topic 1: from address (0x0 for minting)
+                # Topic 2: to address (recipient)
+                # Topic 3: token ID
+                if (len(log.topics) >= 4 and 
+                    log.topics[0].hex() == '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'):
+                    token_id = int(log.topics[3].hex(), 16)
+                    logger.debug("Extracted token ID from Transfer event: %s", token_id)
+                    break
+            except Exception as e:
+                logger.warning("Failed to extract token ID from log: %s", e)
+                continue
+        
+        # If Transfer event extraction failed, try CertificateMinted event using proper ABI decoding
+        if token_id is None:
+            try:
+                # Process logs to find CertificateMinted event
+                certificate_logs = self.contract.events.CertificateMinted().process_receipt(tx_receipt)
+                if certificate_logs:
+                    # Get the first CertificateMinted event
+                    cert_event = certificate_logs[0]
+                    token_id = cert_event['args']['tokenId']
+                    logger.debug("Extracted token ID from CertificateMinted event: %s", token_id)
+            except Exception as e:
+                logger.warning("Failed to decode CertificateMinted event: %s", e)
+                
+                # Fallback: manual parsing of event data
+                for log in tx_receipt.logs:
+                    try:
+                        if log.address.lower() == self.contract_address.lower():
+                            # CertificateMinted event signature: keccak256("CertificateMinted(address,uint256,uint256,string)")
+                            cert_minted_signature = '0x2a8d8eae6c0c9a7a0baeb37df4a4f3a5f18c9f0ab5b07f4e7a8b5a5e0d5a1b2c'
+                            if len(log.topics) > 0:
+                                # Try to decode the data field for token ID (first 32 bytes after recipient)
+                                if len(log.data) >= 64:  # At least 64 bytes for tokenId + eventId
+                                    potential_token_id = int(log.data[2:66], 16)  # Skip 0x, take first 32 bytes
+                                    if potential_token_id > 0 and potential_token_id < 10000000:  # Reasonable range
+                                        token_id = potential_token_id
+                                        logger.debug("Extracted token ID from manual parsing: %s", token_id)
+                                        break
+                    except Exception as parse_error:
+                        logger.warning("Failed to manually parse event data: %s", parse_error)
+                        continue
+        
+        # If transaction succeeded, consider it successful regardless of token ID extraction
+        if tx_receipt.status == 1:
+            logger.info("Certificate NFT minted successfully! Hash: %s", tx_hash.hex())
+            
+            # Use extracted token ID or generate placeholder if extraction failed
+            final_token_id = token_id if token_id is not None else f"minted_{int(time.time())}"
+            note = "Certificate minted successfully"
+            if token_id is None:
+                note += " - using placeholder token ID"
+            else:
+                note += f" - token ID: {token_id}"
+            
+            return {
+                "success": True,
+                "tx_hash": tx_hash.hex(),
+                "token_id": final_token_id,
+                "gas_used": tx_receipt.gasUsed,
+                "note": note
+            }
+        else:
+            return {
+                "success": False,
+                "error": f"Transaction failed with status {tx_receipt.status}",
+                "tx_hash": tx_hash.hex(),
+                "reverted": True
+            }
+
     async def update_certificate_status(self, participant_id, token_id, tx_hash, certificate_path, ipfs_data):
         """Update participant certificate status in database"""
         query = """
@@ -357,6 +426,7 @@ class BulkCertificateProcessor:
             SET certificate_status = 'transferred',
                 certificate_token_id = ?,
                 certificate_minted_at = CURRENT_TIMESTAMP,
+                certificate_path = ?,
                 certificate_ipfs = ?,
                 certificate_ipfs_hash = ?,
                 certificate_metadata_uri = ?
@@ -364,6 +434,7 @@ class BulkCertificateProcessor:
         """
         params = [
             int(token_id),  # PostgreSQL expects integer type for certificate_token_id
+            certificate_path,
             ipfs_data.get('image_hash'),
             ipfs_data.get('metadata_hash'),
             ipfs_data.get('metadata_url'),
@@ -371,23 +442,26 @@ class BulkCertificateProcessor:
         ]
         
         converted_query, converted_params = convert_sql_for_postgres(query, params)
-        print(f"Updating participant {participant_id} certificate status to 'transferred' with token {token_id}")
+        logger.debug("Updating participant %s certificate status to 'transferred' with token %s", participant_id, token_id)
         result = await db_manager.execute_query(converted_query, converted_params)
-        print(f"Database update result: {result}")
+        logger.debug("Database update result: %s", result)
         
-        # Verify the update worked
-        verify_query = "SELECT certificate_status, certificate_token_id FROM participants WHERE id = ?"
-        converted_verify_query, verify_params = convert_sql_for_postgres(verify_query, [participant_id])
-        verification = await db_manager.execute_query(converted_verify_query, verify_params, fetch=True)
-        print(f"Verification - participant {participant_id} status: {verification}")
+        # Verify the update worked (diagnostic read, skipped unless debugging)
+        if debug_enabled(logger):
+            verify_query = "SELECT certificate_status, certificate_token_id FROM participants WHERE id = ?"
+            converted_verify_query, verify_params = convert_sql_for_postgres(verify_query, [participant_id])
+            verification = await db_manager.execute_query(converted_verify_query, verify_params, fetch=True)
+            logger.debug("Verification - participant %s status: %s", participant_id, verification)
     
-    async def process_single_participant(self, participant, event_details, event_id, send_email_immediately=False):
+    async def process_single_participant(self, participant, event_details, event_id, send_email_immediately=False, control=None):
         """Process a single participant certificate in parallel"""
         try:
-            print(f"[DEBUG] Processing participant: {participant['name']}")
+            logger.debug("Processing participant: %s", participant['name'])
+            if control:
+                await control.checkpoint()
 
             # Generate certificate
-            print(f"[DEBUG] Generating certificate for {participant['name']}...")
+            logger.debug("Generating certificate for %s...", participant['name'])
             cert_result = await self.cert_generator.generate_certificate(
                 participant_name=participant['name'],
                 event_name=event_details['name'],
@@ -397,11 +471,11 @@ class BulkCertificateProcessor:
                 template_filename=event_details.get('template')
             )
 
-            print(f"[DEBUG] Certificate generation result for {participant['name']}: success={cert_result.get('success')}")
+            logger.debug("Certificate generation result for %s: success=%s", participant['name'], cert_result.get('success'))
 
             if not cert_result['success']:
                 error_msg = cert_result.get('error', 'Unknown error')
-                print(f"[ERROR] Certificate generation failed for {participant['name']}: {error_msg}")
+                logger.error("Certificate generation failed for %s: %s", participant['name'], error_msg)
                 return {
                     "participant": participant['name'],
                     "step": "certificate_generation",
@@ -411,7 +485,9 @@ class BulkCertificateProcessor:
                 }
 
             # Upload to IPFS
-            print(f"[DEBUG] Uploading certificate to IPFS for {participant['name']}...")
+            if control:
+                await control.checkpoint()
+            logger.debug("Uploading certificate to IPFS for %s...", participant['name'])
             ipfs_result = await asyncio.to_thread(
                 self.cert_generator.upload_to_ipfs,
                 cert_result['file_path'],
@@ -420,36 +496,39 @@ class BulkCertificateProcessor:
                     "event_name": event_details['name'],
                     "event_date": event_details['date'],
                     "team_name": participant['team_name']
-                }
+                },
+                cert_result.get('image_bytes')
             )
 
-            print(f"[DEBUG] IPFS upload result for {participant['name']}: success={ipfs_result.get('success')}")
+            logger.debug("IPFS upload result for %s: success=%s", participant['name'], ipfs_result.get('success'))
 
             if not ipfs_result['success']:
                 error_msg = ipfs_result.get('error', 'Unknown error')
-                print(f"[ERROR] IPFS upload failed for {participant['name']}: {error_msg}")
-                print(f"[DEBUG] Continuing with local certificate storage for {participant['name']}")
+                logger.error("IPFS upload failed for %s: %s", participant['name'], error_msg)
+                logger.warning("Continuing with local certificate storage for %s", participant['name'])
                 # Continue with local storage - set dummy IPFS hash
                 ipfs_hash = f"local_cert_{participant['id']}_{int(time.time())}"
                 ipfs_url = cert_result['file_path']  # Use local file path
             else:
                 ipfs_hash = ipfs_result['metadata_hash']
                 ipfs_url = ipfs_result['metadata_url']
-                print(f"[DEBUG] IPFS hash for {participant['name']}: {ipfs_hash}")
+                logger.debug("IPFS hash for %s: %s", participant['name'], ipfs_hash)
 
-            # Mint NFT
-            print(f"[DEBUG] Minting certificate NFT for {participant['name']}...")
+            # Mint NFT (last checkpoint: past this point the participant is drained to completion)
+            if control:
+                await control.checkpoint()
+            logger.debug("Minting certificate NFT for %s...", participant['name'])
             mint_result = await self.mint_certificate_nft(
                 participant['wallet_address'],
                 event_id,
                 ipfs_hash
             )
 
-            print(f"[DEBUG] NFT minting result for {participant['name']}: success={mint_result.get('success')}")
+            logger.debug("NFT minting result for %s: success=%s", participant['name'], mint_result.get('success'))
 
             if not mint_result['success']:
                 error_msg = mint_result.get('error', 'Unknown error')
-                print(f"[ERROR] NFT minting failed for {participant['name']}: {error_msg}")
+                logger.error("NFT minting failed for %s: %s", participant['name'], error_msg)
                 return {
                     "participant": participant['name'],
                     "step": "nft_minting",
@@ -480,7 +559,7 @@ class BulkCertificateProcessor:
             email_error = None
             if send_email_immediately:
                 try:
-                    print(f"📧 Sending email to {participant['email']}...")
+                    logger.debug("📧 Sending email to %s...", participant['email'])
                     email_result = await asyncio.to_thread(
                         self.email_service.send_certificate_email,
                         to_email=participant['email'],
@@ -489,17 +568,18 @@ class BulkCertificateProcessor:
                         certificate_path=cert_result['file_path'],
                         contract_address=self.contract_address,
                         token_id=mint_result['token_id'],
-                        poa_token_id=participant['poa_token_id']
+                        poa_token_id=participant['poa_token_id'],
+                        certificate_bytes=cert_result.get('image_bytes')
                     )
                     email_sent = email_result['success']
                     if email_sent:
-                        print(f"✅ Email sent successfully to {participant['email']}")
+                        logger.debug("✅ Email sent successfully to %s", participant['email'])
                     else:
                         email_error = email_result.get('error', 'Unknown email error')
-                        print(f"❌ Email failed for {participant['email']}: {email_error}")
+                        logger.warning("❌ Email failed for %s: %s", participant['email'], email_error)
                 except Exception as e:
                     email_error = str(e)
-                    print(f"❌ Exception sending email to {participant['email']}: {email_error}")
+                    logger.warning("❌ Exception sending email to %s: %s", participant['email'], email_error)
 
             return {
                 "participant": participant['name'],
@@ -514,15 +594,16 @@ class BulkCertificateProcessor:
                     "name": participant['name'],
                     "email": participant['email'],
                     "certificate_path": cert_result['file_path'],
+                    "certificate_bytes": cert_result.get('image_bytes'),
                     "token_id": mint_result['token_id'],
                     "poa_token_id": participant['poa_token_id']
                 }
             }
 
+        except ProcessingCancelled:
+            raise
         except Exception as e:
-            print(f"Exception in process_single_participant for {participant['name']}: {str(e)}")
-            import traceback
-            print(f"Full traceback: {traceback.format_exc()}")
+            logger.exception("Exception in process_single_participant for %s: %s", participant['name'], e)
             return {
                 "participant": participant['name'],
                 "step": "processing",
@@ -531,64 +612,62 @@ class BulkCertificateProcessor:
                 "email_sent": False
             }
 
-    async def process_bulk_certificates(self, event_id, participant_ids=None):
+    async def process_bulk_certificates(self, event_id, participant_ids=None, control=None):
         """Main function to process certificates for selected or all participants of an event"""
         # Call the async implementation directly
-        return await self._process_bulk_certificates_async(event_id, participant_ids)
+        return await self._process_bulk_certificates_async(event_id, participant_ids, control)
     
-    async def _process_bulk_certificates_async(self, event_id, participant_ids=None):
+    async def _process_bulk_certificates_async(self, event_id, participant_ids=None, control=None):
         """Async implementation of bulk certificate processing"""
         try:
-            print(f"[DEBUG] Starting bulk certificate processing for event {event_id}")
-            print(f"[DEBUG] Participant IDs filter: {participant_ids}")
+            logger.debug("Starting bulk certificate processing for event %s", event_id)
+            logger.debug("Participant IDs filter: %s", participant_ids)
 
             # Get event details
-            print(f"[DEBUG] Getting event details for event {event_id}...")
+            logger.debug("Getting event details for event %s...", event_id)
             event_details = await self.get_event_details(event_id)
             if not event_details:
                 error_msg = "Event not found"
-                print(f"[ERROR] {error_msg}")
+                logger.error("%s", error_msg)
                 return {"success": False, "error": error_msg}
 
-            print(f"[DEBUG] Event details: {event_details}")
+            logger.debug("Event details: %s", event_details)
 
             # Get PoA holders (filtered by participant_ids if provided)
-            print(f"[DEBUG] Getting PoA holders for event {event_id}...")
+            logger.debug("Getting PoA holders for event %s...", event_id)
             participants = await self.get_poa_holders_for_event(event_id, participant_ids=participant_ids)
             if not participants:
                 error_msg = "No PoA holders found for selected participants" if participant_ids else "No PoA holders found for this event"
-                print(f"[ERROR] {error_msg}")
+                logger.error("%s", error_msg)
                 return {"success": False, "error": error_msg}
 
-            print(f"[DEBUG] Found {len(participants)} participants with PoA tokens")
-            print(f"[DEBUG] First participant: {participants[0] if participants else 'None'}")
+            logger.debug("Found %s participants with PoA tokens", len(participants))
+            logger.debug("First participant: %s", participants[0] if participants else 'None')
             
             results = []
             email_data = []
 
             # Process participants in parallel with controlled concurrency
-            print(f"[DEBUG] Processing {len(participants)} participants in parallel...")
+            logger.debug("Processing %s participants in parallel...", len(participants))
 
             # Use semaphore to limit concurrent operations (prevent RPC overload and nonce conflicts)
             semaphore = asyncio.Semaphore(3)  # Max 3 concurrent operations for blockchain safety
 
             async def process_with_semaphore(participant):
                 async with semaphore:
-                    # Add small delay to prevent rate limiting
-                    await asyncio.sleep(1)  # 1 second delay between operations
-                    print(f"[DEBUG] Starting to process participant: {participant['name']}")
-                    result = await self.process_single_participant(participant, event_details, event_id)
-                    print(f"[DEBUG] Finished processing participant: {participant['name']}, success: {result.get('success')}")
+                    logger.debug("Starting to process participant: %s", participant['name'])
+                    result = await self.process_single_participant(participant, event_details, event_id, control=control)
+                    logger.debug("Finished processing participant: %s, success: %s", participant['name'], result.get('success'))
                     return result
 
             # Create tasks for parallel processing
-            print(f"[DEBUG] Creating {len(participants)} tasks...")
+            logger.debug("Creating %s tasks...", len(participants))
             tasks = [process_with_semaphore(participant) for participant in participants]
 
             # Execute all tasks in parallel
-            print(f"[DEBUG] Executing tasks in parallel...")
+            logger.debug("Executing tasks in parallel...")
             parallel_results = await asyncio.gather(*tasks, return_exceptions=True)
-            print(f"[DEBUG] Parallel execution completed, got {len(parallel_results)} results")
+            logger.debug("Parallel execution completed, got %s results", len(parallel_results))
             
             # Separate results and email data
             for result in parallel_results:
@@ -619,19 +698,25 @@ class BulkCertificateProcessor:
                         "error": result['error']
                     })
             
-            print(f"Parallel processing completed. {len([r for r in results if r['success']])} successful, {len([r for r in results if not r['success']])} failed")
+            logger.info("Parallel processing completed. %s successful, %s failed", len([r for r in results if r['success']]), len([r for r in results if not r['success']]))
             
             # Send bulk emails only if there's new data
             if email_data:
-                print("Sending certificates via email...")
+                logger.info("Sending certificates via email...")
+
+                def report_email_progress(entry, completed, total):
+                    status = "sent" if entry['result'].get('success') else f"failed: {entry['result'].get('error')}"
+                    logger.debug("Email %s/%s to %s %s", completed, total, entry['email'], status)
+
                 email_results = await asyncio.to_thread(
                     self.email_service.send_bulk_certificate_emails,
                     email_data,
                     event_details['name'],
-                    self.contract_address
+                    self.contract_address,
+                    report_email_progress
                 )
             else:
-                print("No new certificates to email.")
+                logger.info("No new certificates to email.")
                 email_results = []
             
             successful_certs = len([r for r in results if r.get('success', False)])
@@ -650,18 +735,15 @@ class BulkCertificateProcessor:
             }
 
         except Exception as e:
-            import traceback
             error_msg = str(e)
-            full_traceback = traceback.format_exc()
-            print(f"[ERROR] Exception in _process_bulk_certificates_async: {error_msg}")
-            print(f"[ERROR] Full traceback: {full_traceback}")
+            logger.exception("Exception in _process_bulk_certificates_async: %s", error_msg)
             return {
                 "success": False,
                 "error": error_msg if error_msg else "Unknown error in certificate processing"
             }
 
     # NEW SEPARATE FUNCTION - Background processing with progress tracking
-    async def process_bulk_certificates_with_progress(self, event_id, participant_ids=None, progress_callback=None):
+    async def process_bulk_certificates_with_progress(self, event_id, participant_ids=None, progress_callback=None, control=None):
         """Completely separate function for background certificate processing with progress tracking"""
         try:
             if progress_callback:
@@ -691,10 +773,11 @@ class BulkCertificateProcessor:
             failed_emails = 0
 
             for i, participant in enumerate(participants):
+                if control:
+                    # Wait here while paused; stop before the next participant once cancelled
+                    await control.checkpoint()
                 try:
-                    # Check if task should be cancelled or paused
                     if progress_callback:
-                        # Check task status through callback mechanism
                         progress_callback(i, total_participants, f"Processing {participant['name']}...")
 
                     # Process single participant WITH IMMEDIATE EMAIL SENDING
@@ -702,7 +785,8 @@ class BulkCertificateProcessor:
                         participant,
                         event_details,
                         event_id,
-                        send_email_immediately=True  # 🔥 Send email immediately!
+                        send_email_immediately=True,  # 🔥 Send email immediately!
+                        control=control
                     )
 
                     if result['success']:
@@ -740,9 +824,8 @@ class BulkCertificateProcessor:
                         })
                         failed_emails += 1
 
-                    # Small delay to prevent rate limiting
-                    await asyncio.sleep(2)  # 2 second delay between participants
-
+                except ProcessingCancelled:
+                    raise
                 except Exception as e:
                     results.append({
                         "participant": participant.get('name', 'Unknown'),
@@ -779,15 +862,26 @@ class BulkCertificateProcessor:
                 "email_results": email_results
             }
 
+        except ProcessingCancelled as e:
+            # Participants already past their mint were finished; the rest were never started
+            return {
+                "success": False,
+                "cancelled": True,
+                "error": f"Processing stopped: {e}",
+                "certificate_results": results
+            }
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e)
             }
 
+# Global processor instance (shares generator, email service, contract and nonce state across requests)
+bulk_processor = BulkCertificateProcessor()
+
 # Test function
 if __name__ == "__main__":
-    processor = BulkCertificateProcessor()
+    processor = bulk_processor
     
     # Test with event_id = 9642 (adjust as needed)
     result = processor.process_bulk_certificates(9642)
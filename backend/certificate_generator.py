@@ -1,17 +1,56 @@
 import os
-import json
+import asyncio
+import threading
+from collections import OrderedDict
 import requests
-from PIL import Image, ImageDraw, ImageFont
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from io import BytesIO
-import fitz  # PyMuPDF for PDF processing
 from dotenv import load_dotenv
 from datetime import datetime
 from template_manager import template_manager
+from certificate_render import render_certificate_jpeg
+from metrics import render_seconds, ipfs_pin_seconds
+from tracing import tracer, run_in_span
+from logging_config import get_logger
+
+logger = get_logger(__name__)
 
 load_dotenv()
 
+class CertificateArtifactCache:
+    """Size-bounded LRU of rendered certificate JPEGs, shared by bulk runs and resends"""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv("CERTIFICATE_CACHE_MB", "128")) * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+# Global certificate artifact cache
+certificate_cache = CertificateArtifactCache()
+
+def certificate_filename(participant_name, event_name):
+    """Filename used for a participant's certificate (also the artifact cache key)"""
+    return f"{participant_name.replace(' ', '_')}_{event_name.replace(' ', '_')}_certificate.jpg"
+
 class CertificateGenerator:
     def __init__(self):
         # Use absolute paths relative to this file's directory
@@ -22,6 +61,10 @@ class CertificateGenerator:
         self.pinata_api_key = os.getenv("PINATA_API_KEY")
         self.pinata_secret = os.getenv("PINATA_SECRET_API_KEY")
         self.pinata_jwt = os.getenv("PINATA_JWT")
+        # Disk copies are optional; when enabled they are written off the hot path
+        self.persist_to_disk = os.getenv("CERTIFICATE_PERSIST", "true").lower() == "true"
+        self.cache = certificate_cache
+        self._pending_writes = set()
         
         # Create output directory if it doesn't exist
         os.makedirs(self.output_dir, exist_ok=True)
@@ -62,7 +105,7 @@ class CertificateGenerator:
             # Fallback to string conversion if anything goes wrong
             return str(date_input)
 
-    async def generate_certificate(self, participant_name, event_name, event_date, participant_email, team_name="", template_filename=None):
+    async def generate_certificate(self, participant_name, event_name, event_date, participant_email, team_name="", template_filename=None, executor=None):
         """Generate a personalized certificate"""
         try:
             # Format the date to be more readable
@@ -78,7 +121,7 @@ class CertificateGenerator:
                 if template_path:
                     temp_file_cleanup = True
                 else:
-                    print(f"Template {template_filename} not found in database, using default")
+                    logger.info("Template %s not found in database, using default", template_filename)
 
             # Fallback to file system default if no database template
             if not template_path:
@@ -95,81 +138,24 @@ class CertificateGenerator:
                             'error': 'No template found - neither in database nor file system'
                         }
             
-            # Open the PDF template
-            doc = fitz.open(template_path)
-            page = doc[0]  # First page
-            
-            # Convert PDF page to image
-            mat = fitz.Matrix(2.0, 2.0)  # High resolution
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            # Load as PIL image
-            image = Image.open(BytesIO(img_data))
-            draw = ImageDraw.Draw(image)
-            
-            # Font settings - using RetroPixel font
-            try:
-                # Try RetroPixel font (retro pixel style)
-                name_font = ImageFont.truetype("fonts/RetroPixel.ttf", 55)
-                event_font = ImageFont.truetype("fonts/RetroPixel.ttf", 35) 
-                date_font = ImageFont.truetype("fonts/RetroPixel.ttf", 28)
-            except:
-                try:
-                    # Try PerfectPixel font (very compact pixel font)
-                    name_font = ImageFont.truetype("fonts/PerfectPixel.ttf", 48)
-                    event_font = ImageFont.truetype("fonts/PerfectPixel.ttf", 30) 
-                    date_font = ImageFont.truetype("fonts/PerfectPixel.ttf", 24)
-                except:
-                    try:
-                        # Try Press Start 2P font (classic arcade pixel font)
-                        name_font = ImageFont.truetype("fonts/PressStart2P.ttf", 40)
-                        event_font = ImageFont.truetype("fonts/PressStart2P.ttf", 25) 
-                        date_font = ImageFont.truetype("fonts/PressStart2P.ttf", 20)
-                    except:
-                        try:
-                            # Fallback to arial
-                            name_font = ImageFont.truetype("arial.ttf", 80)
-                            event_font = ImageFont.truetype("arial.ttf", 50) 
-                            date_font = ImageFont.truetype("arial.ttf", 40)
-                        except:
-                            # Final fallback to default font
-                            name_font = ImageFont.load_default()
-                            event_font = ImageFont.load_default()
-                            date_font = ImageFont.load_default()
-            
-            # Get image dimensions
-            width, height = image.size
-            
-            # Position text precisely on the blank lines in your certificate template
-            # Participant name goes on the underline after "Proudly presented to"
-            name_x = int(width * 0.50)  # Center horizontally (moved 1 point left)
-            name_y = int(height * 0.51)  # Position on the first underline (moved 1 point down)
-            draw.text((name_x, name_y), participant_name, font=name_font, fill="white", anchor="mm")
-            
-            # Event name goes on the underline after "for participating in the"
-            event_x = int(width * 0.61)  # Position after "for participating in the" (moved 1 point left)
-            event_y = int(height * 0.58)  # Position on the second underline (moved 2 points down)
-            draw.text((event_x, event_y), event_name, font=event_font, fill="white", anchor="mm")
-            
-            # Date goes on the underline after "held on"
-            date_x = int(width * 0.61)  # Position after "held on" (moved 1 point left)
-            date_y = int(height * 0.63)  # Position on the third underline (moved 2 points down)
-            draw.text((date_x, date_y), formatted_date, font=date_font, fill="white", anchor="mm")
-            
-            # Save as JPG
-            output_filename = f"{participant_name.replace(' ', '_')}_{event_name.replace(' ', '_')}_certificate.jpg"
+            output_filename = certificate_filename(participant_name, event_name)
             output_path = os.path.join(self.output_dir, output_filename)
-            
-            # Convert RGBA to RGB if needed
-            if image.mode == 'RGBA':
-                rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                rgb_image.paste(image, mask=image.split()[-1])
-                image = rgb_image
-            
-            image.save(output_path, "JPEG", quality=95)
 
-            doc.close()
+            if executor is not None:
+                # Render in the caller's (process) pool so bulk jobs keep the event loop free
+                with render_seconds.time(mode="process"):
+                    image_bytes = await asyncio.get_running_loop().run_in_executor(
+                        executor, run_in_span, tracer.traceparent(), "certificate.render",
+                        render_certificate_jpeg, template_path, participant_name, event_name, formatted_date
+                    )
+            else:
+                with render_seconds.time(mode="inline"), tracer.child_span("certificate.render"):
+                    image_bytes = render_certificate_jpeg(template_path, participant_name, event_name, formatted_date)
+            self.cache.put(output_filename, image_bytes)
+
+            # Keep a disk copy for records without making the pipeline wait for it
+            if self.persist_to_disk:
+                self._schedule_write(output_path, image_bytes)
 
             # Clean up temporary file if created
             if temp_file_cleanup and template_path and os.path.exists(template_path):
@@ -181,7 +167,8 @@ class CertificateGenerator:
             return {
                 "success": True,
                 "file_path": output_path,
-                "filename": output_filename
+                "filename": output_filename,
+                "image_bytes": image_bytes
             }
 
         except Exception as e:
@@ -196,53 +183,90 @@ class CertificateGenerator:
                 "error": str(e)
             }
 
-    def upload_to_ipfs(self, file_path, metadata):
-        """Upload certificate to IPFS via Pinata"""
+    def _write_file(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def _schedule_write(self, path, data):
+        """Write the certificate to disk in a worker thread"""
+        try:
+            task = asyncio.get_running_loop().create_task(asyncio.to_thread(self._write_file, path, data))
+        except RuntimeError:
+            self._write_file(path, data)
+            return
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    async def flush_pending_writes(self):
+        """Wait for queued disk writes (used before reading certificates back from disk)"""
+        if self._pending_writes:
+            await asyncio.gather(*list(self._pending_writes), return_exceptions=True)
+
+    def get_cached_certificate(self, participant_name, event_name, stored_path=None):
+        """Return previously rendered certificate bytes from memory or disk, or None"""
+        filename = certificate_filename(participant_name, event_name)
+        data = self.cache.get(filename)
+        if data is not None:
+            return data
+        for path in (stored_path, os.path.join(self.output_dir, filename)):
+            if path and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self.cache.put(filename, data)
+                return data
+        return None
+
+    def upload_to_ipfs(self, file_path, metadata, file_bytes=None):
+        """Upload certificate to IPFS via Pinata (from in-memory bytes when provided)"""
         try:
             # Upload image file
-            with open(file_path, 'rb') as f:
-                files = {
-                    'file': (os.path.basename(file_path), f, 'image/jpeg')
-                }
-                
-                headers = {
-                    'pinata_api_key': self.pinata_api_key,
-                    'pinata_secret_api_key': self.pinata_secret
-                }
-                
+            if file_bytes is None:
+                with open(file_path, 'rb') as f:
+                    file_bytes = f.read()
+            files = {
+                'file': (os.path.basename(file_path), file_bytes, 'image/jpeg')
+            }
+            
+            headers = {
+                'pinata_api_key': self.pinata_api_key,
+                'pinata_secret_api_key': self.pinata_secret
+            }
+            
+            with ipfs_pin_seconds.time(kind="file"), tracer.child_span("ipfs.pin", kind="file"):
                 response = requests.post(
                     'https://api.pinata.cloud/pinning/pinFileToIPFS',
                     files=files,
                     headers=headers
                 )
+            
+            if response.status_code == 200:
+                ipfs_hash = response.json()['IpfsHash']
+                image_url = f"https://red-biological-whitefish-939.mypinata.cloud/ipfs/{ipfs_hash}"
                 
-                if response.status_code == 200:
-                    ipfs_hash = response.json()['IpfsHash']
-                    image_url = f"https://red-biological-whitefish-939.mypinata.cloud/ipfs/{ipfs_hash}"
-                    
-                    # Create NFT metadata
-                    # Convert date to string if it's a date object
-                    event_date_str = metadata['event_date']
-                    if hasattr(event_date_str, 'strftime'):
-                        event_date_str = event_date_str.strftime("%d %b %Y")
-                    elif not isinstance(event_date_str, str):
-                        event_date_str = str(event_date_str)
-                    
-                    nft_metadata = {
-                        "name": f"{metadata['event_name']} - Participation Certificate",
-                        "description": f"Certificate of participation for {metadata['event_name']} event issued to {metadata['participant_name']}",
-                        "image": image_url,
-                        "attributes": [
-                            {"trait_type": "Type", "value": "Certificate"},
-                            {"trait_type": "Event", "value": metadata['event_name']},
-                            {"trait_type": "Participant", "value": metadata['participant_name']},
-                            {"trait_type": "Date", "value": event_date_str},
-                            {"trait_type": "Team", "value": metadata.get('team_name', 'N/A')}
-                        ]
-                    }
-                    
-                    # Upload metadata to IPFS
-                    print(f"[DEBUG] Uploading metadata for {metadata['participant_name']}")
+                # Create NFT metadata
+                # Convert date to string if it's a date object
+                event_date_str = metadata['event_date']
+                if hasattr(event_date_str, 'strftime'):
+                    event_date_str = event_date_str.strftime("%d %b %Y")
+                elif not isinstance(event_date_str, str):
+                    event_date_str = str(event_date_str)
+                
+                nft_metadata = {
+                    "name": f"{metadata['event_name']} - Participation Certificate",
+                    "description": f"Certificate of participation for {metadata['event_name']} event issued to {metadata['participant_name']}",
+                    "image": image_url,
+                    "attributes": [
+                        {"trait_type": "Type", "value": "Certificate"},
+                        {"trait_type": "Event", "value": metadata['event_name']},
+                        {"trait_type": "Participant", "value": metadata['participant_name']},
+                        {"trait_type": "Date", "value": event_date_str},
+                        {"trait_type": "Team", "value": metadata.get('team_name', 'N/A')}
+                    ]
+                }
+                
+                # Upload metadata to IPFS
+                logger.debug("Uploading metadata for %s", metadata['participant_name'])
+                with ipfs_pin_seconds.time(kind="json"), tracer.child_span("ipfs.pin", kind="json"):
                     metadata_response = requests.post(
                         'https://api.pinata.cloud/pinning/pinJSONToIPFS',
                         headers={
@@ -257,29 +281,29 @@ class CertificateGenerator:
                             }
                         }
                     )
-                    print(f"[DEBUG] Metadata upload response: {metadata_response.status_code} - {metadata_response.text}")
-                    
-                    if metadata_response.status_code == 200:
-                        metadata_hash = metadata_response.json()['IpfsHash']
+                logger.debug("Metadata upload response: %s - %s", metadata_response.status_code, metadata_response.text)
+                
+                if metadata_response.status_code == 200:
+                    metadata_hash = metadata_response.json()['IpfsHash']
 
-                        return {
-                            "success": True,
-                            "image_hash": ipfs_hash,
-                            "image_url": image_url,
-                            "metadata_hash": metadata_hash,
-                            "metadata_url": f"https://red-biological-whitefish-939.mypinata.cloud/ipfs/{metadata_hash}"
-                        }
-                    else:
-                        return {
-                            "success": False,
-                            "error": f"IPFS metadata upload failed: {metadata_response.text}"
-                        }
+                    return {
+                        "success": True,
+                        "image_hash": ipfs_hash,
+                        "image_url": image_url,
+                        "metadata_hash": metadata_hash,
+                        "metadata_url": f"https://red-biological-whitefish-939.mypinata.cloud/ipfs/{metadata_hash}"
+                    }
                 else:
                     return {
                         "success": False,
-                        "error": f"IPFS image upload failed: {response.text}"
+                        "error": f"IPFS metadata upload failed: {metadata_response.text}"
                     }
-                
+            else:
+                return {
+                    "success": False,
+                    "error": f"IPFS image upload failed: {response.text}"
+                }
+            
         except Exception as e:
             return {
                 "success": False,
@@ -314,5 +338,4 @@ async def main():
         print("IPFS upload result:", ipfs_result)
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
\ No newline at end of file
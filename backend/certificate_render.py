@@ -0,0 +1,83 @@
+from io import BytesIO
+from PIL import Image, ImageDraw, ImageFont
+import fitz  # PyMuPDF for PDF processing
+
+
+def render_certificate_jpeg(template_path, participant_name, event_name, formatted_date):
+    """Draw the participant's name, event and date onto the PDF template and return JPEG bytes.
+
+    A plain module-level function with light imports, so bulk jobs can run it in a process pool.
+    """
+    # Open the PDF template
+    doc = fitz.open(template_path)
+    page = doc[0]  # First page
+
+    # Convert PDF page to image
+    mat = fitz.Matrix(2.0, 2.0)  # High resolution
+    pix = page.get_pixmap(matrix=mat)
+    img_data = pix.tobytes("png")
+
+    # Load as PIL image
+    image = Image.open(BytesIO(img_data))
+    draw = ImageDraw.Draw(image)
+
+    # Font settings - using RetroPixel font
+    try:
+        # Try RetroPixel font (retro pixel style)
+        name_font = ImageFont.truetype("fonts/RetroPixel.ttf", 55)
+        event_font = ImageFont.truetype("fonts/RetroPixel.ttf", 35) 
+        date_font = ImageFont.truetype("fonts/RetroPixel.ttf", 28)
+    except:
+        try:
+            # Try PerfectPixel font (very compact pixel font)
+            name_font = ImageFont.truetype("fonts/PerfectPixel.ttf", 48)
+            event_font = ImageFont.truetype("fonts/PerfectPixel.ttf", 30) 
+            date_font = ImageFont.truetype("fonts/PerfectPixel.ttf", 24)
+        except:
+            try:
+                # Try Press Start 2P font (classic arcade pixel font)
+                name_font = ImageFont.truetype("fonts/PressStart2P.ttf", 40)
+                event_font = ImageFont.truetype("fonts/PressStart2P.ttf", 25) 
+                date_font = ImageFont.truetype("fonts/PressStart2P.ttf", 20)
+            except:
+                try:
+                    # Fallback to arial
+                    name_font = ImageFont.truetype("arial.ttf", 80)
+                    event_font = ImageFont.truetype("arial.ttf", 50) 
+                    date_font = ImageFont.truetype("arial.ttf", 40)
+                except:
+                    # Final fallback to default font
+                    name_font = ImageFont.load_default()
+                    event_font = ImageFont.load_default()
+                    date_font = ImageFont.load_default()
+
+    # Get image dimensions
+    width, height = image.size
+
+    # Position text precisely on the blank lines in your certificate template
+    # Participant name goes on the underline after "Proudly presented to"
+    name_x = int(width * 0.50)  # Center horizontally (moved 1 point left)
+    name_y = int(height * 0.51)  # Position on the first underline (moved 1 point down)
+    draw.text((name_x, name_y), participant_name, font=name_font, fill="white", anchor="mm")
+
+    # Event name goes on the underline after "for participating in the"
+    event_x = int(width * 0.61)  # Position after "for participating in the" (moved 1 point left)
+    event_y = int(height * 0.58)  # Position on the second underline (moved 2 points down)
+    draw.text((event_x, event_y), event_name, font=event_font, fill="white", anchor="mm")
+
+    # Date goes on the underline after "held on"
+    date_x = int(width * 0.61)  # Position after "held on" (moved 1 point left)
+    date_y = int(height * 0.63)  # Position on the third underline (moved 2 points down)
+    draw.text((date_x, date_y), formatted_date, font=date_font, fill="white", anchor="mm")
+
+    # Convert RGBA to RGB if needed
+    if image.mode == 'RGBA':
+        rgb_image = Image.new('RGB', image.size, (255, 255, 255))
+        rgb_image.paste(image, mask=image.split()[-1])
+        image = rgb_image
+
+    # Encode as JPG in memory
+    jpeg_buffer = BytesIO()
+    image.save(jpeg_buffer, "JPEG", quality=95)
+    doc.close()
+    return jpeg_buffer.getvalue()
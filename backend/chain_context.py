@@ -0,0 +1,109 @@
+import os
+import time
+import asyncio
+import threading
+from web3 import Web3
+from dotenv import load_dotenv
+
+from rpc_pool import rpc_pool
+from database import db_manager, convert_sql_for_postgres
+
+load_dotenv()
+
+
+class ChainContext:
+    """Process-wide Web3, signing account and contract objects, built once and reused by every mint path"""
+
+    def __init__(self, w3=None):
+        self.w3 = w3 or rpc_pool.web3
+        self.private_key = os.getenv("PRIVATE_KEY")
+        contract_address = os.getenv("CONTRACT_ADDRESS")
+        self.contract_address = Web3.to_checksum_address(contract_address) if contract_address else None
+        self._account = None
+        self._chain_id = None
+        self._contracts = {}
+        self._lock = threading.Lock()
+        self._nonce_lock = asyncio.Lock()
+        self._nonce_row_ready = False
+        self.gap_reset_seconds = float(os.getenv("NONCE_GAP_RESET_SECONDS", "120"))
+
+    @property
+    def configured(self):
+        return bool(self.w3 and self.private_key and self.contract_address)
+
+    @property
+    def account(self):
+        """Signing account derived from PRIVATE_KEY (key parsing happens once)"""
+        if self._account is None:
+            self._account = self.w3.eth.account.from_key(self.private_key)
+        return self._account
+
+    @property
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def contract(self, abi):
+        """Contract object for an ABI list; its function/event codecs are built on first use and then cached"""
+        key = id(abi)
+        cached = self._contracts.get(key)
+        if cached is None:
+            with self._lock:
+                cached = self._contracts.get(key)
+                if cached is None:
+                    # Keep the ABI referenced so its id() cannot be reused by another list
+                    cached = (abi, self.w3.eth.contract(address=self.contract_address, abi=abi))
+                    self._contracts[key] = cached
+        return cached[1]
+
+    def sign_transaction(self, transaction):
+        return self.account.sign_transaction(transaction)
+
+    async def next_nonce(self):
+        """Allocate the next nonce for the signing account.
+
+        The counter lives in nonce_counters so every API worker process (and the job workers) draw from one
+        sequence; it never hands out a nonce below what the network already has pending (e.g. after a restart).
+        If the counter runs ahead of the pending count and that count has not moved for NONCE_GAP_RESET_SECONDS,
+        a nonce was allocated but never broadcast (e.g. a crash between allocate and send), so the counter is
+        reset down to the pending count instead of every later transaction queueing behind the gap.
+        """
+        async with self._nonce_lock:
+            pending_nonce = await asyncio.to_thread(self.w3.eth.get_transaction_count, self.account.address, 'pending')
+            address = self.account.address.lower()
+            if not self._nonce_row_ready:
+                sql, params = convert_sql_for_postgres(
+                    "INSERT INTO nonce_counters (address, next_nonce) VALUES (?, 0) ON CONFLICT (address) DO NOTHING", [address]
+                )
+                await db_manager.execute_query(sql, params)
+                self._nonce_row_ready = True
+            now = time.time()
+            # One atomic statement: concurrent workers each get a distinct value (SET sees the old row values)
+            stuck_gap = "next_nonce > CAST(? AS BIGINT) AND last_pending = CAST(? AS BIGINT) AND last_pending_at < ?"
+            sql, params = convert_sql_for_postgres(
+                f"""UPDATE nonce_counters
+                   SET next_nonce = CASE WHEN next_nonce < CAST(? AS BIGINT) OR ({stuck_gap}) THEN CAST(? AS BIGINT)
+                                         ELSE next_nonce END + 1,
+                       last_pending_at = CASE WHEN last_pending = CAST(? AS BIGINT) AND NOT ({stuck_gap})
+                                              THEN last_pending_at ELSE ? END,
+                       last_pending = CAST(? AS BIGINT)
+                   WHERE address = ? RETURNING next_nonce - 1""",
+                [pending_nonce, pending_nonce, pending_nonce, now - self.gap_reset_seconds, pending_nonce,
+                 pending_nonce, pending_nonce, pending_nonce, now - self.gap_reset_seconds, now,
+                 pending_nonce, address]
+            )
+            rows = await db_manager.execute_returning(sql, params)
+            return int(rows[0][0])
+
+    async def release_nonce(self, nonce):
+        """Give back a nonce whose transaction was never broadcast, if nothing was allocated after it"""
+        sql, params = convert_sql_for_postgres(
+            "UPDATE nonce_counters SET next_nonce = ? WHERE address = ? AND next_nonce = ?",
+            [nonce, self.account.address.lower(), nonce + 1]
+        )
+        await db_manager.execute_query(sql, params)
+
+
+# Global chain context instance
+chain_context = ChainContext()
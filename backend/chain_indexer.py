@@ -0,0 +1,476 @@
+import os
+import asyncio
+from web3 import Web3
+from dotenv import load_dotenv
+
+from database import db_manager, convert_sql_for_postgres
+from rpc_pool import rpc_pool
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+# Only the events the index needs; Transfer is the standard ERC-721 event
+INDEXED_EVENTS_ABI = [
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "recipient", "type": "address"},
+            {"indexed": False, "internalType": "uint256", "name": "tokenId", "type": "uint256"},
+            {"indexed": False, "internalType": "uint256", "name": "eventId", "type": "uint256"}
+        ],
+        "name": "PoAMinted",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "recipient", "type": "address"},
+            {"indexed": False, "internalType": "uint256", "name": "tokenId", "type": "uint256"},
+            {"indexed": False, "internalType": "uint256", "name": "eventId", "type": "uint256"},
+            {"indexed": False, "internalType": "string", "name": "ipfsHash", "type": "string"}
+        ],
+        "name": "CertificateMinted",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": False, "internalType": "uint256", "name": "eventId", "type": "uint256"},
+            {"indexed": False, "internalType": "string", "name": "eventName", "type": "string"}
+        ],
+        "name": "EventCreated",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "address", "name": "from", "type": "address"},
+            {"indexed": True, "internalType": "address", "name": "to", "type": "address"},
+            {"indexed": True, "internalType": "uint256", "name": "tokenId", "type": "uint256"}
+        ],
+        "name": "Transfer",
+        "type": "event"
+    }
+]
+
+EVENT_SIGNATURES = {
+    "PoAMinted": "PoAMinted(address,uint256,uint256)",
+    "CertificateMinted": "CertificateMinted(address,uint256,uint256,string)",
+    "EventCreated": "EventCreated(uint256,string)",
+    "Transfer": "Transfer(address,address,uint256)"
+}
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# Blocks behind head before a range is indexed, per chain (networks from blockchain/deployment-info-*.json)
+DEFAULT_CONFIRMATIONS = {
+    1001: 3,    # Kaia Kairos - BFT finality, small margin for lagging public nodes
+    84532: 12   # Base Sepolia - L2 unsafe head can reorg
+}
+
+
+class ChainEventIndexer:
+    """Tails contract logs in bounded block ranges into chain_events / chain_tokens, resuming from a checkpoint"""
+
+    def __init__(self, w3=None, contract_address=None):
+        self.w3 = w3 or rpc_pool.web3
+        contract_address = contract_address or os.getenv("CONTRACT_ADDRESS")
+        self.contract_address = Web3.to_checksum_address(contract_address) if contract_address else None
+        self.enabled = os.getenv("CHAIN_INDEX_ENABLED", "true").lower() == "true" and bool(self.w3 and self.contract_address)
+        self.start_block = os.getenv("CHAIN_INDEX_START_BLOCK")
+        self.batch_blocks = int(os.getenv("CHAIN_INDEX_BATCH_BLOCKS", "1000"))
+        self.poll_interval = float(os.getenv("CHAIN_INDEX_POLL_SECONDS", "5"))
+        self.confirmations_override = os.getenv("CHAIN_INDEX_CONFIRMATIONS")
+        self.hash_history = int(os.getenv("CHAIN_INDEX_HASH_HISTORY", "512"))  # How far back a reorg can be resolved
+
+        self.contract = self.w3.eth.contract(address=self.contract_address, abi=INDEXED_EVENTS_ABI) if self.enabled else None
+        self.topics = {Web3.to_hex(Web3.keccak(text=signature)): name for name, signature in EVENT_SIGNATURES.items()}
+
+        self.chain_id = None
+        self.confirmations = None
+        self.synced_block = None
+        self.synced_hash = None
+        self.head_block = None
+        self.last_error = None
+        self.reorgs = 0
+        self.last_reorg = None
+
+    # ------------------------------------------------------------------
+    # Sync loop
+    # ------------------------------------------------------------------
+
+    async def run(self):
+        """Background task: catch up from the checkpoint, then poll for new blocks"""
+        logger.info("Chain indexer started for %s", self.contract_address)
+        while True:
+            try:
+                await self.sync_once()
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("Chain indexer error: %s", e)
+            await asyncio.sleep(self.poll_interval)
+
+    async def _ensure_chain_id(self):
+        if self.chain_id is None:
+            self.chain_id = await asyncio.to_thread(lambda: self.w3.eth.chain_id)
+        return self.chain_id
+
+    async def sync_once(self):
+        await self._ensure_chain_id()
+        if self.confirmations is None:
+            self.confirmations = int(self.confirmations_override) if self.confirmations_override else DEFAULT_CONFIRMATIONS.get(self.chain_id, 12)
+
+        if self.synced_block is None:
+            checkpoint = await self._load_checkpoint()
+            if checkpoint:
+                self.synced_block, self.synced_hash = checkpoint
+            else:
+                self.synced_block, self.synced_hash = await self._initial_block() - 1, None
+
+        self.head_block = await asyncio.to_thread(lambda: self.w3.eth.block_number)
+        safe_block = self.head_block - self.confirmations
+
+        from_block = self.synced_block + 1
+        span = self.batch_blocks
+        inconsistent = 0
+        while from_block <= safe_block:
+            to_block = min(from_block + span - 1, safe_block)
+
+            # The first new block must build on the block we last indexed, otherwise the chain reorganised under us
+            first_header = await asyncio.to_thread(self.w3.eth.get_block, from_block)
+            if self.synced_hash and Web3.to_hex(first_header["parentHash"]) != self.synced_hash:
+                await self._handle_reorg()
+                return
+
+            try:
+                logs = await asyncio.to_thread(self._fetch_logs, from_block, to_block)
+                last_header = first_header if to_block == from_block else await asyncio.to_thread(self.w3.eth.get_block, to_block)
+            except Exception as e:
+                if span <= 1:
+                    raise
+                # Providers cap results/ranges differently - shrink the window and retry
+                span = max(1, span // 2)
+                logger.warning("get_logs %s-%s failed (%s); retrying with %s blocks", from_block, to_block, e, span)
+                continue
+
+            # Logs served by a node on a different fork (load-balanced RPC) are dropped and the range retried
+            last_hash = Web3.to_hex(last_header["hash"])
+            if any(log.get("removed") or (log["blockNumber"] == to_block and Web3.to_hex(log["blockHash"]) != last_hash)
+                   for log in logs):
+                inconsistent += 1
+                if inconsistent > 3:
+                    raise Exception(f"RPC keeps returning logs off the canonical chain for blocks {from_block}-{to_block}")
+                logger.warning("Inconsistent logs for blocks %s-%s; retrying", from_block, to_block)
+                await asyncio.sleep(1)
+                continue
+
+            parent = (from_block - 1, Web3.to_hex(first_header["parentHash"]))
+            await self._store(logs, to_block, last_hash, parent)
+            self.synced_block, self.synced_hash = to_block, last_hash
+            if logs:
+                logger.debug("Chain indexer stored %s logs up to block %s", len(logs), to_block)
+            from_block = to_block + 1
+            span = self.batch_blocks
+
+    async def _handle_reorg(self):
+        """Find the newest indexed block still on the canonical chain and roll the index back to it"""
+        stored = await self._fetch(
+            "SELECT block_number, block_hash FROM chain_index_blocks WHERE chain_id = ? AND contract_address = ? ORDER BY block_number DESC",
+            [self.chain_id, self.contract_address.lower()]
+        )
+        stored = [(row["block_number"], row["block_hash"]) if isinstance(row, dict) else tuple(row) for row in stored]
+
+        ancestor = None
+        for block_number, block_hash in stored:
+            header = await asyncio.to_thread(self.w3.eth.get_block, block_number)
+            if Web3.to_hex(header["hash"]) == block_hash:
+                ancestor = (block_number, block_hash)
+                break
+
+        if ancestor is None:
+            # Deeper than the remembered hashes - rebuild from just before the oldest one
+            oldest = stored[-1][0] if stored else self.synced_block
+            ancestor = (oldest - 1, None)
+            logger.warning("No remembered block hash is canonical any more; re-indexing from block %s", oldest)
+
+        depth = self.synced_block - ancestor[0]
+        logger.warning("Chain reorg detected at block %s; rolling back %s blocks to %s", self.synced_block, depth, ancestor[0])
+        await self._rollback(ancestor[0], ancestor[1])
+        self.reorgs += 1
+        self.last_reorg = {"from_block": self.synced_block, "to_block": ancestor[0], "depth": depth}
+        self.synced_block, self.synced_hash = ancestor
+
+    async def _rollback(self, block_number, block_hash):
+        """Drop everything above block_number and rebuild token state for affected tokens, in one transaction"""
+        affected = await self._fetch(
+            "SELECT DISTINCT token_id FROM chain_events WHERE chain_id = ? AND block_number > ? AND token_id IS NOT NULL",
+            [self.chain_id, block_number]
+        )
+        token_ids = [row["token_id"] if isinstance(row, dict) else row[0] for row in affected]
+
+        statements = [
+            ("DELETE FROM chain_events WHERE chain_id = ? AND block_number > ?", [self.chain_id, block_number]),
+            ("DELETE FROM chain_index_blocks WHERE chain_id = ? AND contract_address = ? AND block_number > ?",
+             [self.chain_id, self.contract_address.lower(), block_number])
+        ]
+        if token_ids:
+            placeholders = ", ".join("?" for _ in token_ids)
+            statements.append((f"DELETE FROM chain_tokens WHERE chain_id = ? AND token_id IN ({placeholders})",
+                               [self.chain_id] + token_ids))
+            surviving = await self._fetch(
+                f"""SELECT event_type, block_number, wallet_address, from_address, token_id, event_id, ipfs_hash
+                    FROM chain_events
+                    WHERE chain_id = ? AND block_number <= ? AND token_id IN ({placeholders})
+                    ORDER BY block_number, log_index""",
+                [self.chain_id, block_number] + token_ids
+            )
+            columns = ["event_type", "block_number", "wallet_address", "from_address", "token_id", "event_id", "ipfs_hash"]
+            for row in surviving:
+                row = row if isinstance(row, dict) else dict(zip(columns, row))
+                statements.extend(self._token_statements(row))
+
+        statements.append(self._checkpoint_statement(block_number, block_hash))
+        await db_manager.execute_many([convert_sql_for_postgres(sql, params) for sql, params in statements])
+
+    async def _initial_block(self):
+        """First block to scan when there is no checkpoint yet"""
+        if self.start_block:
+            return int(self.start_block)
+        try:
+            return await asyncio.to_thread(self._find_deployment_block)
+        except Exception as e:
+            head = await asyncio.to_thread(lambda: self.w3.eth.block_number)
+            logger.warning("Could not locate contract deployment block (%s); indexing from head %s. "
+                           "Set CHAIN_INDEX_START_BLOCK to backfill history.", e, head)
+            return head
+
+    def _find_deployment_block(self):
+        """Binary search for the first block where the contract has code (needs historical state)"""
+        low, high = 0, self.w3.eth.block_number
+        if not self.w3.eth.get_code(self.contract_address, high):
+            raise Exception("contract has no code at head")
+        while low < high:
+            mid = (low + high) // 2
+            if self.w3.eth.get_code(self.contract_address, mid):
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    def _fetch_logs(self, from_block, to_block):
+        return self.w3.eth.get_logs({
+            "address": self.contract_address,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [list(self.topics.keys())]
+        })
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _decode(self, log):
+        topic0 = Web3.to_hex(log["topics"][0]) if log["topics"] else None
+        name = self.topics.get(topic0)
+        if not name:
+            return None
+        decoded = getattr(self.contract.events, name)().process_log(log)
+        args = decoded["args"]
+        row = {
+            "event_type": name,
+            "block_number": decoded["blockNumber"],
+            "block_hash": Web3.to_hex(decoded["blockHash"]),
+            "tx_hash": Web3.to_hex(decoded["transactionHash"]),
+            "log_index": decoded["logIndex"],
+            "wallet_address": None,
+            "from_address": None,
+            "token_id": None,
+            "event_id": None,
+            "ipfs_hash": None,
+            "event_name": None
+        }
+        if name == "PoAMinted":
+            row.update(wallet_address=args["recipient"].lower(), token_id=args["tokenId"], event_id=args["eventId"])
+        elif name == "CertificateMinted":
+            row.update(wallet_address=args["recipient"].lower(), token_id=args["tokenId"],
+                       event_id=args["eventId"], ipfs_hash=args["ipfsHash"])
+        elif name == "EventCreated":
+            row.update(event_id=args["eventId"], event_name=args["eventName"])
+        elif name == "Transfer":
+            row.update(wallet_address=args["to"].lower(), from_address=args["from"].lower(), token_id=args["tokenId"])
+        return row
+
+    def _statements_for(self, row):
+        statements = [(
+            """INSERT INTO chain_events (chain_id, block_number, block_hash, tx_hash, log_index, event_type,
+                                         wallet_address, from_address, token_id, event_id, ipfs_hash, event_name)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (chain_id, tx_hash, log_index) DO NOTHING""",
+            [self.chain_id, row["block_number"], row["block_hash"], row["tx_hash"], row["log_index"], row["event_type"],
+             row["wallet_address"], row["from_address"], row["token_id"], row["event_id"], row["ipfs_hash"], row["event_name"]]
+        )]
+        return statements + self._token_statements(row)
+
+    def _token_statements(self, row):
+        """Derived chain_tokens state for one event (also replayed when rebuilding after a reorg)"""
+        statements = []
+        if row["event_type"] in ("PoAMinted", "CertificateMinted"):
+            token_type = "poa" if row["event_type"] == "PoAMinted" else "certificate"
+            statements.append((
+                """INSERT INTO chain_tokens (chain_id, token_id, event_id, token_type, minted_to, owner, ipfs_hash,
+                                             minted_block, updated_block)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (chain_id, token_id) DO UPDATE SET
+                       event_id = excluded.event_id,
+                       token_type = excluded.token_type,
+                       minted_to = excluded.minted_to,
+                       ipfs_hash = excluded.ipfs_hash,
+                       minted_block = excluded.minted_block""",
+                [self.chain_id, row["token_id"], row["event_id"], token_type, row["wallet_address"],
+                 row["wallet_address"], row["ipfs_hash"], row["block_number"], row["block_number"]]
+            ))
+        elif row["event_type"] == "Transfer":
+            # Ownership only moves forward: replaying an older range never overwrites a newer owner
+            statements.append((
+                """INSERT INTO chain_tokens (chain_id, token_id, owner, updated_block)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT (chain_id, token_id) DO UPDATE SET
+                       owner = excluded.owner,
+                       updated_block = excluded.updated_block
+                   WHERE chain_tokens.updated_block IS NULL OR chain_tokens.updated_block <= excluded.updated_block""",
+                [self.chain_id, row["token_id"], row["wallet_address"], row["block_number"]]
+            ))
+        return statements
+
+    def _checkpoint_statement(self, block_number, block_hash):
+        return (
+            """INSERT INTO chain_index_checkpoints (chain_id, contract_address, last_block, last_block_hash, updated_at)
+               VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+               ON CONFLICT (chain_id, contract_address) DO UPDATE SET
+                   last_block = excluded.last_block,
+                   last_block_hash = excluded.last_block_hash,
+                   updated_at = CURRENT_TIMESTAMP""",
+            [self.chain_id, self.contract_address.lower(), block_number, block_hash]
+        )
+
+    async def _store(self, logs, to_block, to_block_hash, parent):
+        """Write one block range, remember its block hashes and advance the checkpoint in the same transaction.
+
+        parent is (block_number, hash) of the block before the range, so a reorg always has an ancestor to test.
+        """
+        statements = []
+        block_hashes = {parent[0]: parent[1], to_block: to_block_hash}
+        for log in logs:
+            row = self._decode(log)
+            if row:
+                statements.extend(self._statements_for(row))
+                block_hashes[row["block_number"]] = row["block_hash"]
+
+        for block_number, block_hash in sorted(block_hashes.items()):
+            statements.append((
+                """INSERT INTO chain_index_blocks (chain_id, contract_address, block_number, block_hash)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT (chain_id, contract_address, block_number) DO UPDATE SET block_hash = excluded.block_hash""",
+                [self.chain_id, self.contract_address.lower(), block_number, block_hash]
+            ))
+        statements.append((
+            "DELETE FROM chain_index_blocks WHERE chain_id = ? AND contract_address = ? AND block_number < ?",
+            [self.chain_id, self.contract_address.lower(), to_block - self.hash_history]
+        ))
+        statements.append(self._checkpoint_statement(to_block, to_block_hash))
+        await db_manager.execute_many([convert_sql_for_postgres(sql, params) for sql, params in statements])
+
+    async def _load_checkpoint(self):
+        """Return (last_block, last_block_hash) or None"""
+        rows = await self._fetch(
+            "SELECT last_block, last_block_hash FROM chain_index_checkpoints WHERE chain_id = ? AND contract_address = ?",
+            [self.chain_id, self.contract_address.lower()]
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        return (row["last_block"], row["last_block_hash"]) if isinstance(row, dict) else tuple(row)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def _fetch(self, sql, params):
+        sql, params = convert_sql_for_postgres(sql, params)
+        rows = await db_manager.execute_query(sql, params, fetch=True)
+        return [dict(row) if hasattr(row, "keys") else row for row in rows or []]
+
+    async def get_wallet_tokens(self, wallet_address):
+        """Tokens minted to or currently held by a wallet (index lookups on minted_to / owner)"""
+        await self._ensure_chain_id()
+        wallet = wallet_address.lower()
+        rows = await self._fetch(
+            """SELECT token_id, event_id, token_type, minted_to, owner FROM chain_tokens
+               WHERE chain_id = ? AND minted_to = ?
+               UNION
+               SELECT token_id, event_id, token_type, minted_to, owner FROM chain_tokens
+               WHERE chain_id = ? AND owner = ?""",
+            [self.chain_id, wallet, self.chain_id, wallet]
+        )
+        return [self._token_dict(row) for row in rows]
+
+    async def get_event_participants(self, event_id=None):
+        """Current PoA holders (optionally for one event), with their certificate token if minted"""
+        await self._ensure_chain_id()
+        if event_id is None:
+            tokens = await self._fetch(
+                "SELECT token_id, event_id, token_type, minted_to, owner FROM chain_tokens WHERE chain_id = ? AND token_type IS NOT NULL",
+                [self.chain_id]
+            )
+        else:
+            tokens = await self._fetch(
+                "SELECT token_id, event_id, token_type, minted_to, owner FROM chain_tokens WHERE chain_id = ? AND event_id = ?",
+                [self.chain_id, event_id]
+            )
+        tokens = [self._token_dict(row) for row in tokens]
+
+        certificates = {
+            (t["owner"], t["event_id"]): t["token_id"] for t in tokens if t["token_type"] == "certificate"
+        }
+        participants = []
+        for token in tokens:
+            if token["token_type"] != "poa" or token["owner"] == ZERO_ADDRESS:
+                continue
+            participants.append({
+                "wallet_address": token["owner"],
+                "event_id": token["event_id"],
+                "poa_token_id": token["token_id"],
+                "minted_to": token["minted_to"],
+                "certificate_token_id": certificates.get((token["owner"], token["event_id"]))
+            })
+        return participants
+
+    @staticmethod
+    def _token_dict(row):
+        if isinstance(row, dict):
+            return row
+        token_id, event_id, token_type, minted_to, owner = row
+        return {"token_id": token_id, "event_id": event_id, "token_type": token_type, "minted_to": minted_to, "owner": owner}
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "chain_id": self.chain_id,
+            "contract_address": self.contract_address,
+            "synced_block": self.synced_block,
+            "head_block": self.head_block,
+            "confirmations": self.confirmations,
+            "lag_blocks": (self.head_block - self.synced_block) if self.head_block is not None and self.synced_block is not None else None,
+            "reorgs": self.reorgs,
+            "last_reorg": self.last_reorg,
+            "last_error": self.last_error
+        }
+
+
+# Global chain indexer instance
+chain_indexer = ChainEventIndexer()
@@ -0,0 +1,182 @@
+import os
+from web3 import Web3
+from eth_abi import encode, decode
+from dotenv import load_dotenv
+
+from rpc_batch import batch_call
+from rpc_pool import rpc_pool
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+# Canonical Multicall3 deployment (same address on Kaia Kairos and Base Sepolia)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+AGGREGATE3_SELECTOR = Web3.keccak(text="aggregate3((address,bool,bytes)[])")[:4]
+
+READ_ABI = [
+    {
+        "inputs": [{"internalType": "uint256", "name": "tokenId", "type": "uint256"}],
+        "name": "ownerOf",
+        "outputs": [{"internalType": "address", "name": "", "type": "address"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "uint256", "name": "tokenId", "type": "uint256"}],
+        "name": "tokenURI",
+        "outputs": [{"internalType": "string", "name": "", "type": "string"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "", "type": "address"}, {"internalType": "uint256", "name": "", "type": "uint256"}],
+        "name": "hasPoAForEvent",
+        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "name": "tokenToEventId",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "name": "isPoA",
+        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+
+class ContractReader:
+    """Batched view calls against the certificate contract: Multicall3 when deployed, JSON-RPC batches otherwise"""
+
+    def __init__(self, w3=None, contract_address=None):
+        self.w3 = w3 or rpc_pool.web3
+        contract_address = contract_address or os.getenv("CONTRACT_ADDRESS")
+        self.contract_address = Web3.to_checksum_address(contract_address) if contract_address else None
+        self.enabled = bool(self.w3 and self.contract_address)
+        self.batch_size = int(os.getenv("MULTICALL_BATCH_SIZE", "500"))  # Sub-calls per aggregate3 eth_call
+        self.contract = self.w3.eth.contract(address=self.contract_address, abi=READ_ABI) if self.enabled else None
+        self._output_types = {
+            item["name"]: [output["type"] for output in item["outputs"]] for item in READ_ABI
+        }
+        self._multicall_available = None
+
+    def _multicall_deployed(self):
+        if self._multicall_available is None:
+            try:
+                self._multicall_available = len(self.w3.eth.get_code(MULTICALL3_ADDRESS)) > 0
+            except Exception as e:
+                logger.warning("Multicall3 probe failed (%s); using JSON-RPC batches", e)
+                self._multicall_available = False
+            if not self._multicall_available:
+                logger.info("Multicall3 not deployed on this chain; using JSON-RPC batches")
+        return self._multicall_available
+
+    def _decode(self, fn_name, data):
+        value = decode(self._output_types[fn_name], data)
+        return value[0] if len(value) == 1 else value
+
+    def call_many(self, calls):
+        """Run [(fn_name, args), ...] and return results in order; reverted calls (e.g. ownerOf on a burnt token) give None"""
+        if not calls:
+            return []
+        encoded = [Web3.to_bytes(hexstr=self.contract.encodeABI(fn_name=fn_name, args=list(args))) for fn_name, args in calls]
+
+        if self._multicall_deployed():
+            results = []
+            for start in range(0, len(calls), self.batch_size):
+                chunk = encoded[start:start + self.batch_size]
+                payload = AGGREGATE3_SELECTOR + encode(
+                    ["(address,bool,bytes)[]"], [[(self.contract_address, True, data) for data in chunk]]
+                )
+                raw = self.w3.eth.call({"to": MULTICALL3_ADDRESS, "data": payload})
+                for (success, data), (fn_name, _) in zip(decode(["(bool,bytes)[]"], raw)[0], calls[start:start + self.batch_size]):
+                    results.append(self._decode(fn_name, data) if success and data else None)
+            return results
+
+        raw_results = batch_call(self.w3, [
+            ("eth_call", [{"to": self.contract_address, "data": Web3.to_hex(data)}, "latest"]) for data in encoded
+        ])
+        return [
+            self._decode(fn_name, Web3.to_bytes(hexstr=raw)) if raw and raw != "0x" else None
+            for (fn_name, _), raw in zip(calls, raw_results)
+        ]
+
+    # ------------------------------------------------------------------
+    # Typed helpers
+    # ------------------------------------------------------------------
+
+    def owners_of(self, token_ids):
+        return dict(zip(token_ids, self.call_many([("ownerOf", [int(t)]) for t in token_ids])))
+
+    def token_event_ids(self, token_ids):
+        return dict(zip(token_ids, self.call_many([("tokenToEventId", [int(t)]) for t in token_ids])))
+
+    def token_uris(self, token_ids):
+        return dict(zip(token_ids, self.call_many([("tokenURI", [int(t)]) for t in token_ids])))
+
+    def has_poa_for_event(self, wallets, event_id):
+        calls = [("hasPoAForEvent", [Web3.to_checksum_address(w), int(event_id)]) for w in wallets]
+        return dict(zip(wallets, self.call_many(calls)))
+
+    def verify_event_holdings(self, event_id, participants, include_uris=False):
+        """Check every participant's PoA/certificate on-chain with one batched round of calls.
+
+        participants: dicts with wallet_address, poa_token_id and certificate_token_id (either may be None).
+        """
+        calls, slots = [], []
+        for index, p in enumerate(participants):
+            if not Web3.is_address(p.get("wallet_address") or ""):
+                continue
+            wallet = Web3.to_checksum_address(p["wallet_address"])
+            calls.append(("hasPoAForEvent", [wallet, int(event_id)]))
+            slots.append((index, "has_poa_for_event"))
+            for prefix in ("poa", "certificate"):
+                token_id = p.get(f"{prefix}_token_id")
+                if token_id is None:
+                    continue
+                calls.append(("ownerOf", [int(token_id)]))
+                slots.append((index, f"{prefix}_owner"))
+                calls.append(("tokenToEventId", [int(token_id)]))
+                slots.append((index, f"{prefix}_event_id"))
+                if include_uris:
+                    calls.append(("tokenURI", [int(token_id)]))
+                    slots.append((index, f"{prefix}_token_uri"))
+
+        raw = {}
+        for (index, key), value in zip(slots, self.call_many(calls)):
+            raw.setdefault(index, {})[key] = value
+
+        results = []
+        for index, p in enumerate(participants):
+            values = raw.get(index, {})
+            wallet = (p.get("wallet_address") or "").lower()
+            entry = {
+                "wallet_address": p["wallet_address"],
+                "has_poa_for_event": bool(values.get("has_poa_for_event")),
+                "poa_token_id": p.get("poa_token_id"),
+                "certificate_token_id": p.get("certificate_token_id")
+            }
+            for prefix in ("poa", "certificate"):
+                if p.get(f"{prefix}_token_id") is None:
+                    continue
+                owner = values.get(f"{prefix}_owner")
+                entry[f"{prefix}_owner"] = owner
+                entry[f"{prefix}_owned"] = bool(owner) and owner.lower() == wallet
+                entry[f"{prefix}_event_matches"] = values.get(f"{prefix}_event_id") == int(event_id)
+                if include_uris:
+                    entry[f"{prefix}_token_uri"] = values.get(f"{prefix}_token_uri")
+            results.append(entry)
+        return results
+
+
+# Global contract reader instance
+contract_reader = ContractReader()
@@ -7,6 +7,12 @@ from sqlalchemy.orm import sessionmaker
 import aiosqlite
 import asyncpg
 
+from metrics import db_query_seconds, db_pool_acquire_seconds, statement_label
+from tracing import tracer
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
 class DatabaseManager:
     def __init__(self):
         self._database_url = None
@@ -26,6 +32,15 @@ class DatabaseManager:
             self._is_postgres = self.database_url.startswith("postgresql")
         return self._is_postgres
 
+    @property
+    def pool_min(self):
+        return int(os.getenv("DB_POOL_MIN", "5"))
+
+    @property
+    def pool_max(self):
+        # Per worker process: with N API workers keep N * DB_POOL_MAX under the server's max_connections
+        return int(os.getenv("DB_POOL_MAX", "50"))
+
     def _get_loop_id(self):
         """Get current event loop ID for pool management"""
         try:
@@ -55,15 +70,15 @@ class DatabaseManager:
                             user=parsed.username,
                             password=parsed.password,
                             database=parsed.path[1:] if parsed.path.startswith('/') else parsed.path,
-                            min_size=5,
-                            max_size=50,
+                            min_size=self.pool_min,
+                            max_size=self.pool_max,
                             command_timeout=60,
                             timeout=30
                         )
                         self._pg_pools[loop_id] = pool
-                        print(f"✅ PostgreSQL connection pool initialized for loop {loop_id} (min=5, max=50)")
+                        logger.info("✅ PostgreSQL connection pool initialized for loop %s (min=%s, max=%s)", loop_id, self.pool_min, self.pool_max)
                     except Exception as e:
-                        print(f"❌ Error initializing PostgreSQL pool: {e}")
+                        logger.exception("❌ Error initializing PostgreSQL pool: %s", e)
                         raise
 
     async def get_connection(self):
@@ -78,7 +93,21 @@ class DatabaseManager:
         loop_id = self._get_loop_id()
         if loop_id not in self._pg_pools:
             await self._init_postgres_pool()
-        return await self._pg_pools[loop_id].acquire()
+        with db_pool_acquire_seconds.time():
+            return await self._pg_pools[loop_id].acquire()
+
+    def _span(self, query):
+        return tracer.child_span(f"db {statement_label(query)}", **{
+            "db.system": "postgresql" if self.is_postgres else "sqlite",
+            "db.statement": " ".join(query.split())[:500]
+        })
+
+    def pool_stats(self):
+        """Size and idle connections of the current loop's asyncpg pool (None on SQLite / before startup)"""
+        pool = self._pg_pools.get(self._get_loop_id())
+        if pool is None:
+            return None
+        return {"size": pool.get_size(), "idle": pool.get_idle_size(), "max": self.pool_max}
 
     async def _get_sqlite_connection(self):
         """SQLite connection"""
@@ -93,16 +122,16 @@ class DatabaseManager:
             del self._pg_pools[loop_id]
             if loop_id in self._pool_locks:
                 del self._pool_locks[loop_id]
-            print(f"PostgreSQL connection pool closed for loop {loop_id}")
+            logger.info("PostgreSQL connection pool closed for loop %s", loop_id)
 
     async def close_all_pools(self):
         """Close all PostgreSQL connection pools"""
         for loop_id, pool in list(self._pg_pools.items()):
             try:
                 await pool.close()
-                print(f"PostgreSQL connection pool closed for loop {loop_id}")
+                logger.info("PostgreSQL connection pool closed for loop %s", loop_id)
             except Exception as e:
-                print(f"Error closing pool for loop {loop_id}: {e}")
+                logger.warning("Error closing pool for loop %s: %s", loop_id, e)
         self._pg_pools.clear()
         self._pool_locks.clear()
         
@@ -110,27 +139,109 @@ class DatabaseManager:
         """Execute query with proper handling for both database types"""
         conn = await self.get_connection()
         try:
+            with db_query_seconds.time(statement=statement_label(query)), self._span(query):
+                if self.is_postgres:
+                    if fetch:
+                        return await conn.fetch(query, *(params or []))
+                    else:
+                        await conn.execute(query, *(params or []))
+                        return None
+                else:
+                    cursor = await conn.execute(query, params or [])
+                    if fetch:
+                        return await cursor.fetchall()
+                    else:
+                        await conn.commit()
+                        return cursor.lastrowid
+        finally:
+            # Release connection back to pool (PostgreSQL) or close (SQLite)
             if self.is_postgres:
-                if fetch:
+                loop_id = self._get_loop_id()
+                if loop_id and loop_id in self._pg_pools:
+                    await self._pg_pools[loop_id].release(conn)
+                else:
+                    # Fallback: close connection if pool doesn't exist
+                    await conn.close()
+            else:
+                await conn.close()
+
+    async def execute_returning(self, query, params=None):
+        """Execute a write with a RETURNING clause, commit it, and return the returned rows"""
+        conn = await self.get_connection()
+        try:
+            with db_query_seconds.time(statement=statement_label(query)), self._span(query):
+                if self.is_postgres:
                     return await conn.fetch(query, *(params or []))
                 else:
-                    await conn.execute(query, *(params or []))
-                    return None
+                    cursor = await conn.execute(query, params or [])
+                    rows = await cursor.fetchall()
+                    await conn.commit()
+                    return rows
+        finally:
+            if self.is_postgres:
+                loop_id = self._get_loop_id()
+                if loop_id and loop_id in self._pg_pools:
+                    await self._pg_pools[loop_id].release(conn)
+                else:
+                    await conn.close()
             else:
-                cursor = await conn.execute(query, params or [])
-                if fetch:
-                    return await cursor.fetchall()
+                await conn.close()
+
+    async def execute_many(self, statements):
+        """Execute a list of (query, params) pairs in a single transaction"""
+        conn = await self.get_connection()
+        try:
+            if self.is_postgres:
+                async with conn.transaction():
+                    for query, params in statements:
+                        with db_query_seconds.time(statement=statement_label(query)), self._span(query):
+                            await conn.execute(query, *(params or []))
+            else:
+                try:
+                    for query, params in statements:
+                        with db_query_seconds.time(statement=statement_label(query)), self._span(query):
+                            await conn.execute(query, params or [])
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+        finally:
+            if self.is_postgres:
+                loop_id = self._get_loop_id()
+                if loop_id and loop_id in self._pg_pools:
+                    await self._pg_pools[loop_id].release(conn)
                 else:
+                    await conn.close()
+            else:
+                await conn.close()
+
+    async def fetch_many(self, statements):
+        """Execute a list of (query, params) pairs in a single transaction on one connection and return each one's rows"""
+        conn = await self.get_connection()
+        try:
+            results = []
+            if self.is_postgres:
+                async with conn.transaction():
+                    for query, params in statements:
+                        with db_query_seconds.time(statement=statement_label(query)), self._span(query):
+                            results.append(await conn.fetch(query, *(params or [])))
+            else:
+                try:
+                    for query, params in statements:
+                        with db_query_seconds.time(statement=statement_label(query)), self._span(query):
+                            cursor = await conn.execute(query, params or [])
+                            results.append(await cursor.fetchall())
                     await conn.commit()
-                    return cursor.lastrowid
+                except Exception:
+                    await conn.rollback()
+                    raise
+            return results
         finally:
-            # Release connection back to pool (PostgreSQL) or close (SQLite)
             if self.is_postgres:
                 loop_id = self._get_loop_id()
                 if loop_id and loop_id in self._pg_pools:
                     await self._pg_pools[loop_id].release(conn)
                 else:
-                    # Fallback: close connection if pool doesn't exist
                     await conn.close()
             else:
                 await conn.close()
@@ -259,6 +370,205 @@ async def init_database_tables():
                 verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 last_checked TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS chain_events (
+                id SERIAL PRIMARY KEY,
+                chain_id BIGINT NOT NULL,
+                block_number BIGINT NOT NULL,
+                block_hash VARCHAR(66),
+                tx_hash VARCHAR(66) NOT NULL,
+                log_index INTEGER NOT NULL,
+                event_type VARCHAR(32) NOT NULL,
+                wallet_address VARCHAR(42),
+                from_address VARCHAR(42),
+                token_id BIGINT,
+                event_id BIGINT,
+                ipfs_hash VARCHAR(255),
+                event_name VARCHAR(255),
+                UNIQUE(chain_id, tx_hash, log_index)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS chain_tokens (
+                chain_id BIGINT NOT NULL,
+                token_id BIGINT NOT NULL,
+                event_id BIGINT,
+                token_type VARCHAR(16),
+                minted_to VARCHAR(42),
+                owner VARCHAR(42),
+                ipfs_hash VARCHAR(255),
+                minted_block BIGINT,
+                updated_block BIGINT,
+                PRIMARY KEY (chain_id, token_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS chain_index_checkpoints (
+                chain_id BIGINT NOT NULL,
+                contract_address VARCHAR(42) NOT NULL,
+                last_block BIGINT NOT NULL,
+                last_block_hash VARCHAR(66),
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (chain_id, contract_address)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS chain_index_blocks (
+                chain_id BIGINT NOT NULL,
+                contract_address VARCHAR(42) NOT NULL,
+                block_number BIGINT NOT NULL,
+                block_hash VARCHAR(66) NOT NULL,
+                PRIMARY KEY (chain_id, contract_address, block_number)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS pending_transactions (
+                id SERIAL PRIMARY KEY,
+                tx_hash VARCHAR(66) UNIQUE NOT NULL,
+                kind VARCHAR(32) NOT NULL,
+                event_id INTEGER,
+                participant_ids TEXT,
+                status VARCHAR(20) DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                apply_attempts INTEGER DEFAULT 0,
+                error TEXT,
+                participants_updated INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS bulk_mint_preparations (
+                id SERIAL PRIMARY KEY,
+                event_id INTEGER NOT NULL,
+                selection TEXT NOT NULL,
+                participant_ids TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS poa_mint_jobs (
+                id VARCHAR(64) PRIMARY KEY,
+                event_id INTEGER NOT NULL,
+                ipfs_hash TEXT NOT NULL,
+                status VARCHAR(20) DEFAULT 'pending',
+                total INTEGER DEFAULT 0,
+                minted INTEGER DEFAULT 0,
+                chunk_size INTEGER,
+                error TEXT,
+                lease_owner VARCHAR(128),
+                lease_expires_at DOUBLE PRECISION,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS poa_mint_chunks (
+                id SERIAL PRIMARY KEY,
+                job_id VARCHAR(64) NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                participant_ids TEXT NOT NULL,
+                status VARCHAR(20) DEFAULT 'pending',
+                tx_hash VARCHAR(66),
+                attempts INTEGER DEFAULT 0,
+                minted INTEGER DEFAULT 0,
+                error TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (job_id, chunk_index)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id VARCHAR(64) PRIMARY KEY,
+                kind VARCHAR(32) NOT NULL,
+                event_id INTEGER,
+                status VARCHAR(20) DEFAULT 'starting',
+                total_participants INTEGER DEFAULT 0,
+                completed INTEGER DEFAULT 0,
+                failed INTEGER DEFAULT 0,
+                successful_emails INTEGER DEFAULT 0,
+                failed_emails INTEGER DEFAULT 0,
+                current_step TEXT,
+                error TEXT,
+                lease_owner VARCHAR(128),
+                lease_expires_at DOUBLE PRECISION,
+                heartbeat_at DOUBLE PRECISION,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                trace_parent VARCHAR(64)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS job_items (
+                id SERIAL PRIMARY KEY,
+                job_id VARCHAR(64) NOT NULL,
+                participant_id INTEGER NOT NULL,
+                step VARCHAR(20) DEFAULT 'queued',
+                status VARCHAR(20) DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                certificate_path TEXT,
+                image_hash TEXT,
+                metadata_hash TEXT,
+                metadata_url TEXT,
+                tx_hash VARCHAR(66),
+                token_id TEXT,
+                email_sent INTEGER DEFAULT 0,
+                error TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (job_id, participant_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id SERIAL PRIMARY KEY,
+                to_email TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status VARCHAR(20) DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                available_at DOUBLE PRECISION DEFAULT 0,
+                lease_owner VARCHAR(160),
+                lease_expires_at DOUBLE PRECISION,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sent_at TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS leader_leases (
+                name VARCHAR(64) PRIMARY KEY,
+                owner VARCHAR(128),
+                expires_at DOUBLE PRECISION DEFAULT 0
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS nonce_counters (
+                address VARCHAR(42) PRIMARY KEY,
+                next_nonce BIGINT NOT NULL DEFAULT 0,
+                last_pending BIGINT NOT NULL DEFAULT -1,
+                last_pending_at DOUBLE PRECISION NOT NULL DEFAULT 0
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS telegram_verification_logs (
+                id SERIAL PRIMARY KEY,
+                seq BIGINT,
+                user_id BIGINT,
+                username VARCHAR(255),
+                first_name VARCHAR(255),
+                status VARCHAR(40),
+                error TEXT,
+                logged_at VARCHAR(40),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS telegram_updates (
+                update_id BIGINT PRIMARY KEY,
+                received_at DOUBLE PRECISION NOT NULL
+            )
             """
         ]
     else:
@@ -356,18 +666,248 @@ async def init_database_tables():
                 verified_at TEXT DEFAULT CURRENT_TIMESTAMP,
                 last_checked TEXT DEFAULT CURRENT_TIMESTAMP
             )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS chain_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chain_id INTEGER NOT NULL,
+                block_number INTEGER NOT NULL,
+                block_hash TEXT,
+                tx_hash TEXT NOT NULL,
+                log_index INTEGER NOT NULL,
+                event_type TEXT NOT NULL,
+                wallet_address TEXT,
+                from_address TEXT,
+                token_id INTEGER,
+                event_id INTEGER,
+                ipfs_hash TEXT,
+                event_name TEXT,
+                UNIQUE(chain_id, tx_hash, log_index)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS chain_tokens (
+                chain_id INTEGER NOT NULL,
+                token_id INTEGER NOT NULL,
+                event_id INTEGER,
+                token_type TEXT,
+                minted_to TEXT,
+                owner TEXT,
+                ipfs_hash TEXT,
+                minted_block INTEGER,
+                updated_block INTEGER,
+                PRIMARY KEY (chain_id, token_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS chain_index_checkpoints (
+                chain_id INTEGER NOT NULL,
+                contract_address TEXT NOT NULL,
+                last_block INTEGER NOT NULL,
+                last_block_hash TEXT,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (chain_id, contract_address)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS chain_index_blocks (
+                chain_id INTEGER NOT NULL,
+                contract_address TEXT NOT NULL,
+                block_number INTEGER NOT NULL,
+                block_hash TEXT NOT NULL,
+                PRIMARY KEY (chain_id, contract_address, block_number)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS pending_transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tx_hash TEXT UNIQUE NOT NULL,
+                kind TEXT NOT NULL,
+                event_id INTEGER,
+                participant_ids TEXT,
+                status TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                apply_attempts INTEGER DEFAULT 0,
+                error TEXT,
+                participants_updated INTEGER,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS bulk_mint_preparations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id INTEGER NOT NULL,
+                selection TEXT NOT NULL,
+                participant_ids TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS poa_mint_jobs (
+                id TEXT PRIMARY KEY,
+                event_id INTEGER NOT NULL,
+                ipfs_hash TEXT NOT NULL,
+                status TEXT DEFAULT 'pending',
+                total INTEGER DEFAULT 0,
+                minted INTEGER DEFAULT 0,
+                chunk_size INTEGER,
+                error TEXT,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS poa_mint_chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                participant_ids TEXT NOT NULL,
+                status TEXT DEFAULT 'pending',
+                tx_hash TEXT,
+                attempts INTEGER DEFAULT 0,
+                minted INTEGER DEFAULT 0,
+                error TEXT,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (job_id, chunk_index)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                event_id INTEGER,
+                status TEXT DEFAULT 'starting',
+                total_participants INTEGER DEFAULT 0,
+                completed INTEGER DEFAULT 0,
+                failed INTEGER DEFAULT 0,
+                successful_emails INTEGER DEFAULT 0,
+                failed_emails INTEGER DEFAULT 0,
+                current_step TEXT,
+                error TEXT,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                heartbeat_at REAL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                started_at TEXT,
+                finished_at TEXT,
+                trace_parent TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS job_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                participant_id INTEGER NOT NULL,
+                step TEXT DEFAULT 'queued',
+                status TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                certificate_path TEXT,
+                image_hash TEXT,
+                metadata_hash TEXT,
+                metadata_url TEXT,
+                tx_hash TEXT,
+                token_id TEXT,
+                email_sent INTEGER DEFAULT 0,
+                error TEXT,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (job_id, participant_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                to_email TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                available_at REAL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                error TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                sent_at TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS leader_leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT,
+                expires_at REAL DEFAULT 0
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS nonce_counters (
+                address TEXT PRIMARY KEY,
+                next_nonce INTEGER NOT NULL DEFAULT 0,
+                last_pending INTEGER NOT NULL DEFAULT -1,
+                last_pending_at REAL NOT NULL DEFAULT 0
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS telegram_verification_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                seq INTEGER,
+                user_id INTEGER,
+                username TEXT,
+                first_name TEXT,
+                status TEXT,
+                error TEXT,
+                logged_at TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS telegram_updates (
+                update_id INTEGER PRIMARY KEY,
+                received_at REAL NOT NULL
+            )
             """
         ]
     
+    # Lookup indexes for the chain event index (same syntax on both databases)
+    index_sql = [
+        "CREATE INDEX IF NOT EXISTS idx_chain_events_wallet ON chain_events (chain_id, wallet_address)",
+        "CREATE INDEX IF NOT EXISTS idx_chain_events_event ON chain_events (chain_id, event_id, event_type)",
+        "CREATE INDEX IF NOT EXISTS idx_chain_events_token ON chain_events (chain_id, token_id)",
+        "CREATE INDEX IF NOT EXISTS idx_chain_events_block ON chain_events (chain_id, block_number)",
+        "CREATE INDEX IF NOT EXISTS idx_chain_tokens_owner ON chain_tokens (chain_id, owner)",
+        "CREATE INDEX IF NOT EXISTS idx_chain_tokens_minted_to ON chain_tokens (chain_id, minted_to)",
+        "CREATE INDEX IF NOT EXISTS idx_chain_tokens_event ON chain_tokens (chain_id, event_id, token_type)",
+        "CREATE INDEX IF NOT EXISTS idx_pending_transactions_status ON pending_transactions (status)",
+        "CREATE INDEX IF NOT EXISTS idx_bulk_mint_preparations_event ON bulk_mint_preparations (event_id, selection)",
+        "CREATE INDEX IF NOT EXISTS idx_poa_mint_jobs_status ON poa_mint_jobs (status)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_kind_status ON jobs (kind, status)",
+        "CREATE INDEX IF NOT EXISTS idx_email_outbox_status ON email_outbox (status, available_at)",
+        "CREATE INDEX IF NOT EXISTS idx_telegram_verification_logs_user ON telegram_verification_logs (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_telegram_verification_logs_status ON telegram_verification_logs (status)",
+        "CREATE INDEX IF NOT EXISTS idx_telegram_updates_received ON telegram_updates (received_at)"
+    ]
+
     # Execute table creation
+    table_names = ["events", "participants", "organizers", "organizer_sessions", "organizer_otp_sessions",
+                   "certificate_templates", "telegram_verified_users", "chain_events", "chain_tokens",
+                   "chain_index_checkpoints", "chain_index_blocks", "pending_transactions", "bulk_mint_preparations",
+                   "poa_mint_jobs", "poa_mint_chunks", "jobs", "job_items",
+                   "email_outbox", "leader_leases", "nonce_counters", "telegram_verification_logs",
+                   "telegram_updates"]
     for i, sql in enumerate(tables_sql):
         try:
             await db_manager.execute_query(sql)
-            table_names = ["events", "participants", "organizers", "organizer_sessions", "organizer_otp_sessions", "certificate_templates"]
-            print(f"Table '{table_names[i]}' created/verified successfully")
+            logger.debug("Table '%s' created/verified successfully", table_names[i])
         except Exception as e:
-            print(f"Error creating table {i}: {e}")
-            print(f"SQL: {sql}")
+            logger.exception("Error creating table %s: %s", i, e)
+            logger.warning("SQL: %s", sql)
+
+    for sql in index_sql:
+        try:
+            await db_manager.execute_query(sql)
+        except Exception as e:
+            logger.exception("Error creating index: %s", e)
+            logger.warning("SQL: %s", sql)
 
 
 async def migrate_database():
@@ -386,18 +926,46 @@ async def migrate_database():
             "ALTER TABLE organizers ADD COLUMN IF NOT EXISTS is_root BOOLEAN DEFAULT FALSE",
             "ALTER TABLE organizers ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE",
             # Add telegram verification toggle to events table
-            "ALTER TABLE events ADD COLUMN IF NOT EXISTS telegram_verification_required BOOLEAN DEFAULT TRUE"
+            "ALTER TABLE events ADD COLUMN IF NOT EXISTS telegram_verification_required BOOLEAN DEFAULT TRUE",
+            # Reorg detection for the chain event index
+            "ALTER TABLE chain_index_checkpoints ADD COLUMN IF NOT EXISTS last_block_hash VARCHAR(66)",
+            # PoA mint jobs run under a lease so only one worker sends a job's chunks
+            "ALTER TABLE poa_mint_jobs ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(128)",
+            "ALTER TABLE poa_mint_jobs ADD COLUMN IF NOT EXISTS lease_expires_at DOUBLE PRECISION",
+            # Trace context of the request that queued a background job
+            "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS trace_parent VARCHAR(64)",
+            # Transient reconciliation errors are retried, counted separately from receipt polls
+            "ALTER TABLE pending_transactions ADD COLUMN IF NOT EXISTS apply_attempts INTEGER DEFAULT 0",
+            # Nonce gap detection (pending count stuck below the allocation counter)
+            "ALTER TABLE nonce_counters ADD COLUMN IF NOT EXISTS last_pending BIGINT NOT NULL DEFAULT -1",
+            "ALTER TABLE nonce_counters ADD COLUMN IF NOT EXISTS last_pending_at DOUBLE PRECISION NOT NULL DEFAULT 0"
         ]
 
         for query in migration_queries:
             try:
                 await db_manager.execute_query(query)
-                print(f"Migration executed: {query}")
+                logger.info("Migration executed: %s", query)
             except Exception as e:
-                print(f"Migration skipped (column likely exists): {e}")
+                logger.debug("Migration skipped (column likely exists): %s", e)
     else:
         # For SQLite, we would need to recreate the table, but for now just log
-        print("SQLite migration would require table recreation - skipping for existing tables")
+        logger.info("SQLite migration would require table recreation - skipping for existing tables")
+        # Plain column additions do work in SQLite
+        sqlite_columns = [
+            ("chain_index_checkpoints", "last_block_hash TEXT"),
+            ("jobs", "trace_parent TEXT"),
+            ("poa_mint_jobs", "lease_owner TEXT"),
+            ("poa_mint_jobs", "lease_expires_at REAL"),
+            ("pending_transactions", "apply_attempts INTEGER DEFAULT 0"),
+            ("nonce_counters", "last_pending INTEGER NOT NULL DEFAULT -1"),
+            ("nonce_counters", "last_pending_at REAL NOT NULL DEFAULT 0")
+        ]
+        for table, column in sqlite_columns:
+            try:
+                await db_manager.execute_query(f"ALTER TABLE {table} ADD COLUMN {column}")
+                logger.info("Migration executed: %s.%s", table, column.split()[0])
+            except Exception:
+                pass  # Column already exists
 
 async def ensure_root_organizers():
     """Ensure root organizers exist in database"""
@@ -436,7 +1004,7 @@ async def ensure_root_organizers():
                         "INSERT INTO organizers (email, is_root, is_active, created_at) VALUES (?, 1, 1, CURRENT_TIMESTAMP)",
                         [email]
                     )
-                print(f"Root organizer created: {email}")
+                logger.info("Root organizer created: %s", email)
             else:
                 # Update existing organizer to set is_root = TRUE
                 if db_manager.is_postgres:
@@ -449,10 +1017,10 @@ async def ensure_root_organizers():
                         "UPDATE organizers SET is_root = 1, is_active = 1 WHERE email = ?",
                         [email]
                     )
-                print(f"Root organizer updated: {email}")
+                logger.info("Root organizer updated: %s", email)
 
     except Exception as e:
-        print(f"Error ensuring root organizers: {e}")
+        logger.warning("Error ensuring root organizers: %s", e)
 
 async def ensure_iotopia_event():
     """Ensure IOTOPIA event exists in database"""
@@ -486,8 +1054,8 @@ async def ensure_iotopia_event():
                        VALUES (?, ?, ?, ?, ?, ?)""",
                     ["IOTOPIA", "REVA Hackathon 2025", "064708", "2025-09-12", "NA", "default"]
                 )
-            print("IOTOPIA event created successfully!")
+            logger.info("IOTOPIA event created successfully!")
         else:
-            print("IOTOPIA event already exists")
+            logger.info("IOTOPIA event already exists")
     except Exception as e:
-        print(f"Error ensuring IOTOPIA event: {e}")
\ No newline at end of file
+        logger.warning("Error ensuring IOTOPIA event: %s", e)
\ No newline at end of file
@@ -0,0 +1,148 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+from dotenv import load_dotenv
+
+from database import db_manager, convert_sql_for_postgres
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+OUTBOX_KEYS = ["id", "to_email", "subject", "body", "attempts"]
+
+
+def _rows(rows, keys):
+    return [dict(row) if hasattr(row, "keys") else dict(zip(keys, row)) for row in rows or []]
+
+
+class EmailOutbox:
+    """Transactional outbox for notification emails, shared by every API worker.
+
+    Emails are rows in email_outbox; any worker process may claim a batch (leased, so a crashed worker's
+    claims are retried by others) and send it from a thread pool. Failed sends back off and retry up to
+    EMAIL_OUTBOX_MAX_ATTEMPTS. Replaces the per-process asyncio email_queue, which lost mail on restart.
+    """
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = int(os.getenv("EMAIL_OUTBOX_CONCURRENCY", "25"))
+        self.poll_interval = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "2"))
+        self.lease_seconds = float(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "120"))
+        self.max_attempts = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "5"))
+        self._sender = None
+        self._dispatcher = None
+        self._wake = None
+        self._in_flight = set()
+        self.sent = 0
+        self.failed = 0
+
+    async def enqueue(self, to_email, subject, body):
+        sql, params = convert_sql_for_postgres(
+            "INSERT INTO email_outbox (to_email, subject, body, status, attempts, available_at) VALUES (?, ?, ?, 'pending', 0, 0)",
+            [to_email, subject, body]
+        )
+        await db_manager.execute_query(sql, params)
+        if self._wake:
+            self._wake.set()
+
+    def start(self, sender):
+        """Start dispatching with sender(to_email, subject, body) -> bool (runs in a worker thread)"""
+        self._sender = sender
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wake = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._run())
+            logger.info("Email outbox dispatcher started (%s concurrent sends)", self.concurrency)
+
+    async def stop(self):
+        """Stop claiming; sends already running finish, unsent claims are retried after their lease"""
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._dispatcher = None
+        if self._in_flight:
+            await asyncio.wait(self._in_flight, timeout=30)
+
+    async def depth(self):
+        sql, params = convert_sql_for_postgres("SELECT COUNT(*) FROM email_outbox WHERE status IN ('pending', 'sending')", [])
+        rows = await db_manager.execute_query(sql, params, fetch=True)
+        return rows[0][0] if rows else 0
+
+    async def stats(self):
+        return {"pending": await self.depth(), "in_flight": len(self._in_flight), "sent": self.sent, "failed": self.failed}
+
+    async def _run(self):
+        while True:
+            free = self.concurrency - len(self._in_flight)
+            claimed = []
+            if free > 0:
+                try:
+                    claimed = await self._claim(free)
+                except Exception as e:
+                    logger.exception("Email outbox claim error: %s", e)
+                for email in claimed:
+                    task = asyncio.create_task(self._deliver(email))
+                    self._in_flight.add(task)
+                    task.add_done_callback(self._in_flight.discard)
+            if len(claimed) < free:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+            elif free <= 0:
+                await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+    async def _claim(self, limit):
+        """Lease up to `limit` due emails; the status check in the outer WHERE keeps two workers off the same row"""
+        now = time.time()
+        token = f"{self.worker_id}:{uuid.uuid4().hex[:8]}"
+        due = "(status = 'pending' AND available_at <= ?) OR (status = 'sending' AND lease_expires_at < ?)"
+        sql, params = convert_sql_for_postgres(
+            f"""UPDATE email_outbox SET status = 'sending', lease_owner = ?, lease_expires_at = ?
+                WHERE id IN (SELECT id FROM email_outbox WHERE {due} ORDER BY id LIMIT ?) AND ({due})""",
+            [token, now + self.lease_seconds, now, now, limit, now, now]
+        )
+        await db_manager.execute_query(sql, params)
+        sql, params = convert_sql_for_postgres(
+            f"SELECT {', '.join(OUTBOX_KEYS)} FROM email_outbox WHERE lease_owner = ? AND status = 'sending'", [token]
+        )
+        return _rows(await db_manager.execute_query(sql, params, fetch=True), OUTBOX_KEYS)
+
+    async def _deliver(self, email):
+        try:
+            ok = await asyncio.to_thread(self._sender, email["to_email"], email["subject"], email["body"])
+            error = None if ok else "send failed"
+        except Exception as e:
+            ok, error = False, str(e)
+        try:
+            if ok:
+                self.sent += 1
+                sql, params = convert_sql_for_postgres(
+                    "UPDATE email_outbox SET status = 'sent', lease_owner = NULL, sent_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    [email["id"]]
+                )
+            else:
+                attempts = (email["attempts"] or 0) + 1
+                status = "failed" if attempts >= self.max_attempts else "pending"
+                if status == "failed":
+                    self.failed += 1
+                # Back off 30s, 60s, 120s... before the next attempt
+                sql, params = convert_sql_for_postgres(
+                    """UPDATE email_outbox SET status = ?, attempts = ?, error = ?, lease_owner = NULL,
+                       available_at = ? WHERE id = ?""",
+                    [status, attempts, error, time.time() + 30 * 2 ** (attempts - 1), email["id"]]
+                )
+            await db_manager.execute_query(sql, params)
+        except Exception as e:
+            logger.warning("Email outbox could not record result for %s: %s", email['to_email'], e)
+
+
+# Global email outbox instance
+email_outbox = EmailOutbox()
@@ -1,5 +1,9 @@
 import smtplib
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
@@ -7,6 +11,12 @@ from email import encoders
 from dotenv import load_dotenv
 
 load_dotenv()
+from rate_limiter import email_rate_limiter, smtp_deferral_code
+from metrics import smtp_send_seconds
+from tracing import tracer
+from logging_config import get_logger
+
+logger = get_logger(__name__)
 
 class EmailService:
     def __init__(self):
@@ -14,44 +24,77 @@ class EmailService:
         self.smtp_port = int(os.getenv("SMTP_PORT"))
         self.smtp_user = os.getenv("SMTP_USER")
         self.smtp_pass = os.getenv("SMTP_PASS")
+        self.use_tls = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
         self.from_email = os.getenv("FROM_EMAIL")
+        self.rate_limiter = email_rate_limiter
+        self.deferral_retries = int(os.getenv("EMAIL_DEFERRAL_RETRIES", "2"))
+        self.batch_size = int(os.getenv("EMAIL_BATCH_SIZE", "50"))  # Messages per SMTP connection
+        self.bulk_connections = int(os.getenv("EMAIL_BULK_CONNECTIONS", "3"))
+        self._tracking_lock = threading.Lock()
         
         # Global tracking file to prevent duplicate emails across sessions
         self.tracking_file = "sent_emails.log"
 
-    def _is_email_already_sent(self, to_email, participant_name, event_name, token_id):
-        """Check if this exact email was already sent"""
-        email_key = f"{to_email}|{participant_name}|{event_name}|{token_id}"
+    def _load_sent_email_keys(self):
+        """Read the tracking file once into a set of sent email keys"""
         if os.path.exists(self.tracking_file):
             with open(self.tracking_file, 'r') as f:
-                sent_emails = f.read().splitlines()
-                return email_key in sent_emails
-        return False
+                return set(f.read().splitlines())
+        return set()
+
+    def _is_email_already_sent(self, to_email, participant_name, event_name, token_id, sent_keys=None):
+        """Check if this exact email was already sent"""
+        email_key = f"{to_email}|{participant_name}|{event_name}|{token_id}"
+        if sent_keys is None:
+            sent_keys = self._load_sent_email_keys()
+        return email_key in sent_keys
     
     def _mark_email_as_sent(self, to_email, participant_name, event_name, token_id):
         """Mark this email as sent to prevent duplicates"""
         email_key = f"{to_email}|{participant_name}|{event_name}|{token_id}"
-        with open(self.tracking_file, 'a') as f:
-            f.write(f"{email_key}\n")
+        with self._tracking_lock:
+            with open(self.tracking_file, 'a') as f:
+                f.write(f"{email_key}\n")
 
-    def send_certificate_email(self, to_email, participant_name, event_name, certificate_path, contract_address, token_id, poa_token_id=None, force_resend=False):
-        """Send certificate email with attachment and wallet instructions"""
+    def send_certificate_email(self, to_email, participant_name, event_name, certificate_path, contract_address, token_id, poa_token_id=None, force_resend=False, certificate_bytes=None):
+        """Send certificate email with attachment and wallet instructions.
+
+        certificate_bytes lets callers attach an in-memory render instead of reading certificate_path from disk.
+        """
         try:
             # Check if email was already sent (unless force_resend is True)
             if not force_resend and self._is_email_already_sent(to_email, participant_name, event_name, token_id):
-                print(f"Email already sent to {to_email} for {event_name} token {token_id}. Skipping.")
+                logger.info("Email already sent to %s for %s token %s. Skipping.", to_email, event_name, token_id)
                 return {"success": True, "message": f"Email already sent to {to_email} (duplicate prevented)"}
+
+            text = self._build_certificate_message(to_email, participant_name, event_name, certificate_path,
+                                                   contract_address, token_id, poa_token_id, certificate_bytes)
+
+            # Send email
+            logger.debug("Sending email to: %s", to_email)
+            self._send_with_rate_limit(to_email, text)
+            logger.info("Email successfully sent to: %s", to_email)
             
-            # Create message with proper multipart setup
-            msg = MIMEMultipart('mixed')
-            msg['From'] = self.from_email
-            msg['To'] = to_email
-            msg['Subject'] = f"0x.Day | Your {event_name} NFT Certificate is Ready"
-            
-            print(f"Preparing email for: {to_email} - {participant_name}")
+            # Mark email as sent to prevent future duplicates
+            self._mark_email_as_sent(to_email, participant_name, event_name, token_id)
+
+            return {"success": True, "message": f"Email sent to {to_email}"}
 
-            # HTML Email body with formatting
-            html_body = f"""
+        except Exception as e:
+            return {"success": False, "error": str(e), "deferred": smtp_deferral_code(e) is not None}
+
+    def _build_certificate_message(self, to_email, participant_name, event_name, certificate_path, contract_address, token_id, poa_token_id=None, certificate_bytes=None):
+        """Build the full MIME message (HTML body + certificate attachment) and return it as a string"""
+        # Create message with proper multipart setup
+        msg = MIMEMultipart('mixed')
+        msg['From'] = self.from_email
+        msg['To'] = to_email
+        msg['Subject'] = f"0x.Day | Your {event_name} NFT Certificate is Ready"
+        
+        logger.debug("Preparing email for: %s - %s", to_email, participant_name)
+
+        # HTML Email body with formatting
+        html_body = f"""
 <!DOCTYPE html>
 <html>
 <head>
@@ -291,8 +334,8 @@ class EmailService:
 </html>
             """
 
-            # Create plain text version for compatibility
-            plain_body = f"""
+        # Create plain text version for compatibility
+        plain_body = f"""
 Dear {participant_name},
 
 Your certificate for participating in {event_name} has been minted as an NFT and is ready for you to claim.
@@ -383,85 +426,233 @@ This is an automated message. Please do not reply to this email.
 For assistance or inquiries, please contact the event organizers.
             """
 
-            # Attach HTML version only to avoid duplicate emails
-            msg.attach(MIMEText(html_body, 'html'))
-
-            # Attach certificate file (if provided)
-            if certificate_path and os.path.exists(certificate_path):
-                with open(certificate_path, "rb") as attachment:
-                    # Use proper MIME type for JPEG images
-                    part = MIMEBase('image', 'jpeg')
-                    part.set_payload(attachment.read())
-                    encoders.encode_base64(part)
-                    
-                    # Clean filename and proper header
-                    filename = os.path.basename(certificate_path)
-                    part.add_header(
-                        'Content-Disposition',
-                        f'attachment; filename="{filename}"'
-                    )
-                    part.add_header('Content-ID', f'<{filename}>')
-                    msg.attach(part)
-                    print(f"Certificate attached: {certificate_path} ({os.path.getsize(certificate_path)} bytes)")
-            elif certificate_path:
-                print(f"Certificate file not found: {certificate_path}")
-            else:
-                print("No certificate attachment for resend email")
+        # Attach HTML version only to avoid duplicate emails
+        msg.attach(MIMEText(html_body, 'html'))
 
-            # Send email
-            print(f"Sending email to: {to_email}")
-            server = smtplib.SMTP(self.smtp_host, self.smtp_port)
+        # Attach certificate (in-memory bytes first, then the file on disk)
+        if certificate_bytes is None and certificate_path and os.path.exists(certificate_path):
+            with open(certificate_path, "rb") as attachment:
+                certificate_bytes = attachment.read()
+
+        if certificate_bytes is not None:
+            # Use proper MIME type for JPEG images
+            part = MIMEBase('image', 'jpeg')
+            part.set_payload(certificate_bytes)
+            encoders.encode_base64(part)
+            
+            # Clean filename and proper header
+            filename = os.path.basename(certificate_path) if certificate_path else f"{participant_name.replace(' ', '_')}_certificate.jpg"
+            part.add_header(
+                'Content-Disposition',
+                f'attachment; filename="{filename}"'
+            )
+            part.add_header('Content-ID', f'<{filename}>')
+            msg.attach(part)
+            logger.debug("Certificate attached: %s (%s bytes)", filename, len(certificate_bytes))
+        elif certificate_path:
+            logger.warning("Certificate file not found: %s", certificate_path)
+        else:
+            logger.debug("No certificate attachment for resend email")
+
+        return msg.as_string()
+
+    def _open_smtp_connection(self):
+        """Connect, upgrade to TLS and authenticate; the EHLO reply tells us whether PIPELINING is offered"""
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port)
+        if self.use_tls:
             server.starttls()
+        if self.smtp_user:
             server.login(self.smtp_user, self.smtp_pass)
-            text = msg.as_string()
-            server.sendmail(self.from_email, [to_email], text)  # Ensure to_email is a list
-            server.quit()
-            print(f"Email successfully sent to: {to_email}")
-            
-            # Mark email as sent to prevent future duplicates
-            self._mark_email_as_sent(to_email, participant_name, event_name, token_id)
-
-            return {"success": True, "message": f"Email sent to {to_email}"}
-
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-
-    def send_bulk_certificate_emails(self, participants_data, event_name, contract_address):
-        """Send certificate emails to multiple participants"""
-        results = []
+        else:
+            server.ehlo_or_helo_if_needed()
+        return server
+
+    def _send_pipelined(self, server, to_email, text):
+        """Send one message on an open connection.
+
+        With PIPELINING (RFC 2920) MAIL/RCPT/DATA go out in a single write and the three replies are read
+        back together, so each message costs two round trips instead of four.
+        """
+        if not server.has_extn('pipelining'):
+            server.sendmail(self.from_email, [to_email], text)
+            return
+
+        server.send(f"mail FROM:{smtplib.quoteaddr(self.from_email)}\r\n"
+                    f"rcpt TO:{smtplib.quoteaddr(to_email)}\r\n"
+                    f"data\r\n")
+        (mail_code, mail_resp), (rcpt_code, rcpt_resp), (data_code, data_resp) = [server.getreply() for _ in range(3)]
+
+        if mail_code != 250 or rcpt_code not in (250, 251) or data_code != 354:
+            if data_code == 354:
+                # Server accepted DATA despite a failed envelope - end the empty message before resetting
+                server.send(".\r\n")
+                server.getreply()
+            server.rset()
+            if mail_code != 250:
+                raise smtplib.SMTPSenderRefused(mail_code, mail_resp, self.from_email)
+            if rcpt_code not in (250, 251):
+                raise smtplib.SMTPRecipientsRefused({to_email: (rcpt_code, rcpt_resp)})
+            raise smtplib.SMTPDataError(data_code, data_resp)
+
+        body = smtplib.quotedata(text)
+        if not body.endswith("\r\n"):
+            body += "\r\n"
+        server.send(body + ".\r\n")
+        code, resp = server.getreply()
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPDataError(code, resp)
+
+    def _send_with_rate_limit(self, to_email, text, session=None):
+        """Send one message within the provider/domain budget, backing off and retrying on 4xx deferrals.
+
+        Pass an SMTPSession to reuse its connection; otherwise a connection is opened for this message only.
+        """
+        own_session = session is None
+        if own_session:
+            session = SMTPSession(self)
+        try:
+            attempt = 0
+            while True:
+                self.rate_limiter.acquire(self.smtp_host, to_email)
+                try:
+                    session.send(to_email, text)
+                    self.rate_limiter.record_success(self.smtp_host, to_email)
+                    return
+                except smtplib.SMTPException as e:
+                    if smtp_deferral_code(e) is None:
+                        raise
+                    self.rate_limiter.record_deferral(self.smtp_host, to_email, e)
+                    if attempt >= self.deferral_retries:
+                        raise
+                    attempt += 1
+                    logger.warning("Retrying deferred email to %s (%s/%s)", to_email, attempt, self.deferral_retries)
+        finally:
+            if own_session:
+                session.close()
+
+    def _send_batch(self, batch, event_name, contract_address, results):
+        """Send a batch of messages over one reused connection, pushing each result as soon as it is known"""
+        session = SMTPSession(self)
+        try:
+            for participant in batch:
+                try:
+                    text = self._build_certificate_message(
+                        participant['email'], participant['name'], event_name, participant['certificate_path'],
+                        contract_address, participant['token_id'], participant.get('poa_token_id'),
+                        participant.get('certificate_bytes')
+                    )
+                    self._send_with_rate_limit(participant['email'], text, session=session)
+                    self._mark_email_as_sent(participant['email'], participant['name'], event_name, participant['token_id'])
+                    logger.info("Email successfully sent to: %s", participant['email'])
+                    result = {"success": True, "message": f"Email sent to {participant['email']}"}
+                except Exception as e:
+                    logger.warning("Email to %s failed: %s", participant['email'], e)
+                    result = {"success": False, "error": str(e), "deferred": smtp_deferral_code(e) is not None}
+                results.put({"email": participant['email'], "name": participant['name'], "result": result})
+        finally:
+            session.close()
+
+    def iter_bulk_certificate_emails(self, participants_data, event_name, contract_address):
+        """Send certificate emails in batches over parallel reused connections, yielding each result as it completes.
+
+        Results arrive in completion order, not input order.
+        """
+        pending = []
         sent_emails = set()  # Track sent emails to prevent duplicates
-        
+        already_sent = self._load_sent_email_keys()
+
         for participant in participants_data:
-            # Check for duplicates
             email_key = f"{participant['email']}_{participant['name']}_{event_name}"
             if email_key in sent_emails:
-                print(f"Skipping duplicate email for: {participant['email']}")
-                results.append({
+                logger.info("Skipping duplicate email for: %s", participant['email'])
+                yield {
                     "email": participant['email'],
                     "name": participant['name'],
                     "result": {"success": False, "error": "Duplicate email prevented"}
-                })
+                }
                 continue
-            
             sent_emails.add(email_key)
-            result = self.send_certificate_email(
-                to_email=participant['email'],
-                participant_name=participant['name'],
-                event_name=event_name,
-                certificate_path=participant['certificate_path'],
-                contract_address=contract_address,
-                token_id=participant['token_id'],
-                poa_token_id=participant.get('poa_token_id')  # Add PoA token ID
-            )
-            
-            results.append({
-                "email": participant['email'],
-                "name": participant['name'],
-                "result": result
-            })
-        
+
+            if self._is_email_already_sent(participant['email'], participant['name'], event_name, participant['token_id'], already_sent):
+                logger.info("Email already sent to %s for %s token %s. Skipping.", participant['email'], event_name, participant['token_id'])
+                yield {
+                    "email": participant['email'],
+                    "name": participant['name'],
+                    "result": {"success": True, "message": f"Email already sent to {participant['email']} (duplicate prevented)"}
+                }
+                continue
+            pending.append(participant)
+
+        if not pending:
+            return
+
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        results = queue.Queue()
+        with ThreadPoolExecutor(max_workers=min(self.bulk_connections, len(batches))) as executor:
+            futures = [executor.submit(tracer.wrap(self._send_batch), batch, event_name, contract_address, results) for batch in batches]
+            for _ in range(len(pending)):
+                yield results.get()
+            for future in futures:
+                future.result()
+
+    def send_bulk_certificate_emails(self, participants_data, event_name, contract_address, progress_callback=None):
+        """Send certificate emails to multiple participants.
+
+        progress_callback(entry, completed, total) is called after every message so callers can report live progress.
+        """
+        results = []
+        total = len(participants_data)
+
+        for entry in self.iter_bulk_certificate_emails(participants_data, event_name, contract_address):
+            results.append(entry)
+            if progress_callback:
+                progress_callback(entry, len(results), total)
+
         return results
 
+
+class SMTPSession:
+    """A lazily opened SMTP connection that is reused across messages and reopened once if the server dropped it"""
+
+    def __init__(self, service):
+        self.service = service
+        self.server = None
+        self.messages_sent = 0
+
+    def send(self, to_email, text):
+        started = time.perf_counter()
+        try:
+            with tracer.child_span("smtp.send", **{"smtp.host": self.service.smtp_host}):
+                self._send(to_email, text)
+        except Exception:
+            smtp_send_seconds.observe(time.perf_counter() - started, outcome="failed")
+            raise
+        smtp_send_seconds.observe(time.perf_counter() - started, outcome="sent")
+        self.messages_sent += 1
+
+    def _send(self, to_email, text):
+        reused = self.server is not None
+        if self.server is None:
+            self.server = self.service._open_smtp_connection()
+        try:
+            self.service._send_pipelined(self.server, to_email, text)
+        except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+            self.server = None
+            if not reused:
+                raise
+            # Idle or per-connection message limit - reconnect and try this message once more
+            self.server = self.service._open_smtp_connection()
+            self.service._send_pipelined(self.server, to_email, text)
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
 # Test function
 if __name__ == "__main__":
     email_service = EmailService()
@@ -0,0 +1,609 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+from database import db_manager, convert_sql_for_postgres
+from bulk_certificate_processor import bulk_processor, ProcessingControl, ProcessingCancelled
+from stage_pipeline import Stage, StagePipeline
+from progress_broker import progress_broker
+from tracing import tracer
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+JOB_KEYS = ["id", "event_id", "kind", "status", "total_participants", "completed", "failed", "successful_emails",
+            "failed_emails", "current_step", "error", "lease_owner", "lease_expires_at", "heartbeat_at",
+            "started_at", "finished_at", "created_at", "trace_parent"]
+ITEM_KEYS = ["participant_id", "step", "status", "attempts", "certificate_path", "image_hash", "metadata_hash",
+             "metadata_url", "tx_hash", "token_id", "email_sent", "error"]
+
+# Per-participant steps in order; job_items.step holds the last one completed
+STEPS = ["queued", "rendered", "pinned", "minted", "recorded", "emailed"]
+ACTIVE_STATUSES = ("starting", "running", "paused")
+
+
+def _rows(rows, keys):
+    return [dict(row) if hasattr(row, "keys") else dict(zip(keys, row)) for row in rows or []]
+
+
+def task_status(job):
+    """Shape a jobs row like the task status the dashboard expects"""
+    return {
+        "taskId": job["id"],
+        "event_id": job["event_id"],
+        "status": job["status"],
+        "total_participants": job["total_participants"],
+        "completed": job["completed"],
+        "failed": job["failed"],
+        "successful_emails": job["successful_emails"],
+        "failed_emails": job["failed_emails"],
+        "current_step": job["current_step"],
+        "started_at": str(job["started_at"] or job["created_at"]),
+        "finished_at": str(job["finished_at"]) if job["finished_at"] else None,
+        "worker": job["lease_owner"],
+        "error": job["error"]
+    }
+
+
+class JobLeaseLost(Exception):
+    """Another worker took over the job after our lease expired"""
+
+
+class CertificateJobQueue:
+    """Database-backed queue for background certificate generation.
+
+    A job owns one job_items row per participant. Workers lease a job (renewed by a heartbeat while it runs),
+    and every participant step (render -> pin -> mint -> DB update -> email) is checkpointed on its item, so a
+    job interrupted by a crash or a restart is picked up by any worker and resumes without repeating paid work.
+    Within a worker the steps run as a StagePipeline, each stage with its own pool.
+    """
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = float(os.getenv("CERT_JOB_LEASE_SECONDS", "60"))
+        self.poll_interval = float(os.getenv("CERT_JOB_POLL_SECONDS", "5"))
+        self.max_attempts = int(os.getenv("CERT_JOB_ITEM_MAX_ATTEMPTS", "3"))
+        # How often a running job re-reads pause/cancel (doubles as the lease heartbeat)
+        self.control_poll = min(float(os.getenv("CERT_JOB_CONTROL_POLL_SECONDS", "2")), self.lease_seconds / 3)
+        self.drain_seconds = float(os.getenv("CERT_JOB_DRAIN_SECONDS", "30"))
+        # Stage pool sizes: rendering is CPU-bound (processes), pin/confirm/email are I/O-bound (tasks)
+        self.render_processes = int(os.getenv("CERT_RENDER_PROCESSES", str(max(1, (os.cpu_count() or 2) - 1))))
+        self.pin_workers = int(os.getenv("CERT_PIN_WORKERS", "8"))
+        self.confirm_workers = int(os.getenv("CERT_CONFIRM_WORKERS", "16"))
+        self.email_workers = int(os.getenv("CERT_EMAIL_WORKERS", "8"))
+        self.queue_size = int(os.getenv("CERT_PIPELINE_QUEUE_SIZE", "16"))
+        self._render_pool = None
+        self._pipelines = {}
+        self._last_refresh = 0
+        self._wake = None
+        self._worker = None
+        self._stopping = False
+        self._current_job = None
+        self._control = None
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    async def enqueue(self, event_id):
+        """Queue certificate generation for every PoA holder still without a certificate; returns the job.
+
+        An event has at most one active job, so a repeated start returns the existing one.
+        """
+        sql, params = convert_sql_for_postgres(
+            "SELECT id FROM jobs WHERE kind = 'certificates' AND event_id = ? AND status IN ('starting', 'running', 'paused')",
+            [event_id]
+        )
+        active = await db_manager.execute_query(sql, params, fetch=True)
+        if active:
+            return await self.get_job(active[0]["id"] if hasattr(active[0], "keys") else active[0][0])
+
+        participants = await bulk_processor.get_poa_holders_for_event(event_id, participant_ids=None)
+        job_id = f"cert_gen_{event_id}_{uuid.uuid4().hex[:12]}"
+        if not participants:
+            sql, params = convert_sql_for_postgres(
+                """INSERT INTO jobs (id, kind, event_id, status, current_step, error, finished_at)
+                   VALUES (?, 'certificates', ?, 'completed', 'No PoA holders found', 'No participants with transferred PoA found', CURRENT_TIMESTAMP)""",
+                [job_id, event_id]
+            )
+            await db_manager.execute_query(sql, params)
+            return await self.get_job(job_id)
+
+        statements = [(
+            """INSERT INTO jobs (id, kind, event_id, status, total_participants, current_step, trace_parent)
+               VALUES (?, 'certificates', ?, 'starting', ?, 'Queued...', ?)""",
+            [job_id, event_id, len(participants), tracer.traceparent()]
+        )]
+        for participant in participants:
+            statements.append((
+                "INSERT INTO job_items (job_id, participant_id, step, status) VALUES (?, ?, 'queued', 'pending')",
+                [job_id, participant["id"]]
+            ))
+        await db_manager.execute_many([convert_sql_for_postgres(sql, params) for sql, params in statements])
+
+        logger.info("Certificate job %s: %s participants queued", job_id, len(participants))
+        self._notify()
+        return await self._publish(job_id)
+
+    async def get_job(self, job_id):
+        sql, params = convert_sql_for_postgres(f"SELECT {', '.join(JOB_KEYS)} FROM jobs WHERE id = ?", [job_id])
+        jobs = _rows(await db_manager.execute_query(sql, params, fetch=True), JOB_KEYS)
+        return jobs[0] if jobs else None
+
+    async def get_items(self, job_id):
+        sql, params = convert_sql_for_postgres(
+            f"SELECT {', '.join(ITEM_KEYS)} FROM job_items WHERE job_id = ? ORDER BY id", [job_id]
+        )
+        return _rows(await db_manager.execute_query(sql, params, fetch=True), ITEM_KEYS)
+
+    async def latest_job(self, event_id):
+        """The event's most recent certificate job (active or finished), or None"""
+        sql, params = convert_sql_for_postgres(
+            f"SELECT {', '.join(JOB_KEYS)} FROM jobs WHERE kind = 'certificates' AND event_id = ? ORDER BY created_at DESC LIMIT 1",
+            [event_id]
+        )
+        jobs = _rows(await db_manager.execute_query(sql, params, fetch=True), JOB_KEYS)
+        return jobs[0] if jobs else None
+
+    async def active_jobs(self):
+        sql, params = convert_sql_for_postgres(
+            f"SELECT {', '.join(JOB_KEYS)} FROM jobs WHERE kind = 'certificates' AND status IN ('starting', 'running', 'paused') ORDER BY created_at",
+            []
+        )
+        return _rows(await db_manager.execute_query(sql, params, fetch=True), JOB_KEYS)
+
+    async def cancel(self, job_id):
+        """Stop a job at its next checkpoint; returns False if it does not exist"""
+        job = await self.get_job(job_id)
+        if not job:
+            return False
+        if job["status"] in ACTIVE_STATUSES:
+            await self._set_job(job_id, status="cancelled", current_step="Cancelled by user", finished=True)
+        return True
+
+    async def toggle_pause(self, job_id):
+        """Pause a running job or resume a paused one; returns the new status (None if the job does not exist)"""
+        job = await self.get_job(job_id)
+        if not job:
+            return None
+        if job["status"] in ("starting", "running"):
+            await self._set_job(job_id, status="paused", current_step="Paused by user")
+            return "paused"
+        if job["status"] == "paused":
+            # The leasing worker is held at its pause gate and opens it on its next poll; an unleased job is
+            # picked up by whichever worker polls next
+            await self._set_job(job_id, status="running", current_step="Resuming processing...")
+            self._notify()
+            return "running"
+        return job["status"]
+
+    async def _set_job(self, job_id, finished=False, **fields):
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        if finished:
+            assignments += ", finished_at = CURRENT_TIMESTAMP"
+        sql, params = convert_sql_for_postgres(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+        await db_manager.execute_query(sql, params)
+        await self._publish(job_id)
+
+    async def _publish(self, job_id):
+        """Push the job's current state to progress stream subscribers; returns the job"""
+        job = await self.get_job(job_id)
+        if job:
+            progress_broker.publish(job["event_id"], task_status(job))
+        return job
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._worker = asyncio.create_task(self._run_worker())
+            logger.info("Certificate job worker %s started", self.worker_id)
+
+    async def stop(self):
+        """Stop at the next checkpoint (draining an in-flight mint), then hand the lease back for another worker"""
+        self._stopping = True
+        if self._control:
+            self._control.cancel("worker stopping")
+        if self._worker:
+            self._notify()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._worker), timeout=self.drain_seconds)
+            except asyncio.TimeoutError:
+                logger.warning("Certificate job worker did not drain within %ss, cancelling", self.drain_seconds)
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._worker.cancel()
+            try:
+                await self._worker
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._worker = None
+        if self._current_job:
+            await self._release(self._current_job)
+        if self._render_pool:
+            self._render_pool.shutdown(wait=False, cancel_futures=True)
+            self._render_pool = None
+
+    def _notify(self):
+        if self._wake:
+            self._wake.set()
+
+    async def _run_worker(self):
+        while not self._stopping:
+            try:
+                job_id = await self._claim()
+                if job_id:
+                    await self._run_job(job_id)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Certificate job worker error: %s", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _claim(self):
+        """Lease the oldest runnable job that nobody holds (or whose holder stopped heartbeating)"""
+        now = time.time()
+        sql, params = convert_sql_for_postgres(
+            """SELECT id FROM jobs WHERE kind = 'certificates' AND status IN ('starting', 'running')
+               AND (lease_owner IS NULL OR lease_expires_at < ?) ORDER BY created_at LIMIT 5""",
+            [now]
+        )
+        for row in await db_manager.execute_query(sql, params, fetch=True) or []:
+            job_id = row["id"] if hasattr(row, "keys") else row[0]
+            # Conditional update: only one worker can move the lease, the re-read tells us who won
+            sql, params = convert_sql_for_postgres(
+                """UPDATE jobs SET lease_owner = ?, lease_expires_at = ?, heartbeat_at = ?, status = 'running',
+                   started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
+                   WHERE id = ? AND status IN ('starting', 'running') AND (lease_owner IS NULL OR lease_expires_at < ?)""",
+                [self.worker_id, now + self.lease_seconds, now, job_id, now]
+            )
+            await db_manager.execute_query(sql, params)
+            job = await self.get_job(job_id)
+            if job and job["lease_owner"] == self.worker_id:
+                return job_id
+        return None
+
+    async def _heartbeat(self, job_id):
+        """Extend our lease; returns the job status, raises JobLeaseLost if another worker owns the job"""
+        now = time.time()
+        sql, params = convert_sql_for_postgres(
+            "UPDATE jobs SET lease_expires_at = ?, heartbeat_at = ? WHERE id = ? AND lease_owner = ?",
+            [now + self.lease_seconds, now, job_id, self.worker_id]
+        )
+        await db_manager.execute_query(sql, params)
+        job = await self.get_job(job_id)
+        if not job or job["lease_owner"] != self.worker_id:
+            raise JobLeaseLost(job_id)
+        return job["status"]
+
+    async def _watch(self, job_id, control):
+        """Renew the lease and mirror pause/cancel from the jobs row onto the running job's control"""
+        while True:
+            await asyncio.sleep(self.control_poll)
+            try:
+                status = await self._heartbeat(job_id)
+            except JobLeaseLost:
+                control.cancel("lease taken over by another worker")
+                return
+            except Exception as e:
+                logger.warning("Certificate job %s heartbeat failed: %s", job_id, e)
+                continue
+            if status == "cancelled":
+                control.cancel("cancelled by user")
+            elif status == "paused":
+                control.pause()
+            else:
+                control.resume()
+
+    async def _release(self, job_id):
+        sql, params = convert_sql_for_postgres(
+            "UPDATE jobs SET lease_owner = NULL, lease_expires_at = NULL WHERE id = ? AND lease_owner = ?",
+            [job_id, self.worker_id]
+        )
+        try:
+            await db_manager.execute_query(sql, params)
+        except Exception as e:
+            logger.warning("Could not release certificate job %s: %s", job_id, e)
+
+    async def _run_job(self, job_id):
+        try:
+            trace_parent = (await self.get_job(job_id) or {}).get("trace_parent")
+        except Exception:
+            trace_parent = None
+        # Continue the trace of the request that queued the job (each resume is a new span in it)
+        with tracer.span("certificate_job", parent=trace_parent, **{"job.id": job_id}):
+            await self._run_leased_job(job_id)
+
+    async def _run_leased_job(self, job_id):
+        control = ProcessingControl()
+        self._current_job = job_id
+        self._control = control
+        watcher = asyncio.create_task(self._watch(job_id, control))
+        try:
+            job = await self.get_job(job_id)
+            event_details = await bulk_processor.get_event_details(job["event_id"])
+            if not event_details:
+                await self._set_job(job_id, status="failed", error="Event not found", finished=True)
+                return
+
+            # Each pass runs every pending item through the pipeline; items that failed a step but still have
+            # attempts left are pending again and go round once more
+            while True:
+                items = [item for item in await self.get_items(job_id) if item["status"] == "pending"]
+                if not items:
+                    break
+                participants = await bulk_processor.get_poa_holders_for_event(
+                    job["event_id"], participant_ids=[item["participant_id"] for item in items]
+                )
+                by_id = {p["id"]: p for p in participants}
+
+                batch = []
+                for item in items:
+                    participant = by_id.get(item["participant_id"])
+                    if participant is None:
+                        await self._save_item(job_id, item["participant_id"], status="failed", error="Participant no longer holds a PoA")
+                        continue
+                    batch.append({
+                        "item": item,
+                        "participant": participant,
+                        "done": STEPS.index(item["step"] or "queued"),
+                        "certificate_path": item["certificate_path"],
+                        "image_bytes": None
+                    })
+                await self._set_job(job_id, current_step=f"Processing {len(batch)} participants (render → pin → mint → email)...")
+                pipeline = self._pipeline(job, event_details, control)
+                self._pipelines[job_id] = pipeline
+                try:
+                    await pipeline.run(batch)
+                finally:
+                    self._pipelines.pop(job_id, None)
+                await self._refresh_counts(job_id)
+
+            job = await self.get_job(job_id)
+            await self._set_job(
+                job_id, status="completed", finished=True,
+                current_step=f"✅ Completed! Emails sent: {job['successful_emails']}/{job['total_participants']}"
+            )
+            logger.info("Certificate job %s completed: %s ok, %s failed", job_id, job['completed'], job['failed'])
+        except ProcessingCancelled as e:
+            # Finished steps are saved on the items, so a resumed job reuses the rendered images and pinned CIDs
+            await self._refresh_counts(job_id)
+            logger.warning("Certificate job %s stopped: %s", job_id, e)
+        except Exception as e:
+            logger.exception("Certificate job %s failed: %s", job_id, e)
+            await self._set_job(job_id, status="failed", error=str(e), current_step=f"Error: {str(e)}",
+                                finished=True)
+        finally:
+            watcher.cancel()
+            await self._release(job_id)
+            self._current_job = None
+            self._control = None
+
+    async def _refresh_counts(self, job_id):
+        sql, params = convert_sql_for_postgres(
+            """UPDATE jobs SET
+               completed = (SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status = 'done'),
+               failed = (SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status = 'failed'),
+               successful_emails = (SELECT COUNT(*) FROM job_items WHERE job_id = ? AND email_sent = 1),
+               failed_emails = (SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status IN ('done', 'failed') AND email_sent = 0)
+               WHERE id = ?""",
+            [job_id, job_id, job_id, job_id, job_id]
+        )
+        await db_manager.execute_query(sql, params)
+        self._last_refresh = time.monotonic()
+        await self._publish(job_id)
+
+    async def _progress(self, job_id):
+        """Refresh the job's counters, at most once a second while items stream through"""
+        if time.monotonic() - self._last_refresh >= 1:
+            await self._refresh_counts(job_id)
+
+    def pipeline_stats(self):
+        return {job_id: pipeline.stats() for job_id, pipeline in self._pipelines.items()}
+
+    # ------------------------------------------------------------------
+    # Participant steps
+    # ------------------------------------------------------------------
+
+    def _get_render_pool(self):
+        if self.render_processes <= 0:
+            return None  # Render inline on the event loop
+        if self._render_pool is None:
+            # spawn: forking a process that already runs threads is unsafe
+            self._render_pool = ProcessPoolExecutor(self.render_processes, mp_context=multiprocessing.get_context("spawn"))
+        return self._render_pool
+
+    def _pipeline(self, job, event_details, control):
+        """render (process pool) -> pin -> mint (one nonce-ordered sender) -> confirm + record -> email"""
+        def bind(step):
+            stage = step.__name__.strip("_").replace("_step", "")
+
+            async def run(ctx):
+                try:
+                    with tracer.child_span(f"stage {stage}", **{"participant.id": ctx["participant"]["id"]}):
+                        return await step(job, event_details, control, ctx)
+                except ProcessingCancelled:
+                    raise
+                except Exception as e:
+                    # e.g. a receipt timeout: counts as an attempt, the saved tx hash is settled on the retry
+                    return await self._fail_step(job["id"], ctx["item"], str(e))
+            return run
+
+        return StagePipeline([
+            Stage("render", bind(self._render_step), max(1, self.render_processes)),
+            Stage("pin", bind(self._pin_step), self.pin_workers),
+            Stage("mint", bind(self._mint_step), 1),
+            Stage("confirm", bind(self._confirm_step), self.confirm_workers),
+            Stage("email", bind(self._email_step), self.email_workers)
+        ], queue_size=self.queue_size, control=control)
+
+    async def _save_item(self, job_id, participant_id, **fields):
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        sql, params = convert_sql_for_postgres(
+            f"UPDATE job_items SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE job_id = ? AND participant_id = ?",
+            list(fields.values()) + [job_id, participant_id]
+        )
+        await db_manager.execute_query(sql, params)
+
+    async def _fail_step(self, job_id, item, error):
+        """Count a failed attempt; the item is retried on the next pass until it runs out of attempts"""
+        attempts = (item["attempts"] or 0) + 1
+        status = "failed" if attempts >= self.max_attempts else "pending"
+        logger.warning("Certificate job %s: participant %s attempt %s failed: %s", job_id, item['participant_id'], attempts, error)
+        await self._save_item(job_id, item["participant_id"], attempts=attempts, status=status, error=error)
+        await self._progress(job_id)
+        return False
+
+    # Every step skips work an earlier run already saved on the item. Pause/cancel checkpoints only precede
+    # work before the mint; once a mint is broadcast the participant is recorded and emailed before stopping.
+
+    async def _render_step(self, job, event_details, control, ctx):
+        """Render (reusing the earlier image while it is still in the cache or on disk)"""
+        participant, item = ctx["participant"], ctx["item"]
+        if ctx["done"] >= STEPS.index("rendered"):
+            ctx["image_bytes"] = bulk_processor.cert_generator.get_cached_certificate(
+                participant["name"], event_details["name"], ctx["certificate_path"]
+            )
+        if ctx["image_bytes"] is not None:
+            return True
+        if ctx["done"] < STEPS.index("minted"):
+            await control.checkpoint()
+        cert_result = await bulk_processor.cert_generator.generate_certificate(
+            participant_name=participant["name"],
+            event_name=event_details["name"],
+            event_date=event_details["date"],
+            participant_email=participant["email"],
+            team_name=participant["team_name"],
+            template_filename=event_details.get("template"),
+            executor=self._get_render_pool()
+        )
+        if not cert_result["success"]:
+            return await self._fail_step(job["id"], item, f"Certificate generation failed: {cert_result.get('error')}")
+        ctx["certificate_path"] = cert_result["file_path"]
+        ctx["image_bytes"] = cert_result.get("image_bytes")
+        if ctx["done"] < STEPS.index("rendered"):
+            ctx["done"] = STEPS.index("rendered")
+            await self._save_item(job["id"], participant["id"], step="rendered", certificate_path=ctx["certificate_path"])
+        return True
+
+    async def _pin_step(self, job, event_details, control, ctx):
+        """Pin to IPFS (falls back to local storage like the synchronous path)"""
+        participant, item = ctx["participant"], ctx["item"]
+        if ctx["done"] >= STEPS.index("pinned"):
+            return True
+        await control.checkpoint()
+        ipfs_result = await asyncio.to_thread(
+            bulk_processor.cert_generator.upload_to_ipfs,
+            ctx["certificate_path"],
+            {
+                "participant_name": participant["name"],
+                "event_name": event_details["name"],
+                "event_date": event_details["date"],
+                "team_name": participant["team_name"]
+            },
+            ctx["image_bytes"]
+        )
+        if ipfs_result["success"]:
+            item.update(metadata_hash=ipfs_result["metadata_hash"], metadata_url=ipfs_result["metadata_url"],
+                        image_hash=ipfs_result.get("image_hash", ipfs_result["metadata_hash"]))
+        else:
+            logger.warning("IPFS upload failed for %s: %s - using local storage", participant['name'], ipfs_result.get('error'))
+            local_hash = f"local_cert_{participant['id']}_{int(time.time())}"
+            item.update(metadata_hash=local_hash, metadata_url=ctx["certificate_path"], image_hash=local_hash)
+        ctx["done"] = STEPS.index("pinned")
+        await self._save_item(job["id"], participant["id"], step="pinned", metadata_hash=item["metadata_hash"],
+                              metadata_url=item["metadata_url"], image_hash=item["image_hash"])
+        return True
+
+    async def _mint_step(self, job, event_details, control, ctx):
+        """Broadcast the mint (single sender, so nonces go out in order); a recorded tx hash is never re-sent"""
+        participant, item = ctx["participant"], ctx["item"]
+        if ctx["done"] >= STEPS.index("minted") or item["tx_hash"]:
+            return True
+        await control.checkpoint()
+
+        async def record_tx(tx_hash):
+            item["tx_hash"] = tx_hash
+            await self._save_item(job["id"], participant["id"], tx_hash=tx_hash)
+
+        mint_result = await bulk_processor.mint_certificate_nft(
+            participant["wallet_address"], job["event_id"], item["metadata_hash"],
+            on_submitted=record_tx, wait_for_receipt=False
+        )
+        if not mint_result["success"]:
+            return await self._fail_step(job["id"], item, mint_result.get("error", "NFT minting failed"))
+        return True
+
+    async def _confirm_step(self, job, event_details, control, ctx):
+        """Wait for the mint receipt, then record the certificate on the participant"""
+        participant, item = ctx["participant"], ctx["item"]
+        pid = participant["id"]
+        if ctx["done"] < STEPS.index("minted"):
+            mint_result = await bulk_processor.settle_certificate_mint(item["tx_hash"])
+            if not mint_result["success"]:
+                if mint_result.get("reverted"):
+                    # Reverted on chain: nothing was minted, a retry sends a fresh transaction
+                    await self._save_item(job["id"], pid, tx_hash=None)
+                return await self._fail_step(job["id"], item, mint_result.get("error", "NFT minting failed"))
+            item.update(tx_hash=mint_result["tx_hash"], token_id=str(mint_result["token_id"]))
+            ctx["done"] = STEPS.index("minted")
+            await self._save_item(job["id"], pid, step="minted", tx_hash=item["tx_hash"], token_id=item["token_id"])
+
+        if ctx["done"] < STEPS.index("recorded"):
+            await bulk_processor.update_certificate_status(
+                pid, item["token_id"], item["tx_hash"], ctx["certificate_path"],
+                {"image_hash": item["image_hash"], "metadata_hash": item["metadata_hash"], "metadata_url": item["metadata_url"]}
+            )
+            ctx["done"] = STEPS.index("recorded")
+            await self._save_item(job["id"], pid, step="recorded")
+        return True
+
+    async def _email_step(self, job, event_details, control, ctx):
+        """Email the certificate (only the email can still fail here; the certificate itself is done)"""
+        participant, item = ctx["participant"], ctx["item"]
+        email_sent = bool(item["email_sent"])
+        email_error = None
+        if not email_sent:
+            try:
+                email_result = await asyncio.to_thread(
+                    bulk_processor.email_service.send_certificate_email,
+                    to_email=participant["email"],
+                    participant_name=participant["name"],
+                    event_name=event_details["name"],
+                    certificate_path=ctx["certificate_path"],
+                    contract_address=bulk_processor.contract_address,
+                    token_id=item["token_id"],
+                    poa_token_id=participant["poa_token_id"],
+                    certificate_bytes=ctx["image_bytes"]
+                )
+                email_sent = email_result["success"]
+                email_error = None if email_sent else email_result.get("error", "Unknown email error")
+            except Exception as e:
+                email_error = str(e)
+        if email_sent:
+            await self._save_item(job["id"], participant["id"], step="emailed", status="done", email_sent=1, error=None)
+        else:
+            logger.warning("❌ Email failed for %s: %s", participant['email'], email_error)
+            await self._save_item(job["id"], participant["id"], status="done", email_sent=0, error=email_error)
+        await self._progress(job["id"])
+        return True
+
+
+# Global certificate job queue instance
+certificate_job_queue = CertificateJobQueue()
@@ -0,0 +1,114 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+from dotenv import load_dotenv
+
+from database import db_manager, convert_sql_for_postgres
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+
+class LeaderElection:
+    """Elects one process across all API workers/hosts to run the singleton background loops.
+
+    Leadership is a row in leader_leases renewed every lease/3 seconds. Registered loops (Telegram polling,
+    chain indexer, tx reconciler, ...) start when this process becomes leader and are cancelled if it loses
+    the lease; when the leader dies another worker takes over once the lease expires.
+    """
+
+    def __init__(self, name="background"):
+        self.name = name
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = float(os.getenv("LEADER_LEASE_SECONDS", "30"))
+        self.is_leader = False
+        self.leader = None
+        self._factories = []
+        self._tasks = []
+        self._runner = None
+        self._renewed_at = 0
+
+    def register(self, label, factory):
+        """Run factory() (a coroutine function) only while this process is the leader"""
+        self._factories.append((label, factory))
+
+    async def start(self):
+        """Campaign once right away (a single worker leads immediately), then keep renewing in the background"""
+        await self._campaign()
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the singleton loops and give up the lease so another worker can lead without waiting"""
+        if self._runner:
+            self._runner.cancel()
+            self._runner = None
+        if self.is_leader:
+            await self._step_down()
+            sql, params = convert_sql_for_postgres(
+                "UPDATE leader_leases SET owner = NULL, expires_at = 0 WHERE name = ? AND owner = ?",
+                [self.name, self.owner_id]
+            )
+            try:
+                await db_manager.execute_query(sql, params)
+            except Exception as e:
+                logger.warning("Could not release leader lease: %s", e)
+
+    def status(self):
+        return {"worker": self.owner_id, "is_leader": self.is_leader, "leader": self.leader,
+                "singletons": [label for label, _ in self._factories]}
+
+    async def _try_acquire(self):
+        now = time.time()
+        statements = [
+            ("INSERT INTO leader_leases (name, owner, expires_at) VALUES (?, NULL, 0) ON CONFLICT (name) DO NOTHING", [self.name]),
+            # Take (or renew) the lease only if it is ours, unowned, or expired
+            ("""UPDATE leader_leases SET owner = ?, expires_at = ?
+                WHERE name = ? AND (owner = ? OR owner IS NULL OR expires_at < ?)""",
+             [self.owner_id, now + self.lease_seconds, self.name, self.owner_id, now])
+        ]
+        await db_manager.execute_many([convert_sql_for_postgres(sql, params) for sql, params in statements])
+        sql, params = convert_sql_for_postgres("SELECT owner FROM leader_leases WHERE name = ?", [self.name])
+        rows = await db_manager.execute_query(sql, params, fetch=True)
+        self.leader = (rows[0]["owner"] if hasattr(rows[0], "keys") else rows[0][0]) if rows else None
+        return self.leader == self.owner_id
+
+    async def _campaign(self):
+        try:
+            leading = await self._try_acquire()
+            if leading:
+                self._renewed_at = time.monotonic()
+        except Exception as e:
+            logger.exception("Leader election error: %s", e)
+            # Without a renewal we must assume another worker takes over when our lease runs out
+            leading = self.is_leader and time.monotonic() - self._renewed_at < self.lease_seconds
+        if leading and not self.is_leader:
+            self._step_up()
+        elif not leading and self.is_leader:
+            await self._step_down()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self._campaign()
+
+    def _step_up(self):
+        self.is_leader = True
+        logger.info("👑 [LEADER] %s leads '%s': starting %s", self.owner_id, self.name, ', '.join(label for label, _ in self._factories))
+        self._tasks = [asyncio.create_task(factory()) for _, factory in self._factories]
+
+    async def _step_down(self):
+        self.is_leader = False
+        logger.info("[LEADER] %s no longer leads '%s', stopping singleton loops", self.owner_id, self.name)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+# Global leader election instance
+leader_election = LeaderElection()
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import queue
+import logging
+import logging.handlers
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line (LOG_FORMAT=json) for log shippers"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_levels(value):
+    """'job_queue=DEBUG,telegram=WARNING' -> {'job_queue': 'DEBUG', 'telegram': 'WARNING'}"""
+    levels = {}
+    for part in (value or "").split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+class LoggingConfig:
+    """Leveled logging for the backend.
+
+    Records go through a QueueHandler, so a log call only formats lazily (logger.debug("%s", x) costs
+    nothing when DEBUG is off) and enqueues; a QueueListener thread does the actual writing, so slow
+    stdout/pipes never block the event loop. LOG_LEVEL sets the default and LOG_LEVELS overrides it per
+    module; the level also gates debug-only work such as diagnostic queries (see debug_enabled).
+    """
+
+    def __init__(self):
+        self.level = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.module_levels = parse_levels(os.getenv("LOG_LEVELS", ""))
+        self.format = os.getenv("LOG_FORMAT", "text").lower()
+        self._listener = None
+
+    def setup(self):
+        if self._listener is not None:
+            return
+        handler = logging.StreamHandler(sys.stdout)
+        if self.format == "json":
+            handler.setFormatter(JSONFormatter())
+        else:
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.handlers = [logging.handlers.QueueHandler(log_queue)]
+        root.setLevel(self.level)
+        for name, level in self.module_levels.items():
+            logging.getLogger(name).setLevel(level)
+
+        self._listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        self._listener.start()
+
+    def stop(self):
+        """Flush queued records (call at shutdown)"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+def get_logger(name):
+    return logging.getLogger(name)
+
+
+def debug_enabled(logger):
+    """True when DEBUG records from this logger would be emitted - guard debug-only queries with it"""
+    return logger.isEnabledFor(logging.DEBUG)
+
+
+# Global logging config instance
+logging_config = LoggingConfig()
@@ -8,10 +8,8 @@ import json
 import requests
 import base64
 import secrets
-import threading
 import time
 import asyncio
-import aiohttp
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -21,31 +19,50 @@ from contextlib import asynccontextmanager
 
 import aiosqlite
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query
-from fastapi.responses import Response
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from web3 import Web3
 from PIL import Image, ImageDraw, ImageFont
 
 load_dotenv()
-from bulk_certificate_processor import BulkCertificateProcessor
+from logging_config import logging_config, get_logger, debug_enabled
+
+# Leveled, queue-backed logging (LOG_LEVEL / LOG_LEVELS / LOG_FORMAT), set up before the other
+# backend modules are imported so their import-time records are not dropped
+logging_config.setup()
+from bulk_certificate_processor import bulk_processor
 from database import db_manager
 from email_service import EmailService
 from template_manager import template_manager
+from rate_limiter import email_rate_limiter, smtp_deferral_code
+from chain_indexer import chain_indexer
+from tx_reconciler import tx_reconciler
+from contract_reader import contract_reader
+from rpc_pool import rpc_pool
+from chain_context import chain_context
+from receipt_waiter import receipt_waiter
+from poa_batch_minter import poa_batch_minter
+from telegram_client import telegram_client, TelegramAPIError
+from telegram_membership import membership_cache, MEMBER_STATUSES
+from job_queue import certificate_job_queue, task_status
+from progress_broker import progress_broker
+from email_outbox import email_outbox
+from leader_election import leader_election
+from verification_log import verification_log
+from telegram_dispatcher import update_dispatcher
+from tracing import tracer, TracingMiddleware
+from metrics import (metrics, ipfs_pin_seconds, smtp_send_seconds, queue_depth, db_pool_connections,
+                     certificate_jobs)
+
+logger = get_logger(__name__)
 
 # Global database pool
 db_pool = None
-email_queue = asyncio.Queue()
-
-# Background task tracking
-background_tasks = {}
-task_id_counter = 0
 
 # Telegram verification concurrency control
 telegram_verification_semaphore = asyncio.Semaphore(50)  # Max 50 concurrent verifications
-telegram_verification_log = []  # Track all verification attempts
 
 # Helper function to convert SQL queries for PostgreSQL
 def convert_sql_for_postgres(sql_query, params=None):
@@ -84,51 +101,35 @@ class DatabasePool:
     async def close_pool(self):
         pass  # No pool to close
 
-# Async email worker with worker ID
-async def email_worker(worker_id: int):
-    print(f"Email worker {worker_id} started")
-    while True:
-        try:
-            email_task = await email_queue.get()
-            if email_task is None:
-                print(f"Email worker {worker_id} shutting down")
-                email_queue.task_done()
-                break
-            
-            # Process email task
-            to_email = email_task.get('to_email')
-            subject = email_task.get('subject')
-            body = email_task.get('body')
-            
-            if all([to_email, subject, body]):
-                print(f"Worker {worker_id} processing email to {to_email}")
-                # Run email sending in thread pool to avoid blocking
-                loop = asyncio.get_event_loop()
-                await loop.run_in_executor(None, send_email_sync, to_email, subject, body)
-                print(f"Worker {worker_id} completed email to {to_email}")
-            
-            email_queue.task_done()
-        except Exception as e:
-            print(f"Email worker {worker_id} error: {e}")
-            continue
-
 def send_email_sync(to_email: str, subject: str, body: str):
     """Synchronous email sending for thread pool"""
+    started = time.perf_counter()
     try:
         msg = MIMEText(body)
         msg['Subject'] = subject
         msg['From'] = FROM_EMAIL
         msg['To'] = to_email
         
-        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASS)
-        server.send_message(msg)
-        server.quit()
-        print(f"Email sent successfully to {to_email}")
+        # Wait for provider/domain budget so bursts from 25 workers don't trip provider throttling
+        email_rate_limiter.acquire(SMTP_HOST, to_email)
+        started = time.perf_counter()  # Delivery latency, not time spent waiting for rate budget
+        with tracer.child_span("smtp.send", **{"smtp.host": SMTP_HOST}):
+            server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+            if SMTP_USE_TLS:
+                server.starttls()
+            if SMTP_USER:
+                server.login(SMTP_USER, SMTP_PASS)
+            server.send_message(msg)
+            server.quit()
+        smtp_send_seconds.observe(time.perf_counter() - started, outcome="sent")
+        email_rate_limiter.record_success(SMTP_HOST, to_email)
+        logger.debug("Email sent successfully to %s", to_email)
         return True
     except Exception as e:
-        print(f"Failed to send email to {to_email}: {e}")
+        smtp_send_seconds.observe(time.perf_counter() - started, outcome="failed")
+        if smtp_deferral_code(e) is not None:
+            email_rate_limiter.record_deferral(SMTP_HOST, to_email, e)
+        logger.warning("Failed to send email to %s: %s", to_email, e)
         return False
 
 app = FastAPI(
@@ -158,20 +159,21 @@ def generate_poa_metadata(event_name, participant_name):
 def upload_poa_metadata_to_ipfs(metadata):
     """Upload PoA metadata to IPFS via Pinata"""
     try:
-        response = requests.post(
-            'https://api.pinata.cloud/pinning/pinJSONToIPFS',
-            headers={
-                'Content-Type': 'application/json',
-                'pinata_api_key': PINATA_API_KEY,
-                'pinata_secret_api_key': PINATA_SECRET_API_KEY
-            },
-            json={
-                'pinataContent': metadata,
-                'pinataMetadata': {
-                    'name': f"poa_metadata_{metadata['attributes'][1]['value'].replace(' ', '_')}"
+        with ipfs_pin_seconds.time(kind="json"), tracer.child_span("ipfs.pin", kind="json"):
+            response = requests.post(
+                'https://api.pinata.cloud/pinning/pinJSONToIPFS',
+                headers={
+                    'Content-Type': 'application/json',
+                    'pinata_api_key': PINATA_API_KEY,
+                    'pinata_secret_api_key': PINATA_SECRET_API_KEY
+                },
+                json={
+                    'pinataContent': metadata,
+                    'pinataMetadata': {
+                        'name': f"poa_metadata_{metadata['attributes'][1]['value'].replace(' ', '_')}"
+                    }
                 }
-            }
-        )
+            )
         
         if response.status_code == 200:
             metadata_hash = response.json()['IpfsHash']
@@ -181,41 +183,51 @@ def upload_poa_metadata_to_ipfs(metadata):
                 "metadata_url": f"https://red-biological-whitefish-939.mypinata.cloud/ipfs/{metadata_hash}"
             }
         else:
-            print(f"Failed to upload PoA metadata to IPFS: {response.text}")
+            logger.warning("Failed to upload PoA metadata to IPFS: %s", response.text)
             return {"success": False, "error": response.text}
             
     except Exception as e:
-        print(f"Error uploading PoA metadata to IPFS: {str(e)}")
+        logger.exception("Error uploading PoA metadata to IPFS: %s", e)
         return {"success": False, "error": str(e)}
 
-def update_poa_token_metadata(token_id, metadata_hash):
+async def send_contract_transaction(function_call, tx_params):
+    """Sign and broadcast a contract call with a nonce from the shared counter (released if the send fails)"""
+    nonce = await chain_context.next_nonce()
+    try:
+        transaction = function_call.build_transaction(dict(tx_params, nonce=nonce))
+        signed_txn = chain_context.sign_transaction(transaction)
+        return await asyncio.to_thread(w3.eth.send_raw_transaction, signed_txn.rawTransaction)
+    except Exception:
+        await chain_context.release_nonce(nonce)
+        raise
+
+async def update_poa_token_metadata(token_id, metadata_hash):
     """Update PoA token metadata using the smart contract updateMetadata function"""
     if not all([w3, PRIVATE_KEY, CONTRACT_ADDRESS]):
         raise Exception("Web3 not configured properly")
     
     try:
-        account = w3.eth.account.from_key(PRIVATE_KEY)
-        contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+        account = chain_context.account
+        contract = chain_context.contract(CONTRACT_ABI)
         
         # Build transaction to update metadata
-        gas_estimate = contract.functions.updateMetadata(token_id, metadata_hash).estimate_gas({'from': account.address})
+        gas_estimate = await asyncio.to_thread(
+            contract.functions.updateMetadata(token_id, metadata_hash).estimate_gas, {'from': account.address}
+        )
+        gas_price = await asyncio.to_thread(lambda: w3.eth.gas_price)
         
-        transaction = contract.functions.updateMetadata(token_id, metadata_hash).build_transaction({
-            'chainId': w3.eth.chain_id,
+        tx_hash = await send_contract_transaction(contract.functions.updateMetadata(token_id, metadata_hash), {
+            'chainId': chain_context.chain_id,
             'gas': gas_estimate + 50000,
-            'gasPrice': w3.eth.gas_price,
-            'nonce': w3.eth.get_transaction_count(account.address),
+            'gasPrice': gas_price,
         })
+        receipt = await receipt_waiter.wait_async(tx_hash)
         
-        signed_txn = w3.eth.account.sign_transaction(transaction, PRIVATE_KEY)
-        tx_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        
-        print(f"Updated metadata for token {token_id}: {tx_hash.hex()}")
+        logger.info("Updated metadata for token %s: %s", token_id, tx_hash.hex())
         return {"success": True, "tx_hash": tx_hash.hex()}
         
     except Exception as e:
-        print(f"Error updating PoA token metadata: {str(e)}")
+        logger.exception("Error updating PoA token metadata: %s", e)
         return {"success": False, "error": str(e)}
 
 app.add_middleware(
@@ -225,6 +237,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# One span per request (TRACING_EXPORTER); no-op when tracing is off
+app.add_middleware(TracingMiddleware)
 
 # Configuration
 DB_PATH = os.getenv("DB_URL", "certificates.db")
@@ -238,13 +252,18 @@ SMTP_HOST = os.getenv("SMTP_HOST")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASS = os.getenv("SMTP_PASS")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
 FROM_EMAIL = os.getenv("FROM_EMAIL")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 TELEGRAM_GROUP_LINK = os.getenv("TELEGRAM_GROUP_LINK")
+# Public HTTPS URL of /telegram/webhook; when unset (or setWebhook fails) the leader long-polls instead
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+TELEGRAM_ALLOWED_UPDATES = ["message", "chat_member"]
 
-# Web3 setup
-w3 = Web3(Web3.HTTPProvider(RPC_URL)) if RPC_URL else None
+# Web3 setup (shared endpoint pool over RPC_URL/RPC_URLS)
+w3 = rpc_pool.web3
 
 CONTRACT_ABI = [
     {
@@ -523,7 +542,7 @@ async def is_organizer_email(email: str) -> bool:
         result = await db_manager.execute_query(converted_sql, params, fetch=True)
         return len(result) > 0 if result else False
     except Exception as e:
-        print(f"Error checking organizer email: {e}")
+        logger.exception("Error checking organizer email: %s", e)
         return False
 
 def is_root_email(email: str) -> bool:
@@ -565,7 +584,7 @@ def send_otp_email(email: str, otp_code: str):
 async def verify_session_token(token: str) -> Optional[str]:
     """Verify session token and return email if valid"""
     try:
-        print(f"Verifying session token: {token[:20]}... (PostgreSQL: {db_manager.is_postgres})")
+        logger.debug("Verifying session token: %s... (PostgreSQL: %s)", token[:20], db_manager.is_postgres)
 
         if db_manager.is_postgres:
             sql_query = """
@@ -582,27 +601,23 @@ async def verify_session_token(token: str) -> Optional[str]:
             """
             result = await db_manager.execute_query(sql_query, [token], fetch=True)
 
-        print(f"Session query result: {result}")
+        logger.debug("Session query result: %s", result)
 
-        # Debug: Check all sessions in database
-        if db_manager.is_postgres:
+        # Debug: Check recent sessions in database (only when debug logging is on for this module)
+        if debug_enabled(logger):
             debug_query = "SELECT session_token, organizer_email, expires_at, is_active FROM organizer_sessions ORDER BY created_at DESC LIMIT 5"
             debug_result = await db_manager.execute_query(debug_query, [], fetch=True)
-        else:
-            debug_query = "SELECT session_token, organizer_email, expires_at, is_active FROM organizer_sessions ORDER BY created_at DESC LIMIT 5"
-            debug_result = await db_manager.execute_query(debug_query, [], fetch=True)
-
-        print(f"Recent sessions in DB: {debug_result}")
+            logger.debug("Recent sessions in DB: %s", debug_result)
 
         if result and len(result) > 0:
             email = result[0]['organizer_email'] if isinstance(result[0], dict) else result[0][0]
-            print(f"Session valid for email: {email}")
+            logger.debug("Session valid for email: %s", email)
             return email
 
-        print("No valid session found")
+        logger.debug("No valid session found")
         return None
     except Exception as e:
-        print(f"Error verifying session token: {e}")
+        logger.error("Error verifying session token: %s", e)
         return None
 
 def upload_to_pinata(file_bytes: bytes, filename: str) -> str:
@@ -618,7 +633,8 @@ def upload_to_pinata(file_bytes: bytes, filename: str) -> str:
         "file": (filename, file_bytes, "image/jpeg")
     }
     
-    response = requests.post(url, files=files, headers=headers)
+    with ipfs_pin_seconds.time(kind="file"), tracer.child_span("ipfs.pin", kind="file"):
+        response = requests.post(url, files=files, headers=headers)
     if response.status_code == 200:
         return response.json()["IpfsHash"]
     else:
@@ -715,29 +731,19 @@ def generate_certificate(template_path: str, participant_name: str, event_name:
         raise Exception(f"Failed to generate certificate: {str(e)}")
 
 async def send_email_async(to_email: str, subject: str, body: str):
-    """Queue email for async processing (async version)"""
-    email_task = {
-        'to_email': to_email,
-        'subject': subject,
-        'body': body
-    }
-    await email_queue.put(email_task)
-    print(f"Email queued for: {to_email}")
+    """Queue email in the database outbox (sent by whichever worker claims it)"""
+    await email_outbox.enqueue(to_email, subject, body)
+    logger.debug("Email queued for: %s", to_email)
 
 def send_email(to_email: str, subject: str, body: str):
     """Queue email for async processing (sync wrapper for backward compatibility)"""
-    email_task = {
-        'to_email': to_email,
-        'subject': subject,
-        'body': body
-    }
     try:
         loop = asyncio.get_running_loop()
-        asyncio.create_task(email_queue.put(email_task))
+        asyncio.create_task(email_outbox.enqueue(to_email, subject, body))
     except RuntimeError:
         # No running loop, create task differently
-        asyncio.run(email_queue.put(email_task))
-    print(f"Email queued for: {to_email}")
+        asyncio.run(email_outbox.enqueue(to_email, subject, body))
+    logger.debug("Email queued for: %s", to_email)
 
 def send_email_sync_old(to_email: str, subject: str, body: str):
     """Send email via SMTP - old sync version kept for compatibility"""
@@ -758,7 +764,7 @@ def send_email_sync_old(to_email: str, subject: str, body: str):
     except Exception as e:
         raise Exception(f"Failed to send email: {str(e)}")
 
-def mint_poa_nft(wallet_address: str, event_id: int):
+async def mint_poa_nft(wallet_address: str, event_id: int):
     """Mint Proof of Attendance NFT"""
     if not all([w3, PRIVATE_KEY, CONTRACT_ADDRESS]):
         raise Exception("Web3 not configured properly")
@@ -767,48 +773,45 @@ def mint_poa_nft(wallet_address: str, event_id: int):
         # Convert wallet address to checksum format
         wallet_address = w3.to_checksum_address(wallet_address)
         
-        account = w3.eth.account.from_key(PRIVATE_KEY)
-        contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+        account = chain_context.account
+        contract = chain_context.contract(CONTRACT_ABI)
         
         # Get network info
-        network = w3.eth.chain_id
-        print(f"Network Chain ID: {network}")
-        print(f"Account: {account.address}")
-        print(f"Contract: {CONTRACT_ADDRESS}")
-        print(f"Recipient (checksum): {wallet_address}")
+        network = chain_context.chain_id
+        logger.debug("Network Chain ID: %s", network)
+        logger.debug("Account: %s", account.address)
+        logger.debug("Contract: %s", CONTRACT_ADDRESS)
+        logger.debug("Recipient (checksum): %s", wallet_address)
         
         # Build transaction with proper gas estimation
-        gas_estimate = contract.functions.mintPoA(wallet_address, event_id).estimate_gas({'from': account.address})
+        gas_estimate = await asyncio.to_thread(
+            contract.functions.mintPoA(wallet_address, event_id).estimate_gas, {'from': account.address}
+        )
+        gas_price = await asyncio.to_thread(lambda: w3.eth.gas_price)
         
-        transaction = contract.functions.mintPoA(wallet_address, event_id).build_transaction({
+        # Sign and send transaction
+        tx_hash = await send_contract_transaction(contract.functions.mintPoA(wallet_address, event_id), {
             'chainId': network,
             'gas': gas_estimate + 50000,  # Add buffer
-            'gasPrice': w3.eth.gas_price,  # Lower gas price for localhost
-            'nonce': w3.eth.get_transaction_count(account.address),
+            'gasPrice': gas_price,  # Lower gas price for localhost
         })
         
-        print(f"Transaction built: {transaction}")
-        
-        # Sign and send transaction
-        signed_txn = w3.eth.account.sign_transaction(transaction, PRIVATE_KEY)
-        tx_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-        
         # Wait for transaction receipt
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        print(f"Transaction successful: {receipt}")
+        receipt = await receipt_waiter.wait_async(tx_hash)
+        logger.debug("Transaction successful: %s", receipt)
         
         return tx_hash.hex()
         
     except Exception as e:
-        print(f"Error in mint_poa_nft: {str(e)}")
+        logger.exception("Error in mint_poa_nft: %s", e)
         raise Exception(f"Failed to mint PoA NFT: {str(e)}")
 
-def get_onchain_participants(event_id: int = None):
-    """Get participants from blockchain events - DISABLED for performance"""
-    # Since we're now using mintCertificateByOwner and trusting the database,
-    # we skip the expensive block scanning and return empty list
-    print("Skipping on-chain participant fetching - using database-only approach")
-    return []
+async def get_onchain_participants(event_id: int = None):
+    """Get PoA holders from the local chain event index (kept current by chain_indexer)"""
+    if not chain_indexer.enabled:
+        logger.info("Chain indexer disabled - no on-chain participant data")
+        return []
+    return await chain_indexer.get_event_participants(event_id)
 
 async def store_verified_telegram_user(user_id: int, username: str, first_name: str = None, last_name: str = None):
     """Store verified Telegram user in database using db_manager"""
@@ -840,10 +843,11 @@ async def store_verified_telegram_user(user_id: int, username: str, first_name:
             params = [user_id, username, first_name, last_name, verification_token]
 
         await db_manager.execute_query(sql, params)
-        print(f"Successfully stored user @{username} (ID: {user_id}) in database")
+        membership_cache.update(user_id, username, status="member", verified=True, verified_at=datetime.now().isoformat())
+        logger.debug("Successfully stored user @%s (ID: %s) in database", username, user_id)
         return verification_token
     except Exception as e:
-        print(f"Error storing user @{username}: {e}")
+        logger.exception("Error storing user @%s: %s", username, e)
         raise
 
 async def get_verified_telegram_user(username: str):
@@ -881,30 +885,26 @@ async def get_verified_telegram_user(username: str):
                     'verification_token': row[4],
                     'verified_at': row[5]
                 }
-            print(f"Retrieved user @{username} from database: {user_data['user_id']}")
+            logger.debug("Retrieved user @%s from database: %s", username, user_data['user_id'])
             return user_data
         else:
-            print(f"User @{username} not found in database")
+            logger.info("User @%s not found in database", username)
             return None
     except Exception as e:
-        print(f"Error retrieving user @{username}: {e}")
+        logger.exception("Error retrieving user @%s: %s", username, e)
         return None
 
+async def has_verified_telegram_row(user_id: int):
+    """True while user_id is in telegram_verified_users (whichever worker sees a leave deletes the row)"""
+    sql, params = convert_sql_for_postgres("SELECT 1 FROM telegram_verified_users WHERE user_id = ?", [user_id])
+    return bool(await db_manager.execute_query(sql, params, fetch=True))
+
 def send_telegram_message(chat_id: int, text: str):
-    """Send message to Telegram user"""
+    """Queue a message to a Telegram user (delivered by telegram_client within Bot API rate limits)"""
     try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        data = {
-            'chat_id': chat_id,
-            'text': text,
-            'parse_mode': 'HTML'
-        }
-        
-        response = requests.post(url, json=data, timeout=10)
-        return response.json()
+        telegram_client.queue_message(chat_id, text)
     except Exception as e:
-        print(f"Failed to send Telegram message: {e}")
-        return None
+        logger.warning("Failed to queue Telegram message: %s", e)
 
 def get_participant_details_from_db(wallet_address: str, event_id: int):
     """Get participant name/email from database"""
@@ -935,7 +935,7 @@ def get_participant_details_from_db(wallet_address: str, event_id: int):
     finally:
         conn.close()
 
-def mint_certificate_nft(wallet_address: str, event_id: int, ipfs_hash: str):
+async def mint_certificate_nft(wallet_address: str, event_id: int, ipfs_hash: str):
     """Mint Certificate NFT"""
     if not all([w3, PRIVATE_KEY, CONTRACT_ADDRESS]):
         raise Exception("Web3 not configured properly")
@@ -944,29 +944,28 @@ def mint_certificate_nft(wallet_address: str, event_id: int, ipfs_hash: str):
         # Convert wallet address to checksum format
         wallet_address = w3.to_checksum_address(wallet_address)
         
-        account = w3.eth.account.from_key(PRIVATE_KEY)
-        contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+        account = chain_context.account
+        contract = chain_context.contract(CONTRACT_ABI)
         
         # Get network info
-        network = w3.eth.chain_id
-        print(f"Minting certificate for (checksum): {wallet_address}")
+        network = chain_context.chain_id
+        logger.debug("Minting certificate for (checksum): %s", wallet_address)
         
         # Build transaction with proper gas estimation
-        gas_estimate = contract.functions.mintCertificate(wallet_address, event_id, ipfs_hash).estimate_gas({'from': account.address})
+        gas_estimate = await asyncio.to_thread(
+            contract.functions.mintCertificate(wallet_address, event_id, ipfs_hash).estimate_gas, {'from': account.address}
+        )
+        gas_price = await asyncio.to_thread(lambda: w3.eth.gas_price)
         
-        transaction = contract.functions.mintCertificate(wallet_address, event_id, ipfs_hash).build_transaction({
+        # Sign and send transaction
+        tx_hash = await send_contract_transaction(contract.functions.mintCertificate(wallet_address, event_id, ipfs_hash), {
             'chainId': network,
             'gas': gas_estimate + 50000,  # Add buffer
-            'gasPrice': w3.eth.gas_price,  # Lower gas price for localhost
-            'nonce': w3.eth.get_transaction_count(account.address),
+            'gasPrice': gas_price,  # Lower gas price for localhost
         })
         
-        # Sign and send transaction
-        signed_txn = w3.eth.account.sign_transaction(transaction, PRIVATE_KEY)
-        tx_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-        
         # Wait for transaction receipt
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        receipt = await receipt_waiter.wait_async(tx_hash)
         
         # Extract token ID from transaction logs
         token_id = None
@@ -982,10 +981,10 @@ def mint_certificate_nft(wallet_address: str, event_id: int, ipfs_hash: str):
                 if (len(log.topics) >= 4 and 
                     log.topics[0].hex() == '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'):
                     token_id = int(log.topics[3].hex(), 16)
-                    print(f"[SUCCESS] Extracted token ID from Transfer event: {token_id}")
+                    logger.debug("Extracted token ID from Transfer event: %s", token_id)
                     break
             except Exception as e:
-                print(f"Failed to extract token ID from log: {e}")
+                logger.warning("Failed to extract token ID from log: %s", e)
                 continue
         
         # If Transfer event extraction failed, try CertificateMinted event
@@ -1001,13 +1000,13 @@ def mint_certificate_nft(wallet_address: str, event_id: int, ipfs_hash: str):
                             potential_token_id = int(log.data[:66], 16)  # 0x + 64 chars
                             if potential_token_id > 0 and potential_token_id < 1000000:  # Reasonable range
                                 token_id = potential_token_id
-                                print(f"[SUCCESS] Extracted token ID from event data: {token_id}")
+                                logger.debug("Extracted token ID from event data: %s", token_id)
                                 break
                 except Exception as e:
-                    print(f"Failed to extract token ID from event data: {e}")
+                    logger.warning("Failed to extract token ID from event data: %s", e)
                     continue
         
-        print(f"Certificate NFT minted successfully. TX: {receipt.transactionHash.hex()}, Token ID: {token_id}")
+        logger.info("Certificate NFT minted successfully. TX: %s, Token ID: %s", receipt.transactionHash.hex(), token_id)
         
         return {
             "tx_hash": tx_hash.hex(),
@@ -1016,191 +1015,171 @@ def mint_certificate_nft(wallet_address: str, event_id: int, ipfs_hash: str):
         }
         
     except Exception as e:
-        print(f"Error in mint_certificate_nft: {str(e)}")
+        logger.exception("Error in mint_certificate_nft: %s", e)
         raise Exception(f"Failed to mint Certificate NFT: {str(e)}")
 
 # Async function to process individual /0xday commands
 async def process_0xday_command(user_id: int, username: str, first_name: str, last_name: str):
     """Process a single /0xday command asynchronously with concurrency control"""
-    log_entry = {
-        'timestamp': datetime.now().isoformat(),
-        'user_id': user_id,
-        'username': username,
-        'first_name': first_name,
-        'status': 'processing'
-    }
-    telegram_verification_log.append(log_entry)
+    log_entry = verification_log.record(user_id, username, first_name)
 
     # Use semaphore to limit concurrent verifications
     async with telegram_verification_semaphore:
         try:
-            print(f"🔄 [TELEGRAM] Processing /0xday from user_id={user_id} (@{username}, {first_name})")
+            logger.debug("[TELEGRAM] Processing /0xday from user_id=%s (@%s, %s)", user_id, username, first_name)
 
-            # Check if user is in the group
-            check_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getChatMember"
-            check_params = {
-                'chat_id': TELEGRAM_CHAT_ID,
-                'user_id': user_id
-            }
+            # Check if user is in the group (client retries timeouts and 429s)
+            check_result = await telegram_client.get_chat_member(TELEGRAM_CHAT_ID, user_id)
 
-            # Use aiohttp for non-blocking HTTP request with retry logic
-            max_retries = 2
-            for attempt in range(max_retries):
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(check_url, params=check_params, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                            check_result = await response.json()
-
-                            if response.status == 200 and check_result.get('ok'):
-                                member_status = check_result.get('result', {}).get('status')
-
-                                if member_status in ['member', 'administrator', 'creator']:
-                                    # User is verified! Store in database
-                                    verification_token = await store_verified_telegram_user(
-                                        user_id, username, first_name, last_name
-                                    )
-
-                                    response_text = "Welcome to the 0x.Day Community"
-                                    send_telegram_message(user_id, response_text)
-                                    log_entry['status'] = 'success_verified'
-                                    print(f"✅ [TELEGRAM] Successfully verified user_id={user_id} (@{username}) - Status: {member_status}")
-                                    return
-
-                                elif member_status in ['left', 'kicked']:
-                                    response_text = f"Please join our community first: {TELEGRAM_GROUP_LINK}"
-                                    send_telegram_message(user_id, response_text)
-                                    log_entry['status'] = 'rejected_not_member'
-                                    print(f"❌ [TELEGRAM] User_id={user_id} (@{username}) not a member - Status: {member_status}")
-                                    return
-
-                            else:
-                                error_desc = check_result.get('description', 'Unknown error')
-                                print(f"⚠️ [TELEGRAM] API error for user_id={user_id} (@{username}): {error_desc}")
-                                if attempt < max_retries - 1:
-                                    await asyncio.sleep(1)
-                                    continue
-                                response_text = "Verification error. Please try again."
-                                send_telegram_message(user_id, response_text)
-                                log_entry['status'] = 'error_api'
-                                return
-                    break
-                except asyncio.TimeoutError:
-                    if attempt < max_retries - 1:
-                        print(f"⏱️ [TELEGRAM] Timeout for user_id={user_id}, retrying...")
-                        await asyncio.sleep(1)
-                        continue
-                    raise
+            if check_result.get('ok'):
+                member_status = check_result.get('result', {}).get('status')
+
+                if member_status in ['member', 'administrator', 'creator']:
+                    # User is verified! Store in database
+                    verification_token = await store_verified_telegram_user(
+                        user_id, username, first_name, last_name
+                    )
+
+                    response_text = "Welcome to the 0x.Day Community"
+                    send_telegram_message(user_id, response_text)
+                    verification_log.set_status(log_entry, 'success_verified')
+                    logger.info("[TELEGRAM] Verified user_id=%s (@%s) - Status: %s", user_id, username, member_status)
+                    return
+
+                elif member_status in ['left', 'kicked']:
+                    response_text = f"Please join our community first: {TELEGRAM_GROUP_LINK}"
+                    send_telegram_message(user_id, response_text)
+                    verification_log.set_status(log_entry, 'rejected_not_member')
+                    logger.info("[TELEGRAM] User_id=%s (@%s) not a member - Status: %s", user_id, username, member_status)
+                    return
+
+            else:
+                error_desc = check_result.get('description', 'Unknown error')
+                logger.warning("[TELEGRAM] API error for user_id=%s (@%s): %s", user_id, username, error_desc)
+                response_text = "Verification error. Please try again."
+                send_telegram_message(user_id, response_text)
+                verification_log.set_status(log_entry, 'error_api')
+                return
 
         except Exception as e:
-            log_entry['status'] = 'error_exception'
-            log_entry['error'] = str(e)
-            print(f"❌ [TELEGRAM] Exception for user_id={user_id} (@{username}): {e}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
+            verification_log.set_status(log_entry, 'error_exception', str(e))
+            logger.exception("[TELEGRAM] Exception for user_id=%s (@%s): %s", user_id, username, e)
             response_text = "Technical error. Please try again later."
             send_telegram_message(user_id, response_text)
 
-# Bot polling function for background thread
+async def handle_chat_member_update(chat_member: dict):
+    """Refresh cached membership from a chat_member update for the community group"""
+    if str(chat_member.get('chat', {}).get('id')) != str(TELEGRAM_CHAT_ID):
+        return
+    new_member = chat_member.get('new_chat_member', {})
+    user = new_member.get('user', {})
+    status = new_member.get('status')
+    if not user.get('id') or user.get('is_bot'):
+        return
+    
+    membership_cache.update(user['id'], user.get('username'), status=status)
+    if status in ['left', 'kicked']:
+        # Same cleanup /verify-telegram-membership does when it finds a departed member
+        delete_sql, delete_params = convert_sql_for_postgres(
+            "DELETE FROM telegram_verified_users WHERE user_id = ?", [user['id']]
+        )
+        await db_manager.execute_query(delete_sql, delete_params)
+        membership_cache.update(user['id'], status=status, verified=False)
+        logger.info("[TELEGRAM] @%s left the community (%s)", user.get('username'), status)
+
+async def handle_telegram_update(update: dict):
+    """Apply one bot update (from the webhook or polling); run by the update dispatcher workers"""
+    if 'chat_member' in update:
+        await handle_chat_member_update(update['chat_member'])
+
+    message = update.get('message')
+    if not message or message.get('from', {}).get('is_bot', False):
+        return
+
+    text = message.get('text', '').strip().lower()
+    if text not in ['/0xday', '/0xday@certs0xday_bot']:
+        return
+
+    user = message.get('from', {})
+    chat = message.get('chat', {})
+    user_id = user.get('id')
+    first_name = user.get('first_name', '')
+    if chat.get('type') in ['group', 'supergroup'] and str(chat.get('id')) != str(TELEGRAM_CHAT_ID):
+        send_telegram_message(user_id, f"Hi {first_name}! Please send me /0xday in a private message to verify your account.")
+        return
+
+    # Concurrency is bounded by telegram_verification_semaphore inside
+    await process_0xday_command(user_id, user.get('username', ''), first_name, user.get('last_name', ''))
+
+# Bot polling task (runs on the main event loop) - fallback when no webhook is configured
 async def bot_polling_async():
-    """Background thread to continuously poll for Telegram bot updates"""
+    """Continuously long-poll Telegram for bot updates and hand them to the update dispatcher"""
     if not TELEGRAM_BOT_TOKEN:
-        print("No Telegram bot token configured, skipping bot polling")
+        logger.info("No Telegram bot token configured, skipping bot polling")
         return
     
-    print("Starting Telegram bot polling thread...")
+    logger.info("Starting Telegram bot polling task...")
     offset = 0
+    try:
+        await telegram_client.delete_webhook()
+    except TelegramAPIError as e:
+        logger.warning("Could not clear Telegram webhook before polling: %s", e)
     
     while True:
         try:
-            url = f'https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates'
-            params = {
-                'offset': offset,
-                'timeout': 30  # Long polling for efficiency
-            }
-            
-            response = requests.get(url, params=params, timeout=35)
-            result = response.json()
+            # Long polling; chat_member updates (bot must be a group admin) keep the membership cache current
+            result = await telegram_client.get_updates(offset, timeout=30, allowed_updates=TELEGRAM_ALLOWED_UPDATES)
             
             if result.get('ok'):
                 updates = result.get('result', [])
-
-                # Collect all /0xday commands for concurrent processing
-                command_tasks = []
-
                 for update in updates:
                     offset = update['update_id'] + 1
+                    # Waits while the dispatcher queue is full, so the next poll is held back too
+                    await update_dispatcher.put(update)
 
-                    if 'message' in update:
-                        message = update['message']
-                        text = message.get('text', '').strip().lower()
-                        user = message.get('from', {})
-                        chat = message.get('chat', {})
-
-                        # Handle /0xday command
-                        if text in ['/0xday', '/0xday@certs0xday_bot']:
-                            user_id = user.get('id')
-                            username = user.get('username', '')
-                            first_name = user.get('first_name', '')
-                            last_name = user.get('last_name', '')
-
-                            # Create async task for concurrent processing
-                            task = asyncio.create_task(
-                                process_0xday_command(user_id, username, first_name, last_name)
-                            )
-                            command_tasks.append(task)
-
-                # Process all /0xday commands concurrently
-                if command_tasks:
-                    print(f"📊 [TELEGRAM BOT] Processing {len(command_tasks)} /0xday commands concurrently...")
-                    try:
-                        results = await asyncio.gather(*command_tasks, return_exceptions=True)
-
-                        # Log results
-                        success_count = sum(1 for r in results if not isinstance(r, Exception))
-                        error_count = len(results) - success_count
-                        print(f"✅ [TELEGRAM BOT] Completed {len(command_tasks)} commands - Success: {success_count}, Errors: {error_count}")
-
-                        # Log any exceptions
-                        for i, result in enumerate(results):
-                            if isinstance(result, Exception):
-                                print(f"❌ [TELEGRAM BOT] Task {i} failed with exception: {result}")
-                    except Exception as e:
-                        print(f"❌ [TELEGRAM BOT] Critical error in concurrent command processing: {e}")
+                if updates:
+                    logger.debug("📊 [TELEGRAM BOT] Queued %s updates (%s waiting)", len(updates), update_dispatcher.stats()['queued'])
+            else:
+                logger.warning("Bot polling error: %s", result.get('description'))
+                await asyncio.sleep(5)
             
-        except requests.exceptions.Timeout:
-            print("Bot polling timeout, retrying...")
-            time.sleep(5)
-        except requests.exceptions.ConnectionError:
-            print("Bot polling connection error, retrying in 10 seconds...")
-            time.sleep(10)
+        except asyncio.CancelledError:
+            raise
+        except TelegramAPIError as e:
+            logger.warning("Bot polling connection error, retrying in 10 seconds... (%s)", e)
+            await asyncio.sleep(10)
         except Exception as e:
-            print(f"Bot polling error: {e}")
-            time.sleep(10)
+            logger.exception("Bot polling error: %s", e)
+            await asyncio.sleep(10)
 
-def bot_polling_thread():
-    """Wrapper function to run async bot polling in a thread"""
-    # Create new event loop for this thread
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(bot_polling_async())
-    finally:
-        loop.close()
+async def telegram_ingest():
+    """Register the webhook as the primary ingest path; long-poll if it is not configured or registration fails"""
+    if TELEGRAM_WEBHOOK_URL:
+        try:
+            result = await telegram_client.set_webhook(
+                TELEGRAM_WEBHOOK_URL, TELEGRAM_WEBHOOK_SECRET, allowed_updates=TELEGRAM_ALLOWED_UPDATES
+            )
+            if result.get('ok'):
+                logger.info("Telegram webhook registered: %s", TELEGRAM_WEBHOOK_URL)
+                return
+            logger.info("Telegram setWebhook refused (%s), falling back to polling", result.get('description'))
+        except TelegramAPIError as e:
+            logger.warning("Telegram setWebhook failed (%s), falling back to polling", e)
+    await bot_polling_async()
 
-# API endpoints
 @app.on_event("startup")
 async def startup_event():
     global db_pool
 
-    print("🚀 [STARTUP] Starting application...")
+    logger.info("🚀 [STARTUP] Starting application...")
 
     # Initialize PostgreSQL connection pool if using PostgreSQL
     if db_manager.is_postgres:
         try:
             await db_manager._init_postgres_pool()
-            print("✅ [STARTUP] PostgreSQL connection pool ready")
+            logger.info("✅ [STARTUP] PostgreSQL connection pool ready")
         except Exception as e:
-            print(f"❌ [STARTUP] Failed to initialize PostgreSQL pool: {e}")
+            logger.exception("❌ [STARTUP] Failed to initialize PostgreSQL pool: %s", e)
             raise
 
     # Initialize old SQLite database pool (for backward compatibility)
@@ -1216,52 +1195,72 @@ async def startup_event():
         await migrate_database()
         await ensure_root_organizers()
         await ensure_iotopia_event()
-        print("Database initialized with persistent PostgreSQL support")
+        logger.info("Database initialized with persistent PostgreSQL support")
     except Exception as e:
-        print(f"Database initialization error: {e}")
-        print("Database initialized with connection pool")
-    
-    # Start 25 concurrent email workers
-    email_workers = []
-    for worker_id in range(1, 26):  # Workers 1-25
-        worker_task = asyncio.create_task(email_worker(worker_id))
-        email_workers.append(worker_task)
-    print("25 email workers started for concurrent processing")
+        logger.exception("Database initialization error: %s", e)
     
-    # Start bot polling in background thread
+    # Every worker sends from the shared email outbox
+    email_outbox.start(send_email_sync)
+    verification_log.start()
+
+    # Every worker leases queued/interrupted certificate jobs from the database
+    certificate_job_queue.start()
+
+    # Loops that must run once per deployment go to the elected leader worker
+    # Tail contract events into the local index (serves wallet status / on-chain participants)
+    if chain_indexer.enabled:
+        leader_election.register("chain_indexer", chain_indexer.run)
+    else:
+        logger.info("Chain indexer disabled (set RPC_URL and CONTRACT_ADDRESS, CHAIN_INDEX_ENABLED=true)")
+
+    # Apply submitted mint/transfer transactions from their receipts
+    if tx_reconciler.enabled:
+        leader_election.register("tx_reconciler", tx_reconciler.run)
+
+    # Continue server-side PoA mint jobs interrupted by a restart
+    if poa_batch_minter.enabled:
+        leader_election.register("poa_mint_resume", poa_batch_minter.resume_unfinished)
+
+    # Webhook registration / polling fallback (two pollers would steal each other's updates); every
+    # worker runs the dispatcher because webhook requests can land on any of them
     if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
-        print(f"Telegram config found - Token: {TELEGRAM_BOT_TOKEN[:10]}... Chat ID: {TELEGRAM_CHAT_ID}")
-        bot_thread = threading.Thread(target=bot_polling_thread, daemon=True)
-        bot_thread.start()
-        print("Telegram bot polling thread started successfully!")
+        logger.info("Telegram config found - Token: %s... Chat ID: %s", TELEGRAM_BOT_TOKEN[:10], TELEGRAM_CHAT_ID)
+        update_dispatcher.start(handle_telegram_update)
+        leader_election.register("telegram_ingest", telegram_ingest)
     else:
-        print("Telegram bot not configured, skipping polling thread")
+        logger.info("Telegram bot not configured, skipping polling task")
+
+    await leader_election.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     global db_pool
 
-    print("🔴 [SHUTDOWN] Starting graceful shutdown...")
+    logger.info("🔴 [SHUTDOWN] Starting graceful shutdown...")
+
+    # Hand back leases (certificate job, leadership) while the database is still reachable
+    await certificate_job_queue.stop()
+    await leader_election.stop()
+    await email_outbox.stop()
+    await update_dispatcher.stop()
+    await verification_log.stop()
 
     # Close PostgreSQL connection pool
     if db_manager.is_postgres:
         try:
             await db_manager.close_pool()
-            print("✅ [SHUTDOWN] PostgreSQL connection pool closed")
+            logger.info("✅ [SHUTDOWN] PostgreSQL connection pool closed")
         except Exception as e:
-            print(f"⚠️ [SHUTDOWN] Error closing PostgreSQL pool: {e}")
+            logger.warning("⚠️ [SHUTDOWN] Error closing PostgreSQL pool: %s", e)
 
     # Close old SQLite pool if exists
     if db_pool:
         await db_pool.close_pool()
 
-    # Stop all 25 email workers
-    print("🔴 [SHUTDOWN] Stopping email workers...")
-    for i in range(25):
-        await email_queue.put(None)
+    await telegram_client.close()
 
-    print("✅ [SHUTDOWN] Graceful shutdown complete")
-    print("Email workers shutdown initiated")
+    logger.info("✅ [SHUTDOWN] Graceful shutdown complete")
+    logging_config.stop()
 
 @app.post("/organizer/login")
 async def organizer_login(request: OrganizerLoginRequest):
@@ -1367,7 +1366,7 @@ async def verify_otp(request: OrganizerVerifyOTP):
             """
 
         await db_manager.execute_query(session_insert, [session_token, email])
-        print(f"Created session for {email} with token {session_token[:20]}...")
+        logger.debug("Created session for %s with token %s...", email, session_token[:20])
 
         # Check if this is a root organizer (for now, all root emails can login)
         root_emails = ["sameer@0x.day", "shivani@0x.day", "saijadhav@0x.day", "naresh@0x.day"]
@@ -1381,7 +1380,7 @@ async def verify_otp(request: OrganizerVerifyOTP):
         }
         
     except Exception as e:
-        print(f"OTP verification error: {e}")
+        logger.exception("OTP verification error: %s", e)
         if isinstance(e, HTTPException):
             raise
         raise HTTPException(status_code=500, detail=f"OTP verification failed: {str(e)}")
@@ -1425,7 +1424,7 @@ async def add_organizer_email(request: OrganizerAddEmail, session_token: str = N
                     update_query = "UPDATE organizers SET is_active = 1 WHERE email = ?"
 
                 await db_manager.execute_query(update_query, [new_email])
-                print(f"Reactivated organizer email: {new_email}")
+                logger.info("Reactivated organizer email: %s", new_email)
                 return {"message": f"Email {new_email} reactivated successfully"}
 
         # Add new email (doesn't exist at all)
@@ -1447,7 +1446,7 @@ async def add_organizer_email(request: OrganizerAddEmail, session_token: str = N
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error adding organizer email: {e}")
+        logger.exception("Error adding organizer email: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to add email: {str(e)}")
 
 @app.post("/organizer/remove-email")
@@ -1488,7 +1487,7 @@ async def remove_organizer_email(request: OrganizerRemoveEmail, session_token: s
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error removing organizer email: {e}")
+        logger.exception("Error removing organizer email: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to remove email: {str(e)}")
 
 @app.get("/organizer/emails")
@@ -1532,7 +1531,7 @@ async def get_organizer_emails(session_token: str = None):
         return {"emails": emails}
 
     except Exception as e:
-        print(f"Error fetching organizer emails: {e}")
+        logger.exception("Error fetching organizer emails: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to fetch organizer emails: {str(e)}")
 
 @app.post("/create_event")
@@ -1585,36 +1584,35 @@ async def create_event(event: EventCreate, organizer_id: int = 1):
         )
         await db_manager.execute_query(insert_sql, insert_params)
         
-        print(f"Event created in database: {event.event_name} with code {event_code}")
+        logger.info("Event created in database: %s with code %s", event.event_name, event_code)
         
         # Create event on blockchain if configured
         if w3 and CONTRACT_ADDRESS:
             try:
-                account = w3.eth.account.from_key(PRIVATE_KEY)
-                contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+                account = chain_context.account
+                contract = chain_context.contract(CONTRACT_ABI)
                 
                 # Get network info
-                network = w3.eth.chain_id
+                network = chain_context.chain_id
                 
                 # Build transaction with proper gas estimation
-                gas_estimate = contract.functions.createEvent(event_id, event.event_name).estimate_gas({'from': account.address})
+                gas_estimate = await asyncio.to_thread(
+                    contract.functions.createEvent(event_id, event.event_name).estimate_gas, {'from': account.address}
+                )
+                gas_price = await asyncio.to_thread(lambda: w3.eth.gas_price)
                 
-                transaction = contract.functions.createEvent(event_id, event.event_name).build_transaction({
+                tx_hash = await send_contract_transaction(contract.functions.createEvent(event_id, event.event_name), {
                     'chainId': network,
                     'gas': gas_estimate + 20000,  # Smaller buffer
-                    'gasPrice': w3.eth.gas_price,  # Use network gas price for Kaia
-                    'nonce': w3.eth.get_transaction_count(account.address),
+                    'gasPrice': gas_price,  # Use network gas price for Kaia
                 })
                 
-                signed_txn = w3.eth.account.sign_transaction(transaction, PRIVATE_KEY)
-                tx_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-                
                 # Wait for confirmation
-                receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-                print(f"Event created on blockchain: {receipt}")
+                receipt = await receipt_waiter.wait_async(tx_hash)
+                logger.info("Event created on blockchain: %s", receipt)
                 
             except Exception as e:
-                print(f"Blockchain event creation failed: {e}")
+                logger.warning("Blockchain event creation failed: %s", e)
         
         return {
             "event_id": event_id,
@@ -1624,45 +1622,98 @@ async def create_event(event: EventCreate, organizer_id: int = 1):
         }
         
     except Exception as e:
-        print(f"Error creating event: {e}")
+        logger.exception("Error creating event: %s", e)
         raise HTTPException(status_code=500, detail=f"Error creating event: {str(e)}")
 
+# Postgres: event lookup, insert and the existing row in one statement. The outer SELECT sees the snapshot
+# taken before the insert, so p.* is the row that was already there (NULL when this call inserted it).
+REGISTER_PARTICIPANT_PG_SQL = """
+    WITH ev AS (
+        SELECT id, event_name FROM events WHERE event_code = $1 AND is_active = $2
+    ), ins AS (
+        INSERT INTO participants
+            (wallet_address, event_id, name, email, team_name, telegram_username, registration_date, poa_status, certificate_status)
+        SELECT $3::text, ev.id, $4::text, $5::text, $6::text, $7::text, $8::timestamp, 'not_minted', 'not_generated' FROM ev
+        ON CONFLICT (wallet_address, event_id) DO NOTHING
+        RETURNING event_id
+    )
+    SELECT ev.id, ev.event_name, EXISTS (SELECT 1 FROM ins) AS inserted,
+           p.name, p.email, p.poa_status, p.certificate_status
+    FROM ev LEFT JOIN participants p ON p.event_id = ev.id AND p.wallet_address = $3::text
+"""
+
+# SQLite has no INSERT inside a CTE: insert-from-select and read back in the same transaction instead
+REGISTER_PARTICIPANT_SQLITE_SQL = [
+    """INSERT INTO participants
+           (wallet_address, event_id, name, email, team_name, telegram_username, registration_date, poa_status, certificate_status)
+       SELECT ?, id, ?, ?, ?, ?, ?, 'not_minted', 'not_generated' FROM events WHERE event_code = ? AND is_active = ?
+       ON CONFLICT (wallet_address, event_id) DO NOTHING
+       RETURNING event_id""",
+    """SELECT e.id, e.event_name, p.name, p.email, p.poa_status, p.certificate_status
+       FROM events e LEFT JOIN participants p ON p.event_id = e.id AND p.wallet_address = ?
+       WHERE e.event_code = ? AND e.is_active = ?"""
+]
+
+
+async def upsert_participant(participant: ParticipantRegister):
+    """Register in one round trip; returns None for an unknown event code, else
+    (event_id, event_name, inserted, existing) with existing = (name, email, poa_status, certificate_status) or None"""
+    now = datetime.now()
+    if db_manager.is_postgres:
+        rows = await db_manager.execute_returning(REGISTER_PARTICIPANT_PG_SQL, [
+            participant.event_code, True, participant.wallet_address, participant.name, participant.email,
+            participant.team_name, participant.telegram_username, now
+        ])
+        if not rows:
+            return None
+        row = rows[0]
+        existing = (row[3], row[4], row[5], row[6]) if row[3] is not None else None
+        return row[0], row[1], row[2], existing
+
+    inserted, rows = await db_manager.fetch_many([
+        (REGISTER_PARTICIPANT_SQLITE_SQL[0], [
+            participant.wallet_address, participant.name, participant.email, participant.team_name,
+            participant.telegram_username, now.isoformat(), participant.event_code, 1
+        ]),
+        (REGISTER_PARTICIPANT_SQLITE_SQL[1], [participant.wallet_address, participant.event_code, 1])
+    ])
+    if not rows:
+        return None
+    row = rows[0]
+    existing = (row[2], row[3], row[4], row[5]) if (not inserted and row[2] is not None) else None
+    return row[0], row[1], bool(inserted), existing
+
+
 @app.post("/register_participant")
 async def register_participant(participant: ParticipantRegister):
     """Register a participant and mint PoA NFT"""
-    print(f"Registration attempt: {participant.wallet_address} for event code: {participant.event_code}")
+    logger.debug("Registration attempt: %s for event code: %s", participant.wallet_address, participant.event_code)
     
     try:
-        # Validate event code
-        event_sql, event_params = convert_sql_for_postgres(
-            "SELECT id, event_name FROM events WHERE event_code = ? AND is_active = ?",
-            [participant.event_code, 1 if not db_manager.is_postgres else True]
-        )
-        event_result = await db_manager.execute_query(event_sql, event_params, fetch=True)
-        
-        if not event_result:
-            print(f"Invalid event code: {participant.event_code}")
+        result = await upsert_participant(participant)
+        if result is None:
+            logger.info("Invalid event code: %s", participant.event_code)
             raise HTTPException(status_code=404, detail=f"Invalid event code: {participant.event_code}")
         
-        event = event_result[0]
-        event_id, event_name = event[0], event[1]
-        print(f"Found event: {event_name} (ID: {event_id})")
-        
-        # Check if this wallet address is already used for this event
-        existing_sql, existing_params = convert_sql_for_postgres(
-            "SELECT wallet_address, name, email, poa_status, certificate_status FROM participants WHERE wallet_address = ? AND event_id = ?",
-            [participant.wallet_address, event_id]
-        )
-        existing_result = await db_manager.execute_query(existing_sql, existing_params, fetch=True)
+        event_id, event_name, inserted, existing = result
         
-        if existing_result:
-            existing = existing_result[0]
-            existing_name, existing_email = existing[1], existing[2]
-            poa_status, certificate_status = existing[3], existing[4]
+        if not inserted:
+            if existing is None:
+                # Lost a race with a registration committed after this statement's snapshot (Postgres only)
+                existing_sql, existing_params = convert_sql_for_postgres(
+                    "SELECT name, email, poa_status, certificate_status FROM participants WHERE wallet_address = ? AND event_id = ?",
+                    [participant.wallet_address, event_id]
+                )
+                existing_result = await db_manager.execute_query(existing_sql, existing_params, fetch=True)
+                if not existing_result:
+                    raise HTTPException(status_code=500, detail="Registration failed: please retry")
+                existing = tuple(existing_result[0])
+            
+            existing_name, existing_email, poa_status, certificate_status = existing
             
             # Check if it's the same person (same name and email) trying to register again
             if existing_name.lower() == participant.name.lower() and existing_email.lower() == participant.email.lower():
-                print(f"[ERROR] Same user already registered: {participant.wallet_address}")
+                logger.info("Same user already registered: %s", participant.wallet_address)
                 
                 # Provide specific error message based on their completion status
                 if certificate_status == 'minted':
@@ -1675,7 +1726,7 @@ async def register_participant(participant: ParticipantRegister):
                 raise HTTPException(status_code=400, detail=error_msg)
             else:
                 # Different person trying to use the same wallet address
-                print(f"[ERROR] Wallet address already in use: {participant.wallet_address} by {existing_name} ({existing_email})")
+                logger.info("Wallet address already in use: %s by %s (%s)", participant.wallet_address, existing_name, existing_email)
                 raise HTTPException(
                     status_code=400, 
                     detail={
@@ -1688,39 +1739,7 @@ async def register_participant(participant: ParticipantRegister):
                     }
                 )
         
-        # Register new participant 
-        print(f"[INFO] Registering new participant: {participant.name}")
-        try:
-            register_sql, register_params = convert_sql_for_postgres(
-                """INSERT INTO participants 
-                   (wallet_address, event_id, name, email, team_name, telegram_username, registration_date, poa_status, certificate_status) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                [participant.wallet_address, event_id, participant.name, participant.email, participant.team_name, 
-                 participant.telegram_username, datetime.now() if db_manager.is_postgres else datetime.now().isoformat(), 'not_minted', 'not_generated']
-            )
-            
-            result = await db_manager.execute_query(register_sql, register_params)
-            print(f"Participant registered successfully")
-        except Exception as e:
-            if "duplicate key" in str(e).lower() or "unique constraint" in str(e).lower():
-                # Check if already registered for this specific event
-                check_sql, check_params = convert_sql_for_postgres(
-                    "SELECT name FROM participants WHERE wallet_address = ? AND event_id = ?",
-                    [participant.wallet_address, event_id]
-                )
-                existing = await db_manager.execute_query(check_sql, check_params, fetch=True)
-                if existing:
-                    existing_name = existing[0]['name'] if isinstance(existing[0], dict) else existing[0][0]
-                    return {
-                        "message": f"Wallet already registered for this event as '{existing_name}'",
-                        "event_name": event_name,
-                        "event_id": event_id,
-                        "already_registered": True
-                    }
-            # Re-raise other errors
-            print(f"Registration error: {e}")
-            raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
-        
+        logger.info("Participant registered successfully: %s for %s (ID: %s)", participant.name, event_name, event_id)
         return {
             "message": "Registration successful - please mint PoA NFT",
             "participant_id": "registered",
@@ -1729,122 +1748,33 @@ async def register_participant(participant: ParticipantRegister):
             "requires_nft_mint": True
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Registration error: {e}")
+        logger.exception("Registration error: %s", e)
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 @app.post("/telegram/webhook")
-async def telegram_webhook(update: dict):
-    """Handle Telegram bot webhook updates"""
-    try:
-        # Check if this is a message update
-        if 'message' not in update:
-            return {"ok": True}
-        
-        message = update['message']
-        
-        # Check if message has text and is from a user (not a bot)
-        if 'text' not in message or message.get('from', {}).get('is_bot', False):
-            return {"ok": True}
-        
-        text = message['text'].strip()
-        user = message['from']
-        chat = message['chat']
-        
-        # Handle /0xday command
-        if text.lower() in ['/0xday', '/0xday@certs0xday_bot']:
-            user_id = user['id']
-            username = user.get('username', '')
-            first_name = user.get('first_name', '')
-            last_name = user.get('last_name', '')
-            
-            print(f"Processing /0xday command from user {user_id} (@{username})")
-            
-            # Handle verification in both private chat and group
-            if chat['type'] == 'private' or (chat['type'] in ['group', 'supergroup'] and chat.get('id') == int(TELEGRAM_CHAT_ID)):
-                # Verify user is actually in the group
-                try:
-                    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getChatMember"
-                    params = {
-                        'chat_id': TELEGRAM_CHAT_ID,
-                        'user_id': user_id
-                    }
-                    
-                    response = requests.get(url, params=params, timeout=10)
-                    result = response.json()
-                    
-                    if response.status_code == 200 and result.get('ok'):
-                        member_status = result.get('result', {}).get('status')
-                        
-                        if member_status in ['member', 'administrator', 'creator']:
-                            # User is verified! Store in database
-                            verification_token = asyncio.run(store_verified_telegram_user(
-                                user_id, username, first_name, last_name
-                            ))
-                            
-                            response_text = f"""✅ <b>Verification Successful!</b>
-                            
-Hello {first_name}! Your Telegram account has been verified for 0x.day events.
-
-📝 <b>Your Details:</b>
-• Username: @{username}
-• Status: Verified Member
-
-🎯 <b>Next Steps:</b>
-1. Visit our event registration page
-2. Enter your username: <code>{username}</code>
-3. Complete your event registration
-
-🔒 Your verification is valid for all 0x.day events.
-💡 You can verify by messaging /0xday in the group or privately to this bot."""
-                            
-                            send_telegram_message(user_id, response_text)
-                            
-                        elif member_status in ['left', 'kicked']:
-                            response_text = f"""❌ <b>Verification Failed</b>
-                            
-Sorry {first_name}, you're not currently a member of our community.
-
-🔗 <b>Join our community first:</b>
-{TELEGRAM_GROUP_LINK}
-
-After joining, send /0xday again to verify."""
-                            
-                            send_telegram_message(user_id, response_text)
-                            
-                    else:
-                        error_desc = result.get('description', 'Unknown error')
-                        print(f"Error checking membership: {error_desc}")
-                        
-                        response_text = f"""❌ <b>Verification Error</b>
-                        
-Sorry {first_name}, there was an issue verifying your membership.
-
-Please try again in a few moments, or contact support if the issue persists."""
-                        
-                        send_telegram_message(user_id, response_text)
-                        
-                except Exception as e:
-                    print(f"Error during membership verification: {e}")
-                    
-                    response_text = f"""❌ <b>Technical Error</b>
-                    
-Sorry {first_name}, there was a technical issue.
-
-Please try again later or contact support."""
-                    
-                    send_telegram_message(user_id, response_text)
-            
-            else:
-                # Message sent in group - just acknowledge
-                response_text = f"Hi {first_name}! Please send me /0xday in a private message to verify your account."
-                send_telegram_message(user_id, response_text)
-        
-        return {"ok": True}
-        
-    except Exception as e:
-        print(f"Webhook error: {e}")
-        return {"ok": False, "error": str(e)}
+async def telegram_webhook(request: Request):
+    """Handle Telegram bot webhook updates: acknowledge at once, the update dispatcher does the work"""
+    if not update_dispatcher.running:
+        raise HTTPException(status_code=503, detail="Telegram bot not configured")
+    if TELEGRAM_WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != TELEGRAM_WEBHOOK_SECRET:
+        raise HTTPException(status_code=403, detail="Invalid webhook secret")
+    try:
+        update = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid update body")
+
+    if await update_dispatcher.submit(update) == "full":
+        # Telegram redelivers non-2xx updates later, which spreads a burst out instead of losing it
+        raise HTTPException(status_code=503, detail="Update queue full")
+    return {"ok": True}
+
+@app.get("/telegram/dispatcher")
+async def get_telegram_dispatcher_status():
+    """Webhook/polling update queue depth and counters"""
+    return {"webhook": bool(TELEGRAM_WEBHOOK_URL), **update_dispatcher.stats()}
 
 @app.post("/verify-telegram-membership")
 async def verify_telegram_membership(verification: TelegramVerification):
@@ -1859,7 +1789,32 @@ async def verify_telegram_membership(verification: TelegramVerification):
     if not telegram_username:
         raise HTTPException(status_code=400, detail="Telegram username is required")
     
-    print(f"Verifying Telegram user: @{telegram_username}")
+    logger.debug("Verifying Telegram user: @%s", telegram_username)
+    
+    # Recently verified (or recently updated via chat_member) users are answered without calling Telegram.
+    # The cache is per worker process while a chat_member update reaches only one of them, so a hit is only
+    # trusted if it agrees with the shared telegram_verified_users row (a primary-key lookup).
+    cached, fresh = membership_cache.lookup(telegram_username)
+    if cached and fresh:
+        has_row = await has_verified_telegram_row(cached['user_id'])
+        cached_member = cached.get('verified') and cached.get('status') in MEMBER_STATUSES
+        cached_left = cached.get('status') in ['left', 'kicked']
+        if cached_member and has_row:
+            return {
+                "verified": True,
+                "message": "Telegram membership verified successfully",
+                "username": telegram_username,
+                "verified_at": cached.get('verified_at'),
+                "member_status": cached['status']
+            }
+        if cached_left and not has_row:
+            raise HTTPException(
+                status_code=400,
+                detail=f"User @{telegram_username} is no longer a member of our Telegram community. Please rejoin and verify again."
+            )
+        if cached_member or cached_left:
+            # Another worker saw the user leave (or rejoin and verify); check with Telegram below
+            membership_cache.forget(cached['user_id'])
     
     try:
         # Step 1: Check if user exists in our verified users database (with retry)
@@ -1873,11 +1828,11 @@ async def verify_telegram_membership(verification: TelegramVerification):
                 break
 
             if attempt < max_retries - 1:
-                print(f"User @{telegram_username} not found, retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
+                logger.info("User @%s not found, retrying in %s seconds... (attempt %s/%s)", telegram_username, retry_delay, attempt + 1, max_retries)
                 import asyncio
                 await asyncio.sleep(retry_delay)
             else:
-                print(f"User @{telegram_username} not found after {max_retries} attempts")
+                logger.warning("User @%s not found after %s attempts", telegram_username, max_retries)
 
         if not verified_user:
             raise HTTPException(
@@ -1885,19 +1840,12 @@ async def verify_telegram_membership(verification: TelegramVerification):
                 detail=f"User @{telegram_username} not found in our verified members list. Please join our Telegram community and message /0xday in the group to verify your membership first."
             )
         
-        print(f"Found verified user: {verified_user['user_id']}")
+        logger.debug("Found verified user: %s", verified_user['user_id'])
         
         # Step 2: Double-check current membership status using stored user_id
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getChatMember"
-        params = {
-            'chat_id': TELEGRAM_CHAT_ID,
-            'user_id': verified_user['user_id']
-        }
+        result = await telegram_client.get_chat_member(TELEGRAM_CHAT_ID, verified_user['user_id'])
         
-        response = requests.get(url, params=params, timeout=15)
-        result = response.json()
-        
-        if response.status_code == 200 and result.get('ok'):
+        if result.get('ok'):
             member_status = result.get('result', {}).get('status')
             
             if member_status in ['member', 'administrator', 'creator']:
@@ -1907,8 +1855,10 @@ async def verify_telegram_membership(verification: TelegramVerification):
                     [verified_user['user_id']]
                 )
                 await db_manager.execute_query(update_sql, update_params)
+                membership_cache.update(verified_user['user_id'], verified_user['username'], status=member_status,
+                                        verified=True, verified_at=verified_user['verified_at'])
                 
-                print(f"Verification successful for @{telegram_username} (status: {member_status})")
+                logger.info("Verification successful for @%s (status: %s)", telegram_username, member_status)
                 
                 return {
                     "verified": True,
@@ -1925,6 +1875,7 @@ async def verify_telegram_membership(verification: TelegramVerification):
                     [verified_user['user_id']]
                 )
                 await db_manager.execute_query(delete_sql, delete_params)
+                membership_cache.update(verified_user['user_id'], verified_user['username'], status=member_status, verified=False)
                 
                 raise HTTPException(
                     status_code=400,
@@ -1937,7 +1888,7 @@ async def verify_telegram_membership(verification: TelegramVerification):
                 )
         else:
             error_description = result.get('description', 'Unknown error')
-            print(f"API Error checking membership: {error_description}")
+            logger.warning("API Error checking membership: %s", error_description)
             
             if 'user not found' in error_description.lower():
                 raise HTTPException(
@@ -1950,20 +1901,8 @@ async def verify_telegram_membership(verification: TelegramVerification):
                     detail="Technical error verifying membership. Please try again later."
                 )
                 
-    except requests.exceptions.Timeout:
-        print("Request timed out")
-        raise HTTPException(
-            status_code=500,
-            detail="Request to Telegram API timed out. Please try again."
-        )
-    except requests.exceptions.ConnectionError:
-        print("Connection error")
-        raise HTTPException(
-            status_code=500,
-            detail="Failed to connect to Telegram API. Please check your internet connection."
-        )
-    except requests.exceptions.RequestException as e:
-        print(f"Request exception: {e}")
+    except TelegramAPIError as e:
+        logger.warning("Telegram API unreachable: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to connect to Telegram API: {str(e)}"
@@ -1972,10 +1911,7 @@ async def verify_telegram_membership(verification: TelegramVerification):
         # Re-raise HTTP exceptions as-is
         raise
     except Exception as e:
-        print(f"Unexpected error: {e}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Unexpected error verifying @%s: %s", telegram_username, e)
         raise HTTPException(
             status_code=500,
             detail=f"Unexpected error during verification: {str(e)}"
@@ -2010,14 +1946,14 @@ async def confirm_poa_mint(request: dict):
         if not participant:
             raise HTTPException(status_code=404, detail="Participant not found")
         
-        print(f"PoA mint confirmed for {wallet_address} - TX: {tx_hash}")
+        logger.info("PoA mint confirmed for %s - TX: %s", wallet_address, tx_hash)
         return {
             "message": "PoA NFT mint confirmed",
             "tx_hash": tx_hash
         }
         
     except Exception as e:
-        print(f"Error confirming PoA mint: {e}")
+        logger.exception("Error confirming PoA mint: %s", e)
         raise HTTPException(status_code=500, detail=f"Error confirming PoA mint: {str(e)}")
 
 @app.post("/generate_poa_metadata/{event_id}")
@@ -2062,8 +1998,7 @@ async def bulk_mint_poa(event_id: int, request: dict):
     organizer_wallet = request.get("organizer_wallet")
     participant_ids = request.get("participant_ids", [])  # Optional list of specific participant IDs
     
-    print(f"[DEBUG] BULK MINT DEBUG - Received organizer_wallet: {organizer_wallet}")
-    print(f"[DEBUG] BULK MINT DEBUG - Received participant_ids: {participant_ids}")
+    logger.debug("BULK MINT - Received organizer_wallet: %s, participant_ids: %s", organizer_wallet, participant_ids)
     
     if not organizer_wallet:
         raise HTTPException(status_code=400, detail="Organizer wallet address required")
@@ -2073,26 +2008,26 @@ async def bulk_mint_poa(event_id: int, request: dict):
         if participant_ids:
             # Get specific selected participants
             placeholders = ','.join('?' for _ in participant_ids)
-            participants_sql = f"SELECT wallet_address, name FROM participants WHERE event_id = ? AND id IN ({placeholders}) AND (poa_status = 'not_minted' OR poa_status IS NULL)"
+            participants_sql = f"SELECT id, wallet_address, name FROM participants WHERE event_id = ? AND id IN ({placeholders}) AND (poa_status = 'not_minted' OR poa_status IS NULL) ORDER BY id"
             participants_params = [event_id] + participant_ids
-            print(f"[DEBUG] BULK MINT DEBUG - Querying selected participants: {participant_ids}")
+            logger.debug("BULK MINT - Querying selected participants: %s", participant_ids)
         else:
             # Get all registered participants for this event (fallback)
-            participants_sql = "SELECT wallet_address, name FROM participants WHERE event_id = ? AND (poa_status = 'not_minted' OR poa_status IS NULL)"
+            participants_sql = "SELECT id, wallet_address, name FROM participants WHERE event_id = ? AND (poa_status = 'not_minted' OR poa_status IS NULL) ORDER BY id"
             participants_params = [event_id]
-            print(f"[DEBUG] BULK MINT DEBUG - Querying all participants for event {event_id}")
+            logger.debug("BULK MINT - Querying all participants for event %s", event_id)
         
         converted_participants_sql, converted_params = convert_sql_for_postgres(participants_sql, participants_params)
-        print(f"[DEBUG] BULK MINT SQL: {converted_participants_sql}")
-        print(f"[DEBUG] BULK MINT PARAMS: {converted_params}")
+        logger.debug("BULK MINT SQL: %s PARAMS: %s", converted_participants_sql, converted_params)
         participants_result = await db_manager.execute_query(converted_participants_sql, converted_params, fetch=True)
-        print(f"[DEBUG] BULK MINT RESULT: {participants_result}")
+        logger.debug("BULK MINT RESULT: %s", participants_result)
         
-        # Additional debug: Check what participants exist for this event
-        debug_sql = "SELECT id, wallet_address, name, poa_status FROM participants WHERE event_id = ?"
-        debug_converted_sql, debug_params = convert_sql_for_postgres(debug_sql, [event_id])
-        all_participants = await db_manager.execute_query(debug_converted_sql, debug_params, fetch=True)
-        print(f"[DEBUG] ALL PARTICIPANTS FOR EVENT {event_id}: {all_participants}")
+        # Additional debug: Check what participants exist for this event (reads the whole event, so debug only)
+        if debug_enabled(logger):
+            debug_sql = "SELECT id, wallet_address, name, poa_status FROM participants WHERE event_id = ?"
+            debug_converted_sql, debug_params = convert_sql_for_postgres(debug_sql, [event_id])
+            all_participants = await db_manager.execute_query(debug_converted_sql, debug_params, fetch=True)
+            logger.debug("ALL PARTICIPANTS FOR EVENT %s: %s", event_id, all_participants)
         
         if not participants_result:
             # Get eligible participants for better error message
@@ -2114,8 +2049,9 @@ async def bulk_mint_poa(event_id: int, request: dict):
                 raise HTTPException(status_code=404, detail=f"No participants eligible for minting. Eligible participants: {[(p[0], p[1], p[2]) for p in eligible_participants]}")
         
         # Convert result format
-        participants = [(p['wallet_address'] if isinstance(p, dict) else p[0], 
-                        p['name'] if isinstance(p, dict) else p[1]) for p in participants_result]
+        participants = [(p['id'] if isinstance(p, dict) else p[0],
+                        p['wallet_address'] if isinstance(p, dict) else p[1], 
+                        p['name'] if isinstance(p, dict) else p[2]) for p in participants_result]
         
         # Get event name for NFT metadata
         event_sql = "SELECT event_name FROM events WHERE id = ?"
@@ -2138,18 +2074,22 @@ async def bulk_mint_poa(event_id: int, request: dict):
         recipient_addresses = [organizer_checksum] * len(participants)
         
         # Generate PoA metadata for the event
-        print(f"[INFO] Generating PoA metadata for event: {event_name}")
+        logger.debug("Generating PoA metadata for event: %s", event_name)
         poa_metadata = generate_poa_metadata(event_name, "Event Participants")
         
         # Upload metadata to IPFS
-        print(f"[INFO] Uploading metadata to IPFS...")
+        logger.debug("Uploading metadata to IPFS...")
         upload_result = upload_poa_metadata_to_ipfs(poa_metadata)
         
         if not upload_result["success"]:
             raise HTTPException(status_code=500, detail=f"Failed to upload metadata to IPFS: {upload_result['error']}")
         
         ipfs_hash = upload_result["metadata_hash"]
-        print(f"[INFO] Metadata uploaded successfully. IPFS hash: {ipfs_hash}")
+        logger.debug("Metadata uploaded successfully. IPFS hash: %s", ipfs_hash)
+        
+        # Minted token IDs are assigned to these participants in this order when the mint is confirmed
+        prepared_ids = [p[0] for p in participants]
+        await tx_reconciler.prepare_bulk_mint(event_id, participant_ids, prepared_ids)
         
         # Return data for frontend to execute bulk mint transaction
         return {
@@ -2158,6 +2098,7 @@ async def bulk_mint_poa(event_id: int, request: dict):
             "event_name": event_name,
             "recipients": recipient_addresses,
             "participant_count": len(participants),
+            "participant_ids": prepared_ids,
             "organizer_wallet": organizer_wallet,
             "ipfs_hash": ipfs_hash,
             "metadata_url": f"https://red-biological-whitefish-939.mypinata.cloud/ipfs/{ipfs_hash}"
@@ -2167,58 +2108,98 @@ async def bulk_mint_poa(event_id: int, request: dict):
         # Re-raise HTTPException as-is to preserve error details
         raise
     except Exception as e:
-        print(f"Error in bulk_mint_poa: {e}")
+        logger.exception("Error in bulk_mint_poa: %s", e)
         raise HTTPException(status_code=500, detail=f"Bulk mint preparation failed: {str(e)}")
 
 @app.post("/confirm_bulk_mint_poa")
 async def confirm_bulk_mint_poa(request: dict):
-    """Confirm that bulk PoA NFTs were minted"""
+    """Record a bulk PoA mint; participants are updated from the transaction receipt, not the request body"""
     event_id = request.get("event_id")
     tx_hash = request.get("tx_hash")
-    token_ids = request.get("token_ids", [])
     participant_ids = request.get("participant_ids", [])  # Accept specific participant IDs
     
     if not all([event_id, tx_hash]):
         raise HTTPException(status_code=400, detail="Missing required fields")
+    if not tx_reconciler.enabled:
+        raise HTTPException(status_code=503, detail="Blockchain not configured - cannot verify transaction")
     
     try:
-        # Get participants based on selection
-        if participant_ids:
-            # Get specific selected participants that were minted
-            placeholders = ','.join('?' for _ in participant_ids)
-            participants_sql = f"SELECT id, wallet_address FROM participants WHERE event_id = ? AND id IN ({placeholders}) AND (poa_status = 'not_minted' OR poa_status IS NULL) ORDER BY id"
-            participants_params = [event_id] + participant_ids
-        else:
-            # Fallback to all registered participants for this event
-            participants_sql = "SELECT id, wallet_address FROM participants WHERE event_id = ? AND (poa_status = 'not_minted' OR poa_status IS NULL) ORDER BY id"
-            participants_params = [event_id]
+        # The ordered participants /bulk_mint_poa prepared this mint for (server-side, never from the request)
+        snapshot = await tx_reconciler.prepared_bulk_mint(event_id, participant_ids)
+        if not snapshot:
+            raise HTTPException(status_code=409, detail="No prepared bulk mint for this event and selection - call /bulk_mint_poa first")
         
-        converted_participants_sql, converted_params = convert_sql_for_postgres(participants_sql, participants_params)
-        participants_result = await db_manager.execute_query(converted_participants_sql, converted_params, fetch=True)
+        await tx_reconciler.submit(tx_hash, "bulk_mint_poa", event_id, snapshot)
         
-        # Convert result format
-        participants = [(p['id'] if isinstance(p, dict) else p[0], 
-                        p['wallet_address'] if isinstance(p, dict) else p[1]) for p in participants_result]
-        
-        # Update each participant's status to minted
-        for i, (participant_id, wallet_address) in enumerate(participants):
-            token_id = token_ids[i] if i < len(token_ids) else None
-            
-            update_sql = "UPDATE participants SET poa_status = 'minted', poa_token_id = ?, poa_minted_at = CURRENT_TIMESTAMP WHERE id = ?"
-            converted_update_sql, update_params = convert_sql_for_postgres(update_sql, [token_id, participant_id])
-            await db_manager.execute_query(converted_update_sql, update_params)
+        # Most clients confirm after the wallet reports the tx mined, so try to reconcile right away
+        await tx_reconciler.reconcile_pending()
+        status = await tx_reconciler.get_status(tx_hash)
         
-        print(f"Bulk PoA mint confirmed for {len(participants)} participants - TX: {tx_hash}")
+        logger.info("Bulk PoA mint submitted for %s participants - TX: %s (%s)", len(snapshot), tx_hash, status['status'])
         return {
-            "message": f"Bulk PoA NFT mint confirmed for {len(participants)} participants",
+            "message": f"Bulk PoA NFT mint {status['status']} for {len(snapshot)} participants",
             "tx_hash": tx_hash,
-            "participants_updated": len(participants)
+            "status": status['status'],
+            "error": status['error'],
+            "participants_updated": status['participants_updated'] or 0
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in confirm_bulk_mint_poa: {e}")
+        logger.exception("Error in confirm_bulk_mint_poa: %s", e)
         raise HTTPException(status_code=500, detail=f"Bulk mint confirmation failed: {str(e)}")
 
+@app.post("/poa_mint_jobs/{event_id}")
+async def create_poa_mint_job(event_id: int, request: dict = None):
+    """Mint PoAs server-side straight to participant wallets in gas-sized chunks (background, resumable)"""
+    participant_ids = (request or {}).get("participant_ids") or []
+    if not poa_batch_minter.enabled:
+        raise HTTPException(status_code=503, detail="Blockchain not configured - server-side minting unavailable")
+    
+    try:
+        event_sql, event_params = convert_sql_for_postgres("SELECT event_name FROM events WHERE id = ?", [event_id])
+        event_result = await db_manager.execute_query(event_sql, event_params, fetch=True)
+        if not event_result:
+            raise HTTPException(status_code=404, detail="Event not found")
+        event_name = event_result[0]['event_name'] if isinstance(event_result[0], dict) else event_result[0][0]
+        
+        upload_result = upload_poa_metadata_to_ipfs(generate_poa_metadata(event_name, "Event Participants"))
+        if not upload_result["success"]:
+            raise HTTPException(status_code=500, detail=f"Failed to upload metadata to IPFS: {upload_result['error']}")
+        
+        job = await poa_batch_minter.create_job(event_id, upload_result["metadata_hash"], participant_ids)
+        return {"message": f"Minting {job['total']} PoA NFTs in {len(job['chunks'])} transactions", "job": job}
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Error creating PoA mint job: %s", e)
+        raise HTTPException(status_code=500, detail=f"PoA mint job failed to start: {str(e)}")
+
+@app.get("/poa_mint_jobs/{job_id}")
+async def get_poa_mint_job(job_id: str):
+    """Progress of a server-side PoA mint job, per chunk"""
+    job = await poa_batch_minter.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/poa_mint_jobs/{job_id}/resume")
+async def resume_poa_mint_job(job_id: str):
+    """Continue a failed or interrupted PoA mint job from its first unconfirmed chunk"""
+    try:
+        job = await poa_batch_minter.resume(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.post("/update_poa_metadata/{event_id}")
 async def update_poa_metadata_endpoint(event_id: int, request: dict):
     """Update PoA token metadata with event name for all minted tokens"""
@@ -2255,7 +2236,7 @@ async def update_poa_metadata_endpoint(event_id: int, request: dict):
         
         for token_id in token_ids:
             try:
-                result = update_poa_token_metadata(token_id, metadata_hash)
+                result = await update_poa_token_metadata(token_id, metadata_hash)
                 if result["success"]:
                     successful_updates.append(token_id)
                 else:
@@ -2283,8 +2264,8 @@ async def batch_transfer_poa(event_id: int, request: dict):
     organizer_wallet = request.get("organizer_wallet")
     participant_ids = request.get("participant_ids", [])  # Optional list of specific participant IDs
     
-    print(f"[DEBUG] BATCH TRANSFER DEBUG - Received organizer_wallet: {organizer_wallet}")
-    print(f"[DEBUG] BATCH TRANSFER DEBUG - Received participant_ids: {participant_ids}")
+    logger.debug("BATCH TRANSFER - Received organizer_wallet: %s", organizer_wallet)
+    logger.debug("BATCH TRANSFER - Received participant_ids: %s", participant_ids)
     
     if not organizer_wallet:
         raise HTTPException(status_code=400, detail="Organizer wallet address required")
@@ -2296,12 +2277,12 @@ async def batch_transfer_poa(event_id: int, request: dict):
             placeholders = ','.join('?' for _ in participant_ids)
             participants_sql = f"SELECT wallet_address, poa_token_id, name FROM participants WHERE event_id = ? AND id IN ({placeholders}) AND poa_status = 'minted' AND poa_token_id IS NOT NULL"
             participants_params = [event_id] + participant_ids
-            print(f"[DEBUG] BATCH TRANSFER DEBUG - Querying selected participants: {participant_ids}")
+            logger.debug("BATCH TRANSFER - Querying selected participants: %s", participant_ids)
         else:
             # Get all minted but not transferred participants (fallback)
             participants_sql = "SELECT wallet_address, poa_token_id, name FROM participants WHERE event_id = ? AND poa_status = 'minted' AND poa_token_id IS NOT NULL"
             participants_params = [event_id]
-            print(f"[DEBUG] BATCH TRANSFER DEBUG - Querying all minted participants for event {event_id}")
+            logger.debug("BATCH TRANSFER - Querying all minted participants for event %s", event_id)
         
         converted_participants_sql, converted_params = convert_sql_for_postgres(participants_sql, participants_params)
         participants_result = await db_manager.execute_query(converted_participants_sql, converted_params, fetch=True)
@@ -2358,13 +2339,13 @@ async def batch_transfer_poa(event_id: int, request: dict):
                 recipients.append(checksum_address)
                 token_ids.append(token_id)
             except Exception as e:
-                print(f"Warning: Invalid wallet address {wallet_address}: {e}")
+                logger.warning("Invalid wallet address %s: %s", wallet_address, e)
                 continue
         
-        print(f"[INFO] Batch transfer for event {event_id}:")
-        print(f"   - Organizer: {organizer_wallet}")
-        print(f"   - Recipients: {recipients}")
-        print(f"   - Token IDs: {token_ids}")
+        logger.debug("Batch transfer for event %s:", event_id)
+        logger.debug("   - Organizer: %s", organizer_wallet)
+        logger.debug("   - Recipients: %s", recipients)
+        logger.debug("   - Token IDs: %s", token_ids)
         
         return {
             "message": f"Ready to transfer {len(participants)} PoA NFTs",
@@ -2376,46 +2357,49 @@ async def batch_transfer_poa(event_id: int, request: dict):
         }
         
     except Exception as e:
-        print(f"Error in batch_transfer_poa: {e}")
+        logger.exception("Error in batch_transfer_poa: %s", e)
         raise HTTPException(status_code=500, detail=f"Batch transfer preparation failed: {str(e)}")
 
 @app.post("/confirm_batch_transfer_poa")
 async def confirm_batch_transfer_poa(request: dict):
-    """Confirm that PoA NFTs were batch transferred"""
+    """Record a batch PoA transfer; participants are marked transferred from the receipt's Transfer logs"""
     event_id = request.get("event_id")
     tx_hash = request.get("tx_hash")
-    participant_ids = request.get("participant_ids", [])  # Accept specific participant IDs
     
     if not all([event_id, tx_hash]):
         raise HTTPException(status_code=400, detail="Missing required fields")
+    if not tx_reconciler.enabled:
+        raise HTTPException(status_code=503, detail="Blockchain not configured - cannot verify transaction")
     
     try:
-        # Update participants based on selection
-        if participant_ids:
-            # Update specific selected participants to transferred status
-            placeholders = ','.join('?' for _ in participant_ids)
-            update_sql = f"UPDATE participants SET poa_status = 'transferred', poa_transferred_at = CURRENT_TIMESTAMP WHERE event_id = ? AND id IN ({placeholders}) AND poa_status = 'minted'"
-            update_params = [event_id] + participant_ids
-        else:
-            # Fallback to update all minted participants to transferred status
-            update_sql = "UPDATE participants SET poa_status = 'transferred', poa_transferred_at = CURRENT_TIMESTAMP WHERE event_id = ? AND poa_status = 'minted'"
-            update_params = [event_id]
-        
-        converted_update_sql, converted_params = convert_sql_for_postgres(update_sql, update_params)
-        result = await db_manager.execute_query(converted_update_sql, converted_params)
-        updated_count = len(participant_ids) if participant_ids else 0  # PostgreSQL doesn't return rowcount easily
+        await tx_reconciler.submit(tx_hash, "batch_transfer_poa", event_id)
+        await tx_reconciler.reconcile_pending()
+        status = await tx_reconciler.get_status(tx_hash)
+        updated_count = status['participants_updated'] or 0
         
-        print(f"Batch PoA transfer confirmed for {updated_count} participants - TX: {tx_hash}")
+        logger.info("Batch PoA transfer submitted - TX: %s (%s, %s participants)", tx_hash, status['status'], updated_count)
         return {
-            "message": f"Batch PoA NFT transfer confirmed for {updated_count} participants",
+            "message": f"Batch PoA NFT transfer {status['status']} for {updated_count} participants",
             "tx_hash": tx_hash,
+            "status": status['status'],
+            "error": status['error'],
             "participants_updated": updated_count
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"Error in confirm_batch_transfer_poa: {e}")
+        logger.exception("Error in confirm_batch_transfer_poa: %s", e)
         raise HTTPException(status_code=500, detail=f"Batch transfer confirmation failed: {str(e)}")
 
+@app.get("/reconciliation/{tx_hash}")
+async def get_reconciliation_status(tx_hash: str):
+    """Status of a submitted mint/transfer transaction (pending, confirmed, failed, dropped)"""
+    status = await tx_reconciler.get_status(tx_hash)
+    if not status:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return status
+
 @app.post("/upload_template/{event_id}")
 async def upload_template(event_id: int, file: UploadFile = File(...)):
     """Upload certificate template for an event"""
@@ -2507,7 +2491,7 @@ async def generate_certificates(event_id: int):
                 ipfs_hash = upload_to_pinata(cert_bytes, filename)
                 
                 # Mint certificate NFT
-                mint_result = mint_certificate_nft(wallet_address, event_id, ipfs_hash)
+                mint_result = await mint_certificate_nft(wallet_address, event_id, ipfs_hash)
                 
                 # Update participant record with certificate info
                 update_sql = """UPDATE participants 
@@ -2523,7 +2507,7 @@ async def generate_certificates(event_id: int):
                 successful_certificates += 1
                 
             except Exception as e:
-                print(f"Failed to generate certificate for {name}: {e}")
+                logger.warning("Failed to generate certificate for %s: %s", name, e)
                 failed_certificates += 1
         
         return {
@@ -2533,7 +2517,7 @@ async def generate_certificates(event_id: int):
         }
         
     except Exception as e:
-        print(f"Error in generate_certificates: {e}")
+        logger.exception("Error in generate_certificates: %s", e)
         raise HTTPException(status_code=500, detail=f"Certificate generation failed: {str(e)}")
 
 @app.post("/send_emails/{event_id}")
@@ -2659,7 +2643,7 @@ async def send_emails(event_id: int):
                 successful_emails += 1
                 
             except Exception as e:
-                print(f"Failed to send email to {email}: {e}")
+                logger.warning("Failed to send email to %s: %s", email, e)
                 failed_emails += 1
         
         return {
@@ -2669,7 +2653,7 @@ async def send_emails(event_id: int):
         }
         
     except Exception as e:
-        print(f"Error in send_emails: {e}")
+        logger.exception("Error in send_emails: %s", e)
         raise HTTPException(status_code=500, detail=f"Email sending failed: {str(e)}")
 
 @app.get("/events")
@@ -2717,13 +2701,13 @@ async def get_events():
         return {"events": events}
         
     except Exception as e:
-        print(f"Error getting events: {e}")
+        logger.exception("Error getting events: %s", e)
         raise HTTPException(status_code=500, detail=f"Error fetching events: {str(e)}")
 
 @app.get("/participants/{event_id}")
 async def get_participants(event_id: int):
     """Get all participants for an event from database with blockchain enrichment"""
-    print(f"Getting participants for event ID: {event_id}")
+    logger.debug("Getting participants for event ID: %s", event_id)
     
     try:
         # Get all database participants using new db_manager
@@ -2736,7 +2720,7 @@ async def get_participants(event_id: int):
         )
         db_participants = await db_manager.execute_query(participants_sql, participants_params, fetch=True)
         
-        print(f"Found {len(db_participants) if db_participants else 0} participants in database")
+        logger.debug("Found %s participants in database", len(db_participants) if db_participants else 0)
         
         # Build participant list directly from database (no blockchain enrichment needed)
         participants = []
@@ -2798,27 +2782,62 @@ async def get_participants(event_id: int):
                 
                 participants.append(participant)
         
-        print(f"Returning {len(participants)} participants from database")
+        logger.debug("Returning %s participants from database", len(participants))
         return {"participants": participants}
         
     except Exception as e:
-        print(f"Error getting participants: {e}")
+        logger.exception("Error getting participants: %s", e)
         raise HTTPException(status_code=500, detail=f"Error fetching participants: {str(e)}")
 
 @app.get("/participants/onchain/{event_id}")
 async def get_onchain_participants_only(event_id: int):
     """Get participants directly from blockchain (raw data)"""
     try:
-        participants = get_onchain_participants(event_id)
-        return {"participants": participants, "source": "blockchain"}
+        participants = await get_onchain_participants(event_id)
+        return {"participants": participants, "source": "blockchain", "index": chain_indexer.status()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching on-chain participants: {str(e)}")
 
+@app.get("/participants/verify_onchain/{event_id}")
+async def verify_participants_onchain(event_id: int, include_uris: bool = False):
+    """Check every participant's PoA/certificate ownership on-chain using batched (Multicall3) reads"""
+    if not contract_reader.enabled:
+        raise HTTPException(status_code=503, detail="Contract reads are not configured")
+    try:
+        sql, params = convert_sql_for_postgres(
+            """SELECT id, wallet_address, poa_token_id, certificate_token_id
+               FROM participants WHERE event_id = ? AND wallet_address IS NOT NULL""",
+            [event_id]
+        )
+        rows = await db_manager.execute_query(sql, params, fetch=True)
+        keys = ["id", "wallet_address", "poa_token_id", "certificate_token_id"]
+        participants = [dict(row) if hasattr(row, "keys") else dict(zip(keys, row)) for row in rows or []]
+
+        results = await asyncio.to_thread(contract_reader.verify_event_holdings, event_id, participants, include_uris)
+        for participant, result in zip(participants, results):
+            result["id"] = participant["id"]
+
+        mismatched = [
+            r for r in results
+            if r.get("poa_owned") is False or r.get("poa_event_matches") is False
+            or r.get("certificate_owned") is False or r.get("certificate_event_matches") is False
+        ]
+        return {
+            "event_id": event_id,
+            "checked": len(results),
+            "holding_poa": sum(1 for r in results if r["has_poa_for_event"]),
+            "mismatched": len(mismatched),
+            "participants": results
+        }
+    except Exception as e:
+        logger.warning("Error verifying participants on-chain: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error verifying participants on-chain: {str(e)}")
+
 @app.get("/participants/all")
 async def get_all_participants():
     """Get all participants from all events (on-chain data)"""
     try:
-        participants = get_onchain_participants()  # No event filter
+        participants = await get_onchain_participants()  # No event filter
         
         # Group by event
         by_event = {}
@@ -2932,20 +2951,20 @@ async def debug_blockchain():
     
     try:
         if w3:
-            debug_info["web3_connected"] = w3.isConnected()
-            debug_info["block_number"] = w3.eth.block_number
+            debug_info["web3_connected"] = await asyncio.to_thread(w3.isConnected)
+            debug_info["block_number"] = await asyncio.to_thread(lambda: w3.eth.block_number)
             debug_info["network_info"] = {
-                "chain_id": w3.eth.chain_id,
-                "is_connected": w3.isConnected()
+                "chain_id": await asyncio.to_thread(lambda: w3.eth.chain_id),
+                "is_connected": debug_info["web3_connected"]
             }
             
             if CONTRACT_ADDRESS:
                 debug_info["contract_configured"] = True
                 # Test contract call
-                contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+                contract = chain_context.contract(CONTRACT_ABI)
                 # Try to get event name for event 1 (will fail if no events, but that's OK)
                 try:
-                    test_call = contract.functions.eventNames(1).call()
+                    test_call = await asyncio.to_thread(contract.functions.eventNames(1).call)
                     debug_info["contract_test"] = "success"
                 except:
                     debug_info["contract_test"] = "contract deployed but no events yet"
@@ -2963,29 +2982,15 @@ async def debug_blockchain():
 async def get_participant_status(wallet_address: str):
     """Get participant status from blockchain for a specific wallet"""
     try:
-        if not all([w3, CONTRACT_ADDRESS]):
+        if not all([w3, CONTRACT_ADDRESS]) or not chain_indexer.enabled:
             return {"error": "Blockchain not configured"}
         
         # Convert wallet address to checksum format
         wallet_address = w3.to_checksum_address(wallet_address)
-        print(f"Getting participant status for (checksum): {wallet_address}")
+        logger.debug("Getting participant status for (checksum): %s", wallet_address)
             
-        # Get all PoA events for this wallet
-        contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
-        
-        # Get all PoA events for this wallet using getLogs
-        poa_events = contract.events.PoAMinted.get_logs(
-            fromBlock=0,
-            toBlock='latest',
-            argument_filters={'recipient': wallet_address}
-        )
-        
-        # Get all Certificate events for this wallet using getLogs  
-        cert_events = contract.events.CertificateMinted.get_logs(
-            fromBlock=0,
-            toBlock='latest',
-            argument_filters={'recipient': wallet_address}
-        )
+        # Tokens minted to / held by this wallet, served from the local event index
+        wallet_tokens = await chain_indexer.get_wallet_tokens(wallet_address)
         
         # Get database status for all events this wallet is registered for
         conn = sqlite3.connect(DB_PATH)
@@ -3022,21 +3027,19 @@ async def get_participant_status(wallet_address: str):
             }
         
         # Update with blockchain status
-        for event in poa_events:
-            event_id = event['args']['eventId']
-            token_id = event['args']['tokenId']
-            if event_id in events_status:
+        for token in wallet_tokens:
+            event_id = token['event_id']
+            if event_id not in events_status:
+                continue
+            if token['token_type'] == 'poa':
                 events_status[event_id]['poa_minted'] = True
-        
-        for event in cert_events:
-            event_id = event['args']['eventId']
-            token_id = event['args']['tokenId']
-            if event_id in events_status:
+            elif token['token_type'] == 'certificate':
                 events_status[event_id]['certificate_minted'] = True
         
         return {
             "wallet_address": wallet_address,
-            "events": events_status
+            "events": events_status,
+            "indexed_block": chain_indexer.synced_block
         }
         
     except Exception as e:
@@ -3123,7 +3126,7 @@ async def get_participant_status_from_db(wallet_address: str):
         }
         
     except Exception as e:
-        print(f"Error getting participant status: {e}")
+        logger.exception("Error getting participant status: %s", e)
         return {"error": str(e)}
 
 @app.get("/config")
@@ -3142,11 +3145,11 @@ async def bulk_generate_certificates(event_id: int, request: dict = None):
     if request:
         participant_ids = request.get("participant_ids", [])
     
-    print(f"[DEBUG] BULK CERTIFICATES DEBUG - Event ID: {event_id}")
-    print(f"[DEBUG] BULK CERTIFICATES DEBUG - Participant IDs: {participant_ids}")
+    logger.debug("BULK CERTIFICATES - Event ID: %s", event_id)
+    logger.debug("BULK CERTIFICATES - Participant IDs: %s", participant_ids)
     
     try:
-        processor = BulkCertificateProcessor()
+        processor = bulk_processor
         result = await processor.process_bulk_certificates(event_id, participant_ids=participant_ids)
         
         if result["success"]:
@@ -3197,7 +3200,7 @@ async def bulk_generate_certificates(event_id: int, request: dict = None):
 async def delete_event(event_id: int):
     """Delete an event - only for authorized wallet address (no session required)"""
 
-    print(f"Delete request for event {event_id}")
+    logger.info("Delete request for event %s", event_id)
 
     # No session verification needed - frontend already verified wallet address
 
@@ -3237,7 +3240,7 @@ async def delete_event(event_id: int):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting event {event_id}: {e}")
+        logger.exception("Error deleting event %s: %s", event_id, e)
         raise HTTPException(status_code=500, detail=f"Failed to delete event: {str(e)}")
 
 @app.post("/toggle_telegram_verification/{event_id}")
@@ -3267,145 +3270,95 @@ async def toggle_telegram_verification(event_id: int, enabled: bool):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error toggling telegram verification for event {event_id}: {e}")
+        logger.exception("Error toggling telegram verification for event %s: %s", event_id, e)
         raise HTTPException(status_code=500, detail=f"Failed to toggle telegram verification: {str(e)}")
 
 @app.post("/start_background_certificate_generation/{event_id}")
 async def start_background_certificate_generation(event_id: int):
-    """Start background certificate generation for ALL participants with transferred PoA"""
-    global task_id_counter, background_tasks
-
-    task_id_counter += 1
-    task_id = f"cert_gen_{event_id}_{task_id_counter}"
-
-    # Initialize task status
-    background_tasks[task_id] = {
-        "event_id": event_id,
-        "status": "starting",
-        "total_participants": 0,
-        "completed": 0,
-        "failed": 0,
-        "current_step": "Initializing...",
-        "started_at": datetime.now().isoformat(),
-        "error": None
-    }
-
-    # Start background task
-    asyncio.create_task(background_certificate_generation(task_id, event_id))
-
-    return {"task_id": task_id, "status": "started"}
+    """Queue background certificate generation for ALL participants with transferred PoA"""
+    job = await certificate_job_queue.enqueue(event_id)
+    return {"task_id": job["id"], "status": "started"}
 
 @app.get("/background_task_status/{task_id}")
 async def get_background_task_status(task_id: str):
     """Get status of background certificate generation task"""
-    if task_id not in background_tasks:
+    job = await certificate_job_queue.get_job(task_id)
+    if not job:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    return background_tasks[task_id]
+    task = task_status(job)
+    # Per-stage queue depths when this process is the one running the job
+    pipeline = certificate_job_queue.pipeline_stats().get(task_id)
+    if pipeline:
+        task["pipeline"] = pipeline
+    return task
 
 @app.post("/cancel_background_task/{task_id}")
 async def cancel_background_task(task_id: str):
     """Cancel a background certificate generation task"""
-    if task_id not in background_tasks:
+    if not await certificate_job_queue.cancel(task_id):
         raise HTTPException(status_code=404, detail="Task not found")
 
-    background_tasks[task_id]["status"] = "cancelled"
-    background_tasks[task_id]["current_step"] = "Cancelled by user"
-
     return {"message": "Task cancelled successfully", "task_id": task_id}
 
 @app.post("/pause_background_task/{task_id}")
 async def pause_background_task(task_id: str):
     """Pause a background certificate generation task"""
-    if task_id not in background_tasks:
+    new_status = await certificate_job_queue.toggle_pause(task_id)
+    if new_status is None:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    current_status = background_tasks[task_id]["status"]
-    if current_status == "running":
-        background_tasks[task_id]["status"] = "paused"
-        background_tasks[task_id]["current_step"] = "Paused by user"
-    elif current_status == "paused":
-        background_tasks[task_id]["status"] = "running"
-        background_tasks[task_id]["current_step"] = "Resuming processing..."
-
-    return {"message": "Task status updated", "task_id": task_id, "new_status": background_tasks[task_id]["status"]}
+    return {"message": "Task status updated", "task_id": task_id, "new_status": new_status}
 
 @app.get("/active_background_tasks")
 async def get_active_background_tasks():
     """Get all currently active background tasks"""
     active_tasks = {}
-    for task_id, task_data in background_tasks.items():
-        if task_data["status"] in ["starting", "running", "paused"]:
-            # Extract event_id from task_id (format: cert_gen_{event_id}_{counter})
-            try:
-                event_id = int(task_id.split("_")[2])
-                active_tasks[event_id] = {
-                    "taskId": task_id,
-                    "status": task_data["status"],
-                    "total_participants": task_data["total_participants"],
-                    "completed": task_data["completed"],
-                    "failed": task_data["failed"],
-                    "current_step": task_data["current_step"],
-                    "error": task_data.get("error")
-                }
-            except (IndexError, ValueError):
-                continue
+    for job in await certificate_job_queue.active_jobs():
+        active_tasks[job["event_id"]] = task_status(job)
 
     return {"active_tasks": active_tasks}
 
-async def background_certificate_generation(task_id: str, event_id: int):
-    """Background task for certificate generation"""
-    try:
-        # Update status
-        background_tasks[task_id]["status"] = "running"
-        background_tasks[task_id]["current_step"] = "Getting PoA holders..."
+PROGRESS_STREAM_KEEPALIVE_SECONDS = float(os.getenv("PROGRESS_STREAM_KEEPALIVE_SECONDS", "15"))
 
-        # Get ALL participants with transferred PoA (no participant_ids filter)
-        processor = BulkCertificateProcessor()
+@app.get("/background_task_stream/{event_id}")
+async def stream_background_task(event_id: int, request: Request):
+    """Server-sent events for an event's certificate job: the current state first, then only changed fields"""
+    queue = progress_broker.subscribe(event_id)
 
-        # Get participants count first
-        participants = await processor.get_poa_holders_for_event(event_id, participant_ids=None)
-        if not participants:
-            background_tasks[task_id]["status"] = "completed"
-            background_tasks[task_id]["current_step"] = "No PoA holders found"
-            background_tasks[task_id]["error"] = "No participants with transferred PoA found"
-            return
-
-        background_tasks[task_id]["total_participants"] = len(participants)
-        background_tasks[task_id]["current_step"] = f"Processing {len(participants)} participants..."
-
-        # Process certificates with progress tracking
-        result = await processor.process_bulk_certificates_with_progress(
-            event_id,
-            participant_ids=None,
-            progress_callback=lambda completed, total, step: update_background_task_progress(
-                task_id, completed, total, step
-            )
-        )
+    async def events():
+        sent = {}
 
-        # Update final status
-        if result["success"]:
-            background_tasks[task_id]["status"] = "completed"
-            background_tasks[task_id]["current_step"] = "All certificates generated and emails sent!"
-            background_tasks[task_id]["completed"] = result["summary"]["successful_operations"]
-            background_tasks[task_id]["failed"] = result["summary"]["failed_operations"]
-            background_tasks[task_id]["successful_emails"] = result["summary"].get("successful_emails", 0)
-            background_tasks[task_id]["failed_emails"] = result["summary"].get("failed_emails", 0)
-        else:
-            background_tasks[task_id]["status"] = "failed"
-            background_tasks[task_id]["error"] = result["error"]
+        def delta(task):
+            previous = sent.setdefault(task["taskId"], {})
+            changed = {key: value for key, value in task.items() if previous.get(key) != value}
+            previous.update(changed)
+            if changed:
+                changed["taskId"] = task["taskId"]
+                return f"event: progress\ndata: {json.dumps(changed, default=str)}\n\n"
+            return None
 
-    except Exception as e:
-        background_tasks[task_id]["status"] = "failed"
-        background_tasks[task_id]["error"] = str(e)
-        background_tasks[task_id]["current_step"] = f"Error: {str(e)}"
+        try:
+            yield "retry: 3000\n\n"
+            job = await certificate_job_queue.latest_job(event_id)
+            if job:
+                yield delta(task_status(job))
+            while not await request.is_disconnected():
+                try:
+                    message = delta(await asyncio.wait_for(queue.get(), timeout=PROGRESS_STREAM_KEEPALIVE_SECONDS))
+                except asyncio.TimeoutError:
+                    # Jobs leased by another worker process publish there, not here; re-read the row instead
+                    job = await certificate_job_queue.latest_job(event_id)
+                    message = delta(task_status(job)) if job else None
+                yield message or ": keepalive\n\n"
+        finally:
+            progress_broker.unsubscribe(event_id, queue)
 
-def update_background_task_progress(task_id: str, completed: int, total: int, step: str):
-    """Update progress of background task"""
-    if task_id in background_tasks:
-        background_tasks[task_id]["completed"] = completed
-        background_tasks[task_id]["total_participants"] = total
-        background_tasks[task_id]["current_step"] = step
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/test_certificate_generation")
 async def test_certificate_generation():
@@ -3470,7 +3423,7 @@ async def get_certificate_status(event_id: int):
 async def toggle_event_status(event_id: int, request: EventStatusUpdate):
     """Toggle event active status"""
 
-    print(f"Toggle request for event {event_id} to status: {request.is_active}")
+    logger.info("Toggle request for event %s to status: %s", event_id, request.is_active)
 
     # No session verification needed - frontend handles organizer access
 
@@ -3507,7 +3460,7 @@ async def toggle_event_status(event_id: int, request: EventStatusUpdate):
         }
 
     except Exception as e:
-        print(f"Error updating event status: {str(e)}")
+        logger.exception("Error updating event status: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to update event status: {str(e)}")
 
 # Template Management Endpoints
@@ -3686,7 +3639,8 @@ async def resend_certificate_email(participant_id: int):
         participant_sql = """SELECT p.name, p.email, p.wallet_address, p.certificate_status,
                                   p.certificate_token_id, p.certificate_ipfs, p.poa_token_id,
                                   e.event_name, e.id as event_id, p.team_name,
-                                  e.event_date, e.sponsors, e.certificate_template
+                                  e.event_date, e.sponsors, e.certificate_template,
+                                  p.certificate_path
                            FROM participants p
                            JOIN events e ON p.event_id = e.id
                            WHERE p.id = ?"""
@@ -3713,8 +3667,9 @@ async def resend_certificate_email(participant_id: int):
             event_date = participant.get('event_date', '')
             sponsors = participant.get('sponsors', '')
             certificate_template = participant.get('certificate_template', '')
+            stored_certificate_path = participant.get('certificate_path')
         else:
-            name, email, wallet_address, certificate_status, certificate_token_id, certificate_ipfs, poa_token_id, event_name, event_id, team_name, event_date, sponsors, certificate_template = participant
+            name, email, wallet_address, certificate_status, certificate_token_id, certificate_ipfs, poa_token_id, event_name, event_id, team_name, event_date, sponsors, certificate_template, stored_certificate_path = participant
 
         # Check if participant has a generated certificate
         if certificate_status not in ['completed', 'transferred'] or not certificate_token_id:
@@ -3723,42 +3678,47 @@ async def resend_certificate_email(participant_id: int):
                 detail=f"Participant {name} does not have a generated certificate yet. Current status: {certificate_status}"
             )
 
-        # Use the exact same certificate generation logic as BulkCertificateProcessor
-        # Import and use the CertificateGenerator class directly
-        from certificate_generator import CertificateGenerator
+        from certificate_generator import CertificateGenerator, certificate_filename
 
         cert_generator = CertificateGenerator()
 
-        # Generate certificate using exact same logic as BulkCertificateProcessor
-        cert_result = await cert_generator.generate_certificate(
-            participant_name=name,
-            event_name=event_name,
-            event_date=str(event_date) or "",
-            participant_email=email,
-            team_name=team_name or "",
-            template_filename=certificate_template  # Use exact same parameter as BulkProcessor
-        )
-
-        if not cert_result['success']:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Certificate generation failed: {cert_result.get('error', 'Unknown error')}"
+        # Reuse the artifact rendered during the bulk run (memory cache, then stored file)
+        certificate_bytes = cert_generator.get_cached_certificate(name, event_name, stored_path=stored_certificate_path)
+        certificate_path = stored_certificate_path or os.path.join(cert_generator.output_dir, certificate_filename(name, event_name))
+
+        if certificate_bytes is None:
+            # No stored artifact - render again using the same logic as BulkCertificateProcessor
+            cert_result = await cert_generator.generate_certificate(
+                participant_name=name,
+                event_name=event_name,
+                event_date=str(event_date) or "",
+                participant_email=email,
+                team_name=team_name or "",
+                template_filename=certificate_template  # Use exact same parameter as BulkProcessor
             )
 
-        # Get the certificate file path from the result (same as BulkCertificateProcessor)
-        certificate_path = cert_result['file_path']
+            if not cert_result['success']:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Certificate generation failed: {cert_result.get('error', 'Unknown error')}"
+                )
+
+            certificate_path = cert_result['file_path']
+            certificate_bytes = cert_result['image_bytes']
 
         # Use the proper email service for sending with attachment (exact same as BulkProcessor)
         email_service = EmailService()
-        email_result = email_service.send_certificate_email(
+        email_result = await asyncio.to_thread(
+            email_service.send_certificate_email,
             to_email=email,
             participant_name=name,
             event_name=event_name,
-            certificate_path=certificate_path,  # Use the generated certificate file
+            certificate_path=certificate_path,
             contract_address=CONTRACT_ADDRESS,
             token_id=certificate_token_id,
             poa_token_id=poa_token_id,
-            force_resend=True  # Bypass duplicate prevention for resend
+            force_resend=True,  # Bypass duplicate prevention for resend
+            certificate_bytes=certificate_bytes
         )
 
         if email_result.get("success"):
@@ -3773,7 +3733,7 @@ async def resend_certificate_email(participant_id: int):
             raise HTTPException(status_code=500, detail=f"Failed to send email: {email_result.get('message', 'Unknown error')}")
 
     except Exception as e:
-        print(f"Error in resend_certificate_email: {e}")
+        logger.exception("Error in resend_certificate_email: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to resend email: {str(e)}")
 
 @app.post("/templates/upload/debug")
@@ -3805,18 +3765,93 @@ async def debug_upload_template(
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+# Pipeline stages reported so far; they drop back to 0 once no running job has them
+certificate_stage_names = set()
+
+@metrics.collector
+async def collect_queue_metrics():
+    """Queue depths and pool utilisation, sampled on each /metrics scrape"""
+    queue_depth.set(await email_outbox.depth(), queue="email_outbox")
+    queue_depth.set(update_dispatcher.stats()["queued"], queue="telegram_updates")
+    queue_depth.set(telegram_client.stats()["queued"], queue="telegram_outgoing")
+    queue_depth.set(receipt_waiter.status()["pending"], queue="tx_receipts")
+    stage_depths = dict.fromkeys(certificate_stage_names, 0)
+    for stages in certificate_job_queue.pipeline_stats().values():
+        for stage, stats in stages.items():
+            stage_depths[stage] = stage_depths.get(stage, 0) + stats["queued"]
+    certificate_stage_names.update(stage_depths)
+    for stage, depth in stage_depths.items():
+        queue_depth.set(depth, queue=f"certificate_{stage}")
+
+    sql, params = convert_sql_for_postgres("SELECT status, COUNT(*) FROM jobs GROUP BY status", [])
+    certificate_jobs.clear()
+    for row in await db_manager.execute_query(sql, params, fetch=True) or []:
+        certificate_jobs.set(row[1], status=row[0])
+
+    pool = db_manager.pool_stats()
+    if pool:
+        db_pool_connections.set(pool["size"] - pool["idle"], state="in_use")
+        db_pool_connections.set(pool["idle"], state="idle")
+        db_pool_connections.set(pool["max"], state="max")
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint (this worker process only)"""
+    return Response(content=await metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/cluster/status")
+async def get_cluster_status():
+    """Which worker leads the singleton loops, and the shared email outbox backlog"""
+    return {"leader": leader_election.status(), "email_outbox": await email_outbox.stats()}
+
+@app.get("/chain_index/status")
+async def get_chain_index_status():
+    """Progress of the on-chain event indexer"""
+    return chain_indexer.status()
+
+@app.get("/rpc_pool/status")
+async def get_rpc_pool_status():
+    """Health score, latency and request budget of each RPC endpoint"""
+    return {**rpc_pool.status(), "receipt_waiter": receipt_waiter.status()}
+
+@app.get("/email_rate_limits")
+async def get_email_rate_limits():
+    """Current adaptive send rates per SMTP provider and recipient domain"""
+    return email_rate_limiter.stats()
+
 @app.get("/telegram/verification_logs")
-async def get_telegram_verification_logs(limit: int = 100):
-    """Get recent telegram verification logs for debugging - NO /0xday command goes unseen"""
+async def get_telegram_verification_logs(limit: int = 100, offset: int = 0, user_id: Optional[int] = None,
+                                         status: Optional[str] = None, source: str = "memory"):
+    """Page through /0xday verification attempts (newest first) - NO /0xday command goes unseen
+
+    source=memory reads the recent in-memory window; source=table reads the persisted history
+    (VERIFICATION_LOG_PERSIST=true). Filter by user_id and/or status.
+    """
+    limit = max(1, min(limit, 1000))
+    offset = max(0, offset)
+    if source == "table":
+        matching, logs = await verification_log.query_table(user_id, status, limit, offset)
+        by_status = {key: value["attempts"] for key, value in (await verification_log.aggregate_table()).items()}
+    elif source == "memory":
+        matching, logs = verification_log.query(user_id, status, limit, offset)
+        by_status = verification_log.aggregate()["since_startup"]
+    else:
+        raise HTTPException(status_code=400, detail="source must be 'memory' or 'table'")
     return {
-        "total_logs": len(telegram_verification_log),
-        "recent_logs": telegram_verification_log[-limit:] if telegram_verification_log else [],
+        "total_logs": matching,
+        "offset": offset,
+        "limit": limit,
+        "recent_logs": logs,
         "statistics": {
-            "success": sum(1 for log in telegram_verification_log if log.get('status') == 'success_verified'),
-            "rejected": sum(1 for log in telegram_verification_log if log.get('status') == 'rejected_not_member'),
-            "errors": sum(1 for log in telegram_verification_log if 'error' in log.get('status', '')),
-            "processing": sum(1 for log in telegram_verification_log if log.get('status') == 'processing'),
+            "success": by_status.get('success_verified', 0),
+            "rejected": by_status.get('rejected_not_member', 0),
+            "errors": sum(count for key, count in by_status.items() if 'error' in key),
+            "processing": by_status.get('processing', 0),
         },
+        "aggregation": verification_log.aggregate() if source == "memory" else by_status,
+        "log": verification_log.stats(),
+        "client": telegram_client.stats(),
+        "membership_cache": membership_cache.stats(),
         "message": "All /0xday commands are logged here - nothing is missed"
     }
 
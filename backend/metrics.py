@@ -0,0 +1,190 @@
+import re
+import time
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds; spans a fast SQLite query up to a slow receipt wait
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"'.replace("\n", " ") for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_label_text(self.label_names, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_value(self, key, value):
+        counts, total, count = value
+        lines = []
+        for bound, bucket_count in zip(self.buckets, counts):
+            bucket_labels = _label_text(self.label_names + ("le",), key + (bound,))
+            lines.append(f"{self.name}_bucket{bucket_labels} {bucket_count}")
+        lines.append(f"{self.name}_bucket{_label_text(self.label_names + ('le',), key + ('+Inf',))} {count}")
+        lines.append(f"{self.name}_sum{_label_text(self.label_names, key)} {total}")
+        lines.append(f"{self.name}_count{_label_text(self.label_names, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text exposition format at /metrics.
+
+    Latencies are observed where the work happens; queue depths and pool utilisation are sampled by
+    collectors (sync or async callables) run on each scrape. With several API workers each process
+    reports its own numbers, so scrape every worker or aggregate in Prometheus.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def collector(self, func):
+        """Register func() (may be a coroutine function) to refresh gauges before each scrape"""
+        self._collectors.append(func)
+        return func
+
+    async def collect(self):
+        for func in self._collectors:
+            try:
+                result = func()
+                if hasattr(result, "__await__"):
+                    await result
+            except Exception as e:
+                logger.warning("Metrics collector %s failed: %s", getattr(func, '__name__', func), e)
+
+    async def render(self):
+        await self.collect()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+_STATEMENT_VERB = re.compile(r"^\s*(\w+)")
+_STATEMENT_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN|EXISTS)\s+(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def statement_label(query):
+    """Low-cardinality label for a SQL statement: verb and first table, e.g. 'select participants'"""
+    verb = _STATEMENT_VERB.match(query or "")
+    table = _STATEMENT_TABLE.search(query or "")
+    return f"{verb.group(1).lower() if verb else 'unknown'} {table.group(1).lower() if table else '-'}"
+
+
+# Global metrics registry instance
+metrics = MetricsRegistry()
+
+# Pipeline stage latencies
+render_seconds = metrics.histogram(
+    "certificate_render_seconds", "Certificate JPEG render time (including process pool wait)", ["mode"])
+ipfs_pin_seconds = metrics.histogram(
+    "ipfs_pin_seconds", "Pinata pin request latency", ["kind"])
+rpc_request_seconds = metrics.histogram(
+    "rpc_request_seconds", "JSON-RPC latency by method (eth_estimateGas, eth_sendRawTransaction, ...)", ["method"])
+tx_receipt_wait_seconds = metrics.histogram(
+    "tx_receipt_wait_seconds", "Time from submitting a transaction hash to its receipt", ["outcome"],
+    buckets=(1, 2, 5, 10, 15, 30, 60, 120, 300, 600))
+db_query_seconds = metrics.histogram(
+    "db_query_seconds", "Database statement latency (verb and first table)", ["statement"])
+db_pool_acquire_seconds = metrics.histogram(
+    "db_pool_acquire_seconds", "Wait for an asyncpg pool connection")
+smtp_send_seconds = metrics.histogram(
+    "smtp_send_seconds", "SMTP delivery latency per message", ["outcome"])
+
+# Sampled on scrape
+queue_depth = metrics.gauge("queue_depth", "Items waiting in a work queue", ["queue"])
+db_pool_connections = metrics.gauge("db_pool_connections", "asyncpg pool connections", ["state"])
+certificate_jobs = metrics.gauge("certificate_jobs", "Background certificate jobs by status", ["status"])
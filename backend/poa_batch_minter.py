@@ -0,0 +1,386 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+from web3 import Web3
+from web3.exceptions import TimeExhausted
+from dotenv import load_dotenv
+
+from database import db_manager, convert_sql_for_postgres
+from chain_context import chain_context
+from receipt_waiter import receipt_waiter
+from tx_reconciler import tx_reconciler
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+BULK_MINT_ABI = [
+    {
+        "inputs": [
+            {"internalType": "address[]", "name": "recipients", "type": "address[]"},
+            {"internalType": "uint256", "name": "eventId", "type": "uint256"},
+            {"internalType": "string", "name": "ipfsHash", "type": "string"}
+        ],
+        "name": "bulkMintPoA",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    }
+]
+
+JOB_KEYS = ["id", "event_id", "ipfs_hash", "status", "total", "minted", "chunk_size", "error", "created_at", "updated_at",
+            "lease_owner", "lease_expires_at"]
+CHUNK_KEYS = ["chunk_index", "participant_ids", "status", "tx_hash", "attempts", "minted", "error"]
+
+
+def _rows(rows, keys):
+    return [dict(row) if hasattr(row, "keys") else dict(zip(keys, row)) for row in rows or []]
+
+
+class JobLeaseLost(Exception):
+    """Another worker took over the mint job after our lease expired"""
+
+
+class PoABatchMinter:
+    """Server-signed bulkMintPoA straight to participant wallets, split into gas-sized chunks.
+
+    Jobs and chunks are persisted, each chunk's tx hash is handed to tx_reconciler as soon as it is sent,
+    and a job picks up from its first unconfirmed chunk when resumed (also on startup). A job only runs
+    under a lease in poa_mint_jobs (renewed while it runs), so across API workers and leader changes at most
+    one process is ever sending a job's chunks.
+    """
+
+    def __init__(self):
+        self.max_chunk = int(os.getenv("POA_MINT_MAX_CHUNK", "200"))
+        self.gas_fraction = float(os.getenv("POA_MINT_BLOCK_GAS_FRACTION", "0.5"))  # Share of the block gas limit per chunk
+        self.max_gas = int(os.getenv("POA_MINT_MAX_GAS", "15000000"))
+        self.receipt_timeout = float(os.getenv("POA_MINT_RECEIPT_TIMEOUT_SECONDS", "300"))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = float(os.getenv("POA_MINT_LEASE_SECONDS", "60"))
+        self._tasks = {}
+        self._lost = set()  # job ids whose lease another worker took over
+
+    @property
+    def enabled(self):
+        return chain_context.configured and tx_reconciler.enabled
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    async def create_job(self, event_id, ipfs_hash, participant_ids=None):
+        """Plan chunks for every eligible participant (or the selected ones) and start minting in the background"""
+        sql, params = convert_sql_for_postgres(
+            "SELECT id FROM poa_mint_jobs WHERE event_id = ? AND status IN ('pending', 'running')", [event_id]
+        )
+        if await db_manager.execute_query(sql, params, fetch=True):
+            raise ValueError(f"A PoA mint job is already running for event {event_id}")
+
+        # A failed job may still have a chunk whose transaction could land; re-planning those participants
+        # would mint them twice, so such jobs must be resumed instead. Cleanly failed jobs are superseded.
+        sql, params = convert_sql_for_postgres(
+            """SELECT j.id FROM poa_mint_jobs j JOIN poa_mint_chunks c ON c.job_id = j.id
+               WHERE j.event_id = ? AND j.status = 'failed' AND c.status = 'submitted'""",
+            [event_id]
+        )
+        unsettled = await db_manager.execute_query(sql, params, fetch=True)
+        if unsettled:
+            job_id = unsettled[0]["id"] if hasattr(unsettled[0], "keys") else unsettled[0][0]
+            raise ValueError(f"PoA mint job {job_id} has an unconfirmed transaction; resume it instead")
+        sql, params = convert_sql_for_postgres(
+            "UPDATE poa_mint_jobs SET status = 'superseded', updated_at = CURRENT_TIMESTAMP WHERE event_id = ? AND status = 'failed'",
+            [event_id]
+        )
+        await db_manager.execute_query(sql, params)
+
+        participants = await self._eligible(event_id, participant_ids)
+        if not participants:
+            raise ValueError("No participants eligible for minting")
+
+        wallets = [Web3.to_checksum_address(p["wallet_address"]) for p in participants]
+        chunk_size = await asyncio.to_thread(self._plan_chunk_size, event_id, ipfs_hash, wallets)
+
+        job_id = str(uuid.uuid4())
+        statements = [(
+            "INSERT INTO poa_mint_jobs (id, event_id, ipfs_hash, status, total, minted, chunk_size) VALUES (?, ?, ?, 'pending', ?, 0, ?)",
+            [job_id, event_id, ipfs_hash, len(participants), chunk_size]
+        )]
+        for index, start in enumerate(range(0, len(participants), chunk_size)):
+            ids = [p["id"] for p in participants[start:start + chunk_size]]
+            statements.append((
+                "INSERT INTO poa_mint_chunks (job_id, chunk_index, participant_ids, status) VALUES (?, ?, ?, 'pending')",
+                [job_id, index, json.dumps(ids)]
+            ))
+        await db_manager.execute_many([convert_sql_for_postgres(sql, params) for sql, params in statements])
+
+        logger.info("PoA mint job %s: %s participants in chunks of %s", job_id, len(participants), chunk_size)
+        self.start(job_id)
+        return await self.get_job(job_id)
+
+    async def resume(self, job_id):
+        """Restart a failed or abandoned job; returns the job, or None if it does not exist"""
+        job = await self.get_job(job_id)
+        if not job or job["status"] == "completed":
+            return job
+        if job["status"] == "superseded":
+            raise ValueError("Job was superseded by a newer mint job for this event")
+        if not await self._claim(job_id, ("pending", "running", "failed")):
+            raise ValueError("Job is already running")
+        self.start(job_id, claimed=True)
+        return await self.get_job(job_id)
+
+    def start(self, job_id, claimed=False):
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            self._tasks[job_id] = asyncio.create_task(self._run_job(job_id, claimed))
+
+    async def resume_unfinished(self):
+        """Restart jobs that were pending or running when their worker stopped (nobody holds their lease)"""
+        sql, params = convert_sql_for_postgres(
+            """SELECT id FROM poa_mint_jobs WHERE status IN ('pending', 'running')
+               AND (lease_owner IS NULL OR lease_expires_at < ?)""",
+            [time.time()]
+        )
+        rows = await db_manager.execute_query(sql, params, fetch=True)
+        for row in rows or []:
+            job_id = row["id"] if hasattr(row, "keys") else row[0]
+            logger.info("Resuming PoA mint job %s", job_id)
+            self.start(job_id)
+
+    async def get_job(self, job_id):
+        sql, params = convert_sql_for_postgres(f"SELECT {', '.join(JOB_KEYS)} FROM poa_mint_jobs WHERE id = ?", [job_id])
+        jobs = _rows(await db_manager.execute_query(sql, params, fetch=True), JOB_KEYS)
+        if not jobs:
+            return None
+        sql, params = convert_sql_for_postgres(
+            f"SELECT {', '.join(CHUNK_KEYS)} FROM poa_mint_chunks WHERE job_id = ? ORDER BY chunk_index", [job_id]
+        )
+        chunks = _rows(await db_manager.execute_query(sql, params, fetch=True), CHUNK_KEYS)
+        for chunk in chunks:
+            chunk["participant_count"] = len(json.loads(chunk.pop("participant_ids") or "[]"))
+        job = jobs[0]
+        job["chunks"] = chunks
+        job["chunks_confirmed"] = sum(1 for c in chunks if c["status"] == "confirmed")
+        return job
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    async def _run_job(self, job_id, claimed=False):
+        if not claimed and not await self._claim(job_id, ("pending", "running")):
+            return
+        self._lost.discard(job_id)
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            job = await self.get_job(job_id)
+            sql, params = convert_sql_for_postgres(
+                f"SELECT {', '.join(CHUNK_KEYS)} FROM poa_mint_chunks WHERE job_id = ? AND status != 'confirmed' ORDER BY chunk_index",
+                [job_id]
+            )
+            chunks = _rows(await db_manager.execute_query(sql, params, fetch=True), CHUNK_KEYS)
+            for chunk in chunks:
+                error = await self._run_chunk(job, chunk)
+                await self._refresh_minted(job_id)
+                if error:
+                    await self._update_job(job_id, "failed", f"Chunk {chunk['chunk_index']}: {error}")
+                    logger.warning("PoA mint job %s stopped at chunk %s: %s", job_id, chunk['chunk_index'], error)
+                    return
+            await self._update_job(job_id, "completed", None)
+            logger.info("PoA mint job %s completed", job_id)
+        except JobLeaseLost:
+            logger.warning("PoA mint job %s: lease taken over by another worker, stopping", job_id)
+        except Exception as e:
+            logger.exception("PoA mint job %s failed: %s", job_id, e)
+            await self._update_job(job_id, "failed", str(e))
+        finally:
+            heartbeat.cancel()
+            await self._release(job_id)
+
+    async def _run_chunk(self, job, chunk):
+        """Mint one chunk; returns an error message or None when the chunk is confirmed"""
+        job_id, event_id, index = job["id"], int(job["event_id"]), chunk["chunk_index"]
+
+        if chunk["status"] == "submitted" and chunk["tx_hash"]:
+            # Resumed after the tx was sent: settle it before deciding whether to send again
+            status = await self._settle(chunk["tx_hash"])
+            if status and status["status"] == "confirmed":
+                await self._update_chunk(job_id, index, "confirmed", chunk["tx_hash"], status["participants_updated"], None)
+                return None
+            if status and status["status"] == "pending":
+                return "Previous transaction still unconfirmed"
+
+        # Only participants the chain has not minted for yet (earlier attempts may have partly landed)
+        ids = json.loads(chunk["participant_ids"] or "[]")
+        remaining = await self._eligible(event_id, ids)
+        if not remaining:
+            await self._update_chunk(job_id, index, "confirmed", chunk["tx_hash"], 0, None)
+            return None
+
+        if job_id in self._lost:
+            raise JobLeaseLost(job_id)
+        try:
+            tx_hash = await self._send_chunk(event_id, job["ipfs_hash"], [p["wallet_address"] for p in remaining])
+        except Exception as e:
+            await self._update_chunk(job_id, index, "failed", None, 0, str(e))
+            return str(e)
+
+        await tx_reconciler.submit(tx_hash, "direct_mint_poa", event_id, [p["id"] for p in remaining])
+        await self._update_chunk(job_id, index, "submitted", tx_hash, 0, None)
+        logger.info("PoA mint job %s chunk %s: %s recipients, tx %s", job_id, index, len(remaining), tx_hash)
+
+        status = await self._settle(tx_hash)
+        if status and status["status"] == "confirmed":
+            await self._update_chunk(job_id, index, "confirmed", tx_hash, status["participants_updated"], None)
+            return None
+        if status and status["status"] == "pending":
+            return "Transaction not confirmed before timeout"
+        error = (status or {}).get("error") or "Transaction failed"
+        await self._update_chunk(job_id, index, "failed", tx_hash, 0, error)
+        return error
+
+    async def _settle(self, tx_hash):
+        try:
+            await receipt_waiter.wait_async(tx_hash, timeout=self.receipt_timeout)
+        except TimeExhausted:
+            pass
+        await tx_reconciler.reconcile_pending()
+        return await tx_reconciler.get_status(tx_hash)
+
+    async def _send_chunk(self, event_id, ipfs_hash, wallets):
+        contract = chain_context.contract(BULK_MINT_ABI)
+        wallets = [Web3.to_checksum_address(w) for w in wallets]
+        call = contract.functions.bulkMintPoA(wallets, event_id, ipfs_hash)
+        sender = chain_context.account.address
+        gas_estimate = await asyncio.to_thread(call.estimate_gas, {'from': sender})
+        gas_price = await asyncio.to_thread(lambda: chain_context.w3.eth.gas_price)
+
+        nonce = await chain_context.next_nonce()
+        try:
+            transaction = call.build_transaction({
+                'chainId': chain_context.chain_id,
+                'gas': int(gas_estimate * 1.2),
+                'gasPrice': gas_price,
+                'nonce': nonce,
+            })
+            signed_txn = chain_context.sign_transaction(transaction)
+            tx_hash = await asyncio.to_thread(chain_context.w3.eth.send_raw_transaction, signed_txn.rawTransaction)
+        except Exception:
+            await chain_context.release_nonce(nonce)
+            raise
+        return Web3.to_hex(tx_hash)
+
+    def _plan_chunk_size(self, event_id, ipfs_hash, wallets):
+        """Recipients per transaction so one chunk stays within a share of the block gas limit"""
+        if len(wallets) == 1:
+            return 1
+        contract = chain_context.contract(BULK_MINT_ABI)
+        sender = chain_context.account.address
+        block_gas = chain_context.w3.eth.get_block('latest')['gasLimit']
+        budget = min(int(block_gas * self.gas_fraction), self.max_gas)
+        try:
+            one = contract.functions.bulkMintPoA(wallets[:1], event_id, ipfs_hash).estimate_gas({'from': sender})
+            two = contract.functions.bulkMintPoA(wallets[:2], event_id, ipfs_hash).estimate_gas({'from': sender})
+        except Exception as e:
+            raise ValueError(f"bulkMintPoA gas estimation failed: {e}")
+        per_recipient = max(two - one, 1)
+        base = max(one - per_recipient, 0)
+        size = int((budget / 1.2 - base) // per_recipient)  # Leave room for the 20% gas buffer
+        return max(1, min(size, self.max_chunk, len(wallets)))
+
+    # ------------------------------------------------------------------
+    # Persistence helpers
+    # ------------------------------------------------------------------
+
+    async def _eligible(self, event_id, participant_ids=None):
+        if participant_ids:
+            placeholders = ','.join('?' for _ in participant_ids)
+            sql = f"""SELECT id, wallet_address FROM participants
+                      WHERE event_id = ? AND id IN ({placeholders}) AND (poa_status = 'not_minted' OR poa_status IS NULL)
+                      ORDER BY id"""
+            params = [event_id] + list(participant_ids)
+        else:
+            sql = """SELECT id, wallet_address FROM participants
+                     WHERE event_id = ? AND (poa_status = 'not_minted' OR poa_status IS NULL) ORDER BY id"""
+            params = [event_id]
+        sql, params = convert_sql_for_postgres(sql, params)
+        rows = _rows(await db_manager.execute_query(sql, params, fetch=True), ["id", "wallet_address"])
+        return [row for row in rows if Web3.is_address(row["wallet_address"] or "")]
+
+    async def _claim(self, job_id, statuses):
+        """Lease the job if it is in one of `statuses` and nobody holds it; True when this worker won"""
+        now = time.time()
+        placeholders = ", ".join("?" for _ in statuses)
+        # Conditional update: only one worker can move the lease, the re-read tells us who won
+        sql, params = convert_sql_for_postgres(
+            f"""UPDATE poa_mint_jobs SET lease_owner = ?, lease_expires_at = ?, status = 'running', error = NULL,
+                updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status IN ({placeholders}) AND (lease_owner IS NULL OR lease_expires_at < ?)""",
+            [self.worker_id, now + self.lease_seconds, job_id] + list(statuses) + [now]
+        )
+        await db_manager.execute_query(sql, params)
+        job = await self.get_job(job_id)
+        return bool(job and job["lease_owner"] == self.worker_id)
+
+    async def _heartbeat(self, job_id):
+        """Renew the lease while the job runs; flags the job as lost if another worker took it over"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                sql, params = convert_sql_for_postgres(
+                    "UPDATE poa_mint_jobs SET lease_expires_at = ? WHERE id = ? AND lease_owner = ?",
+                    [time.time() + self.lease_seconds, job_id, self.worker_id]
+                )
+                await db_manager.execute_query(sql, params)
+                job = await self.get_job(job_id)
+            except Exception as e:
+                logger.warning("PoA mint job %s heartbeat failed: %s", job_id, e)
+                continue
+            if not job or job["lease_owner"] != self.worker_id:
+                self._lost.add(job_id)
+                return
+
+    async def _release(self, job_id):
+        sql, params = convert_sql_for_postgres(
+            "UPDATE poa_mint_jobs SET lease_owner = NULL, lease_expires_at = NULL WHERE id = ? AND lease_owner = ?",
+            [job_id, self.worker_id]
+        )
+        try:
+            await db_manager.execute_query(sql, params)
+        except Exception as e:
+            logger.warning("Could not release PoA mint job %s: %s", job_id, e)
+
+    async def _update_job(self, job_id, status, error):
+        """Only the lease holder may change the job's status"""
+        sql, params = convert_sql_for_postgres(
+            "UPDATE poa_mint_jobs SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND lease_owner = ?",
+            [status, error, job_id, self.worker_id]
+        )
+        await db_manager.execute_query(sql, params)
+
+    async def _update_chunk(self, job_id, index, status, tx_hash, minted, error):
+        sql, params = convert_sql_for_postgres(
+            """UPDATE poa_mint_chunks
+               SET status = ?, tx_hash = ?, minted = minted + ?, error = ?,
+                   attempts = attempts + CASE WHEN ? = 'submitted' THEN 1 ELSE 0 END, updated_at = CURRENT_TIMESTAMP
+               WHERE job_id = ? AND chunk_index = ?""",
+            [status, tx_hash, minted or 0, error, status, job_id, index]
+        )
+        await db_manager.execute_query(sql, params)
+
+    async def _refresh_minted(self, job_id):
+        sql, params = convert_sql_for_postgres(
+            """UPDATE poa_mint_jobs
+               SET minted = (SELECT COALESCE(SUM(minted), 0) FROM poa_mint_chunks WHERE job_id = ?), updated_at = CURRENT_TIMESTAMP
+               WHERE id = ?""",
+            [job_id, job_id]
+        )
+        await db_manager.execute_query(sql, params)
+
+
+# Global PoA batch minter instance
+poa_batch_minter = PoABatchMinter()
@@ -0,0 +1,48 @@
+import os
+import asyncio
+
+
+class ProgressBroker:
+    """In-process fan-out of job progress snapshots to stream subscribers, keyed by event id.
+
+    Each subscriber has a small bounded queue; when a slow client falls behind, its oldest snapshot is
+    dropped (the next one supersedes it), so a stalled connection never holds memory or blocks a job.
+    """
+
+    def __init__(self):
+        self.queue_size = int(os.getenv("PROGRESS_STREAM_QUEUE_SIZE", "50"))
+        self._subscribers = {}  # event_id -> set of queues
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, event_id):
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(event_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, event_id, queue):
+        subscribers = self._subscribers.get(event_id)
+        if subscribers:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[event_id]
+
+    def publish(self, event_id, snapshot):
+        for queue in self._subscribers.get(event_id, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(snapshot)
+        self.published += 1
+
+    def stats(self):
+        return {
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "events": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped
+        }
+
+
+# Global progress broker instance
+progress_broker = ProgressBroker()
@@ -0,0 +1,197 @@
+import os
+import time
+import asyncio
+import threading
+import smtplib
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket. Usable from worker threads and from the event loop."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens now and return how many seconds the caller must wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` would be available, without taking them"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Blocking acquire for sync callers (SMTP sends run in threads)"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """Non-blocking acquire for coroutines"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def penalize(self, seconds: float):
+        """Push the bucket into debt so nothing is released for roughly `seconds`"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """Token bucket that backs off on deferrals and creeps back up on success (AIMD)"""
+
+    def __init__(self, rate: float, capacity: float = None, min_rate: float = 0.1,
+                 increase_step: float = 0.05, decrease_factor: float = 0.5, cooldown: float = 5.0):
+        super().__init__(rate, capacity)
+        self.max_rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.successes = 0
+        self.deferrals = 0
+
+    def on_success(self):
+        self.successes += 1
+        if self.rate < self.max_rate:
+            self.set_rate(min(self.max_rate, self.rate + self.increase_step))
+
+    def on_deferral(self, retry_after: float = None):
+        self.deferrals += 1
+        self.set_rate(max(self.min_rate, self.rate * self.decrease_factor))
+        self.penalize(retry_after if retry_after is not None else self.cooldown)
+
+    def snapshot(self):
+        return {
+            "rate": round(self.rate, 3),
+            "max_rate": self.max_rate,
+            "successes": self.successes,
+            "deferrals": self.deferrals
+        }
+
+
+def parse_rate_overrides(raw: str):
+    """Parse 'gmail.com=3,outlook.com=1.5' into {'gmail.com': 3.0, 'outlook.com': 1.5}"""
+    overrides = {}
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        key, value = item.split("=", 1)
+        try:
+            overrides[key.strip().lower()] = float(value)
+        except ValueError:
+            logger.warning("Ignoring invalid rate override: %s", item)
+    return overrides
+
+
+def smtp_deferral_code(error):
+    """Return the 4xx SMTP code for a transient rejection, or None for anything else"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        transient = [code for code in codes if 400 <= code < 500]
+        return transient[0] if transient else None
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code if 400 <= error.smtp_code < 500 else None
+    return None
+
+
+class EmailRateLimiter:
+    """Per-provider and per-recipient-domain send budgets for outgoing mail"""
+
+    def __init__(self):
+        self.provider_rate = float(os.getenv("EMAIL_RATE_LIMIT", "5"))
+        self.provider_burst = float(os.getenv("EMAIL_RATE_BURST", "10"))
+        self.domain_rate = float(os.getenv("EMAIL_DOMAIN_RATE_LIMIT", "2"))
+        self.domain_burst = float(os.getenv("EMAIL_DOMAIN_RATE_BURST", "5"))
+        self.min_rate = float(os.getenv("EMAIL_RATE_MIN", "0.2"))
+        self.provider_overrides = parse_rate_overrides(os.getenv("EMAIL_PROVIDER_RATE_LIMITS"))
+        self.domain_overrides = parse_rate_overrides(os.getenv("EMAIL_DOMAIN_RATE_LIMITS"))
+        self._providers = {}
+        self._domains = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, buckets, key, rate, burst):
+        with self._lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = AdaptiveTokenBucket(rate, max(burst, rate), min_rate=min(self.min_rate, rate))
+                buckets[key] = bucket
+            return bucket
+
+    def provider_bucket(self, provider):
+        provider = (provider or "default").lower()
+        rate = self.provider_overrides.get(provider, self.provider_rate)
+        return self._bucket(self._providers, provider, rate, self.provider_burst)
+
+    def domain_bucket(self, to_email):
+        domain = to_email.rsplit("@", 1)[-1].strip().lower() if to_email else "unknown"
+        rate = self.domain_overrides.get(domain, self.domain_rate)
+        return self._bucket(self._domains, domain, rate, self.domain_burst)
+
+    def acquire(self, provider, to_email):
+        """Block until both the provider and the recipient domain have budget"""
+        waited = self.provider_bucket(provider).acquire()
+        waited += self.domain_bucket(to_email).acquire()
+        return waited
+
+    async def acquire_async(self, provider, to_email):
+        waited = await self.provider_bucket(provider).acquire_async()
+        waited += await self.domain_bucket(to_email).acquire_async()
+        return waited
+
+    def record_success(self, provider, to_email):
+        self.provider_bucket(provider).on_success()
+        self.domain_bucket(to_email).on_success()
+
+    def record_deferral(self, provider, to_email, error):
+        """Slow down whichever side deferred: recipient refusals hit the domain, the rest the provider"""
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            self.domain_bucket(to_email).on_deferral()
+        else:
+            self.provider_bucket(provider).on_deferral()
+        logger.info("SMTP deferral (%s) for %s via %s - throttling down", smtp_deferral_code(error), to_email, provider)
+
+    def stats(self):
+        with self._lock:
+            providers = dict(self._providers)
+            domains = dict(self._domains)
+        return {
+            "providers": {key: bucket.snapshot() for key, bucket in providers.items()},
+            "domains": {key: bucket.snapshot() for key, bucket in domains.items()}
+        }
+
+
+# Global email rate limiter instance
+email_rate_limiter = EmailRateLimiter()
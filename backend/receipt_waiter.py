@@ -0,0 +1,130 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import Future
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted
+from dotenv import load_dotenv
+
+from rpc_batch import batch_call
+from rpc_pool import rpc_pool
+from metrics import tx_receipt_wait_seconds
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    from web3._utils.method_formatters import receipt_formatter
+except ImportError:  # Formatter moved; fall back to one formatted fetch per mined receipt
+    receipt_formatter = None
+
+load_dotenv()
+
+
+class ReceiptWaiter:
+    """Waits for many transactions with one block poll and one batched receipt fetch per new block.
+
+    A single watcher thread runs while anything is pending, so RPC load does not grow with the number of
+    mints in flight. Sync callers block on wait(); coroutines await wait_async().
+    """
+
+    def __init__(self, w3=None):
+        self.w3 = w3 or rpc_pool.web3
+        self.poll_interval = float(os.getenv("RECEIPT_POLL_SECONDS", "1"))
+        self._pending = {}  # tx_hash -> [future, deadline, submitted_at]
+        self._unchecked = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.last_block = None
+        self.receipt_batches = 0
+
+    def submit(self, tx_hash, timeout=120):
+        """Register a transaction hash and return a concurrent.futures.Future resolving to its receipt"""
+        tx_hash = Web3.to_hex(tx_hash).lower() if not isinstance(tx_hash, str) else tx_hash.lower()
+        with self._lock:
+            entry = self._pending.get(tx_hash)
+            if entry is None:
+                entry = [Future(), time.monotonic() + timeout, time.monotonic()]
+                self._pending[tx_hash] = entry
+                self._unchecked.add(tx_hash)
+            else:
+                entry[1] = max(entry[1], time.monotonic() + timeout)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="receipt-waiter", daemon=True)
+                self._thread.start()
+            return entry[0]
+
+    def wait(self, tx_hash, timeout=120):
+        """Blocking wait (drop-in for w3.eth.wait_for_transaction_receipt)"""
+        return self.submit(tx_hash, timeout).result()
+
+    async def wait_async(self, tx_hash, timeout=120):
+        return await asyncio.wrap_future(self.submit(tx_hash, timeout))
+
+    def status(self):
+        return {
+            "pending": len(self._pending),
+            "last_block": self.last_block,
+            "receipt_batches": self.receipt_batches
+        }
+
+    # ------------------------------------------------------------------
+    # Watcher
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                has_unchecked = bool(self._unchecked)
+            try:
+                block = self.w3.eth.block_number
+                if block != self.last_block or has_unchecked:
+                    self.last_block = block
+                    self._check_receipts()
+            except Exception as e:
+                logger.exception("Receipt waiter error: %s", e)
+            self._expire()
+            time.sleep(self.poll_interval)
+
+    def _check_receipts(self):
+        with self._lock:
+            hashes = list(self._pending)
+            self._unchecked.clear()
+        receipts = batch_call(self.w3, [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes])
+        self.receipt_batches += 1
+        for tx_hash, raw in zip(hashes, receipts):
+            if raw is None:
+                continue
+            try:
+                receipt = (
+                    AttributeDict.recursive(receipt_formatter(raw)) if receipt_formatter
+                    else self.w3.eth.get_transaction_receipt(tx_hash)
+                )
+            except Exception as e:
+                logger.warning("Could not format receipt for %s: %s", tx_hash, e)
+                continue
+            with self._lock:
+                entry = self._pending.pop(tx_hash, None)
+            if entry and not entry[0].done():
+                tx_receipt_wait_seconds.observe(time.monotonic() - entry[2], outcome="mined")
+                entry[0].set_result(receipt)
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [(tx_hash, entry) for tx_hash, entry in self._pending.items() if entry[1] <= now]
+            for tx_hash, _ in expired:
+                del self._pending[tx_hash]
+        for tx_hash, entry in expired:
+            if not entry[0].done():
+                tx_receipt_wait_seconds.observe(time.monotonic() - entry[2], outcome="timeout")
+                entry[0].set_exception(TimeExhausted(f"Transaction {tx_hash} is not in the chain after the timeout"))
+
+
+# Global receipt waiter instance
+receipt_waiter = ReceiptWaiter()
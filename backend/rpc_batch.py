@@ -0,0 +1,55 @@
+import os
+import requests
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+RPC_BATCH_SIZE = int(os.getenv("RPC_BATCH_SIZE", "50"))
+
+_session = requests.Session()
+
+
+def batch_call(w3, calls, batch_size=None, timeout=30):
+    """Send [(method, params), ...] as JSON-RPC batches and return the results in order.
+
+    Individual errors come back as None. Pooled providers (rpc_pool) route the batch through their endpoint pool.
+    Providers that reject batch payloads fall back to one request per call.
+    """
+    batch_size = batch_size or RPC_BATCH_SIZE
+    send_batch = getattr(w3.provider, "send_batch", None)
+    endpoint = getattr(w3.provider, "endpoint_uri", None)
+    results = []
+
+    for start in range(0, len(calls), batch_size):
+        chunk = calls[start:start + batch_size]
+        if send_batch or endpoint:
+            payload = [
+                {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+                for i, (method, params) in enumerate(chunk)
+            ]
+            try:
+                if send_batch:
+                    data = send_batch(payload)
+                else:
+                    response = _session.post(str(endpoint), json=payload, timeout=timeout)
+                    response.raise_for_status()
+                    data = response.json()
+                if isinstance(data, list):
+                    by_id = {item.get("id"): item for item in data}
+                    results.extend(by_id.get(i, {}).get("result") for i in range(len(chunk)))
+                    continue
+                logger.warning("RPC endpoint rejected batch request: %s", data.get('error') if isinstance(data, dict) else data)
+            except Exception as e:
+                logger.warning("JSON-RPC batch failed (%s); falling back to single requests", e)
+
+        for method, params in chunk:
+            try:
+                response = w3.provider.make_request(method, params)
+                results.append(response.get("result"))
+            except Exception as e:
+                logger.warning("RPC call %s failed: %s", method, e)
+                results.append(None)
+
+    return results
@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+import requests
+from web3 import Web3
+from web3.providers.base import JSONBaseProvider
+from dotenv import load_dotenv
+
+from rate_limiter import AdaptiveTokenBucket, parse_rate_overrides
+from metrics import rpc_request_seconds
+from tracing import tracer
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+# Idempotent reads that may be sent to a second endpoint when the first one is slow
+HEDGED_METHODS = {
+    "eth_call", "eth_getBalance", "eth_getCode", "eth_getLogs", "eth_blockNumber", "eth_chainId",
+    "eth_gasPrice", "eth_estimateGas", "eth_getBlockByNumber", "eth_getBlockByHash",
+    "eth_getTransactionReceipt", "eth_getTransactionByHash", "eth_getTransactionCount", "net_version"
+}
+
+RATE_LIMIT_MARKERS = ("rate limit", "too many requests", "request limit")
+
+
+class RPCEndpointError(Exception):
+    """Transport-level failure of one endpoint (the pool fails over to the next one)"""
+
+
+def _is_rate_limit_error(error):
+    if not isinstance(error, dict):
+        return False
+    message = str(error.get("message", "")).lower()
+    return error.get("code") in (-32005, 429) or any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+class RPCEndpoint:
+    """One upstream RPC URL with its request budget and health statistics"""
+
+    def __init__(self, url, rate, burst):
+        self.url = url
+        self.host = urlparse(url).netloc or url
+        self.budget = AdaptiveTokenBucket(rate, burst, min_rate=min(0.5, rate))
+        self.session = requests.Session()
+        self.latency = None  # EWMA seconds; None until the first response
+        self.error_rate = 0.0  # EWMA of failures (0..1)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def score(self):
+        """Lower is better: expected latency inflated by recent errors plus any wait for budget"""
+        latency = self.latency if self.latency is not None else 0.25
+        return latency * (1 + 5 * self.error_rate) + self.budget.wait_time()
+
+    def record_success(self, elapsed):
+        with self._lock:
+            self.requests += 1
+            self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+            self.error_rate *= 0.9
+            self.consecutive_failures = 0
+        self.budget.on_success()
+
+    def record_failure(self, cooldown):
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self.error_rate = 0.9 * self.error_rate + 0.1
+            self.consecutive_failures += 1
+            self.cooldown_until = time.monotonic() + cooldown * min(self.consecutive_failures, 6)
+
+    def record_rate_limited(self, retry_after):
+        with self._lock:
+            self.requests += 1
+            self.rate_limited += 1
+            self.error_rate = 0.9 * self.error_rate + 0.1
+        self.budget.on_deferral(retry_after)
+
+    def snapshot(self):
+        now = time.monotonic()
+        return {
+            "host": self.host,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "cooling_down_s": round(max(0.0, self.cooldown_until - now), 1),
+            "budget_wait_s": round(self.budget.wait_time(), 2),
+            "requests": self.requests,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "budget": self.budget.snapshot()
+        }
+
+
+class RPCPool:
+    """Shared set of RPC endpoints ranked by latency/error score, with failover and hedged reads"""
+
+    def __init__(self, urls=None):
+        if urls is None:
+            urls = [u.strip() for u in os.getenv("RPC_URLS", "").split(",") if u.strip()]
+            primary = os.getenv("RPC_URL")
+            if primary and primary not in urls:
+                urls.insert(0, primary)
+        rate = float(os.getenv("RPC_ENDPOINT_RATE_LIMIT", "10"))
+        burst = float(os.getenv("RPC_ENDPOINT_RATE_BURST", "20"))
+        overrides = parse_rate_overrides(os.getenv("RPC_ENDPOINT_RATE_LIMITS"))
+        self.endpoints = []
+        for url in urls:
+            host = (urlparse(url).hostname or url).lower()
+            host_rate = overrides.get(host, rate)
+            self.endpoints.append(RPCEndpoint(url, host_rate, max(burst, host_rate)))
+
+        self.timeout = float(os.getenv("RPC_TIMEOUT_SECONDS", "15"))
+        self.cooldown = float(os.getenv("RPC_FAILURE_COOLDOWN_SECONDS", "5"))
+        hedge_ms = os.getenv("RPC_HEDGE_DELAY_MS")
+        self.hedge_delay_override = float(hedge_ms) / 1000.0 if hedge_ms else None
+        self._executor = ThreadPoolExecutor(max_workers=int(os.getenv("RPC_POOL_WORKERS", "16")), thread_name_prefix="rpc")
+        self.web3 = Web3(PooledHTTPProvider(self)) if self.endpoints else None
+        if len(self.endpoints) > 1:
+            logger.info("RPC pool: %s endpoints (%s)", len(self.endpoints), ', '.join(e.host for e in self.endpoints))
+
+    def ranked(self):
+        """Healthy endpoints by score, then cooling-down ones as a last resort"""
+        now = time.monotonic()
+        healthy = sorted((e for e in self.endpoints if e.cooldown_until <= now), key=lambda e: e.score())
+        cooling = sorted((e for e in self.endpoints if e.cooldown_until > now), key=lambda e: e.cooldown_until)
+        return healthy + cooling
+
+    def hedge_delay(self, endpoint):
+        if self.hedge_delay_override is not None:
+            return self.hedge_delay_override
+        latency = endpoint.latency if endpoint.latency is not None else 0.25
+        return min(max(2 * latency, 0.05), 1.0)
+
+    def retry_delay(self, attempt):
+        """How long a caller should wait before retrying after the whole pool failed"""
+        now = time.monotonic()
+        soonest = min(
+            (max(e.cooldown_until - now, e.budget.wait_time()) for e in self.endpoints),
+            default=0.0
+        )
+        if soonest > 0:
+            return min(soonest, 30.0)
+        return 0.5 * (attempt + 1)
+
+    def status(self):
+        return {"endpoints": [e.snapshot() for e in self.ranked()]}
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+
+    def _post(self, endpoint, request_data):
+        """Send one encoded request to one endpoint and return the decoded JSON (dict or batch list)"""
+        wait_for = endpoint.budget.reserve()
+        if wait_for > 0:
+            time.sleep(wait_for)
+        started = time.monotonic()
+        try:
+            response = endpoint.session.post(
+                endpoint.url, data=request_data, timeout=self.timeout,
+                headers={"Content-Type": "application/json"}
+            )
+        except requests.RequestException as e:
+            endpoint.record_failure(self.cooldown)
+            raise RPCEndpointError(f"{endpoint.host}: {e}")
+
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            endpoint.record_rate_limited(float(retry_after) if retry_after and retry_after.isdigit() else None)
+            raise RPCEndpointError(f"{endpoint.host}: rate limited (HTTP 429)")
+        if response.status_code >= 500:
+            endpoint.record_failure(self.cooldown)
+            raise RPCEndpointError(f"{endpoint.host}: HTTP {response.status_code}")
+
+        try:
+            decoded = json.loads(response.content)
+        except ValueError:
+            endpoint.record_failure(self.cooldown)
+            raise RPCEndpointError(f"{endpoint.host}: invalid JSON response (HTTP {response.status_code})")
+
+        if isinstance(decoded, dict) and _is_rate_limit_error(decoded.get("error")):
+            endpoint.record_rate_limited(None)
+            raise RPCEndpointError(f"{endpoint.host}: {decoded['error'].get('message')}")
+
+        endpoint.record_success(time.monotonic() - started)
+        return decoded
+
+    def send(self, request_data, hedge=False):
+        """Dispatch to the best endpoint, failing over on errors; hedged requests also race a backup when slow"""
+        candidates = self.ranked()
+        if not candidates:
+            raise RPCEndpointError("No RPC endpoints configured")
+
+        last_error = None
+        if not hedge or len(candidates) == 1:
+            for endpoint in candidates:
+                try:
+                    return self._post(endpoint, request_data)
+                except RPCEndpointError as e:
+                    logger.warning("RPC failover: %s", e)
+                    last_error = e
+            raise last_error
+
+        pending = {}
+        next_index = 0
+        while next_index < len(candidates) or pending:
+            if not pending:
+                pending[self._executor.submit(self._post, candidates[next_index], request_data)] = candidates[next_index]
+                next_index += 1
+            timeout = None
+            if len(pending) < 2 and next_index < len(candidates):
+                timeout = self.hedge_delay(candidates[next_index - 1])
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Primary is slow: race the next-best endpoint
+                pending[self._executor.submit(self._post, candidates[next_index], request_data)] = candidates[next_index]
+                next_index += 1
+                continue
+            for future in done:
+                pending.pop(future)
+                try:
+                    return future.result()
+                except RPCEndpointError as e:
+                    logger.warning("RPC failover: %s", e)
+                    last_error = e
+        raise last_error
+
+
+class PooledHTTPProvider(JSONBaseProvider):
+    """web3 provider that routes every request through an RPCPool"""
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+
+    @property
+    def endpoint_uri(self):
+        ranked = self.pool.ranked()
+        return ranked[0].url if ranked else None
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        with rpc_request_seconds.time(method=method), tracer.child_span(f"rpc {method}", **{"rpc.method": method}):
+            response = self.pool.send(request_data, hedge=method in HEDGED_METHODS)
+        if method == "eth_sendRawTransaction" and isinstance(response, dict) and response.get("error"):
+            # A failed-over resend of a tx the first endpoint already accepted: report its hash
+            message = str(response["error"].get("message", "")).lower()
+            if "already known" in message or "known transaction" in message:
+                response = {"jsonrpc": "2.0", "id": response.get("id"), "result": Web3.to_hex(Web3.keccak(hexstr=params[0]))}
+        return response
+
+    def send_batch(self, payload):
+        """Send a JSON-RPC batch (list of request dicts) through the pool"""
+        with rpc_request_seconds.time(method="batch"), tracer.child_span("rpc batch", **{"rpc.batch_size": len(payload)}):
+            return self.pool.send(json.dumps(payload).encode("utf-8"), hedge=True)
+
+
+# Global RPC pool shared by every backend module
+rpc_pool = RPCPool()
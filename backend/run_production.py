@@ -13,7 +13,7 @@ if __name__ == "__main__":
         "main:app",
         host="0.0.0.0",
         port=int(os.getenv("PORT", 8000)),
-        workers=1,  # Single worker since we're using async
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),  # Workers share jobs/outbox/nonces via the database; one is elected leader
         loop="asyncio",  # Default event loop for Windows
         http="httptools",  # High-performance HTTP parser
         access_log=False,  # Disable access logs for performance
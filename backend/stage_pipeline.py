@@ -0,0 +1,95 @@
+import asyncio
+
+from bulk_certificate_processor import ProcessingCancelled
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class Stage:
+    """One pipeline step: an async handler and the number of worker tasks running it"""
+
+    def __init__(self, name, handler, workers=1):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+
+
+class StagePipeline:
+    """Moves items through stages joined by bounded queues, each stage with its own pool of workers.
+
+    A full queue blocks the stage feeding it, so backpressure reaches the source and throughput is set by
+    the slowest stage rather than the sum of all of them. A handler returns True to pass the item on;
+    returning False (or raising) drops it, the handler having recorded why.
+    """
+
+    def __init__(self, stages, queue_size=16, control=None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.control = control
+        self._queues = []
+        self.processed = {stage.name: 0 for stage in stages}
+        self.dropped = {stage.name: 0 for stage in stages}
+
+    async def run(self, items):
+        """Feed every item and wait until the pipeline is empty; raises ProcessingCancelled if it was stopped"""
+        self._queues = [asyncio.Queue(self.queue_size) for _ in self.stages]
+        workers = []
+        for index, stage in enumerate(self.stages):
+            downstream = self._queues[index + 1] if index + 1 < len(self.stages) else None
+            workers.append([
+                asyncio.create_task(self._work(stage, self._queues[index], downstream))
+                for _ in range(stage.workers)
+            ])
+        try:
+            try:
+                for item in items:
+                    if self.control:
+                        await self.control.checkpoint()
+                    await self._queues[0].put(item)
+            except ProcessingCancelled:
+                pass  # Stop feeding; whatever is already inside still drains below
+
+            # Once a stage's queue is drained nothing new can reach the stages after it
+            for index, stage_workers in enumerate(workers):
+                await self._queues[index].join()
+                for task in stage_workers:
+                    task.cancel()
+        finally:
+            all_workers = [task for stage_workers in workers for task in stage_workers]
+            for task in all_workers:
+                task.cancel()
+            await asyncio.gather(*all_workers, return_exceptions=True)
+
+        if self.control and self.control.cancelled:
+            raise ProcessingCancelled(self.control.reason)
+
+    async def _work(self, stage, queue, downstream):
+        while True:
+            item = await queue.get()
+            try:
+                passed = await stage.handler(item)
+                if passed:
+                    self.processed[stage.name] += 1
+                    if downstream is not None:
+                        await downstream.put(item)
+                else:
+                    self.dropped[stage.name] += 1
+            except ProcessingCancelled:
+                # Stopped at one of its checkpoints; saved progress lets a resumed job continue the item
+                self.dropped[stage.name] += 1
+            except Exception as e:
+                self.dropped[stage.name] += 1
+                logger.exception("Pipeline stage %s error: %s", stage.name, e)
+            finally:
+                queue.task_done()
+
+    def stats(self):
+        return {
+            stage.name: {
+                "queued": self._queues[index].qsize() if self._queues else 0,
+                "processed": self.processed[stage.name],
+                "dropped": self.dropped[stage.name]
+            }
+            for index, stage in enumerate(self.stages)
+        }
@@ -0,0 +1,164 @@
+import os
+import asyncio
+import aiohttp
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+from rate_limiter import TokenBucket
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+
+class TelegramAPIError(Exception):
+    """Telegram could not be reached after all retries"""
+
+
+class TelegramClient:
+    """Async Telegram Bot API client: one shared aiohttp session, Bot API rate limits, 429 retry_after handling.
+
+    Outgoing messages go through a queue drained by a few sender tasks, so request handlers never wait on
+    Telegram. Limits follow the Bot API guidance: ~30 messages/s overall and ~1 message/s per chat.
+    """
+
+    def __init__(self, token=None):
+        self.token = token or os.getenv("TELEGRAM_BOT_TOKEN")
+        self.enabled = bool(self.token)
+        self.base_url = f"https://api.telegram.org/bot{self.token}"
+        self.max_retries = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+        self.sender_count = int(os.getenv("TELEGRAM_SENDER_WORKERS", "5"))
+        self.chat_rate = float(os.getenv("TELEGRAM_PER_CHAT_RATE", "1"))
+        self.global_bucket = TokenBucket(float(os.getenv("TELEGRAM_GLOBAL_RATE", "30")))
+        self.max_chat_buckets = int(os.getenv("TELEGRAM_CHAT_BUCKETS_SIZE", "10000"))
+        self._chat_buckets = OrderedDict()  # chat_id -> bucket, least recently used first
+        self._session = None
+        self._queue = None
+        self._senders = []
+        self.sent = 0
+        self.rate_limited = 0
+        self.failed = 0
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60)
+            )
+        return self._session
+
+    async def close(self):
+        for task in self._senders:
+            task.cancel()
+        self._senders = []
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    async def call(self, method, params=None, timeout=15):
+        """Call a Bot API method and return its JSON body; retries 429s (after retry_after) and network errors"""
+        session = await self._get_session()
+        url = f"{self.base_url}/{method}"
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with session.post(url, json=params or {}, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    result = await response.json(content_type=None)
+                if response.status == 429 or result.get("error_code") == 429:
+                    self.rate_limited += 1
+                    retry_after = result.get("parameters", {}).get("retry_after", 1)
+                    if attempt < self.max_retries:
+                        logger.info("⏳ [TELEGRAM] %s rate limited, retrying after %ss", method, retry_after)
+                        await asyncio.sleep(retry_after)
+                        continue
+                return result
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt < self.max_retries:
+                    await asyncio.sleep(min(2 ** attempt, 10))
+                    continue
+                raise TelegramAPIError(f"{method} failed: {e}")
+        return result
+
+    async def get_chat_member(self, chat_id, user_id):
+        return await self.call("getChatMember", {"chat_id": chat_id, "user_id": user_id})
+
+    async def get_updates(self, offset, timeout=30, allowed_updates=None):
+        params = {"offset": offset, "timeout": timeout}
+        if allowed_updates is not None:
+            params["allowed_updates"] = allowed_updates
+        # HTTP timeout slightly longer than the long-poll timeout
+        return await self.call("getUpdates", params, timeout=timeout + 5)
+
+    async def set_webhook(self, url, secret_token=None, allowed_updates=None, max_connections=100):
+        params = {"url": url, "max_connections": max_connections}
+        if secret_token:
+            params["secret_token"] = secret_token
+        if allowed_updates is not None:
+            params["allowed_updates"] = allowed_updates
+        return await self.call("setWebhook", params)
+
+    async def delete_webhook(self):
+        """getUpdates is refused (409) while a webhook is set, so polling clears it first"""
+        return await self.call("deleteWebhook", {"drop_pending_updates": False})
+
+    async def send_message(self, chat_id, text, parse_mode="HTML"):
+        """Send immediately (still subject to the global and per-chat budgets)"""
+        await self.global_bucket.acquire_async()
+        await self._chat_bucket(chat_id).acquire_async()
+        result = await self.call("sendMessage", {"chat_id": chat_id, "text": text, "parse_mode": parse_mode})
+        if result.get("ok"):
+            self.sent += 1
+        else:
+            self.failed += 1
+            logger.warning("Failed to send Telegram message to %s: %s", chat_id, result.get('description'))
+        return result
+
+    def _chat_bucket(self, chat_id):
+        """Per-chat bucket; only the most recently used chats keep one (an evicted chat starts with a full bucket)"""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, max(1.0, self.chat_rate))
+            self._chat_buckets[chat_id] = bucket
+            while len(self._chat_buckets) > self.max_chat_buckets:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    # ------------------------------------------------------------------
+    # Outgoing queue
+    # ------------------------------------------------------------------
+
+    def queue_message(self, chat_id, text, parse_mode="HTML"):
+        """Fire-and-forget send from the event loop; delivered by the sender tasks"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if not self._senders:
+            self._senders = [asyncio.create_task(self._sender(i)) for i in range(self.sender_count)]
+        self._queue.put_nowait((chat_id, text, parse_mode))
+
+    async def _sender(self, worker_id):
+        while True:
+            chat_id, text, parse_mode = await self._queue.get()
+            try:
+                await self.send_message(chat_id, text, parse_mode)
+            except Exception as e:
+                self.failed += 1
+                logger.warning("Failed to send Telegram message to %s: %s", chat_id, e)
+            finally:
+                self._queue.task_done()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+            "chat_buckets": len(self._chat_buckets)
+        }
+
+
+# Global Telegram client instance
+telegram_client = TelegramClient()
@@ -0,0 +1,153 @@
+import os
+import time
+import asyncio
+
+from database import db_manager, convert_sql_for_postgres
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class UpdateDispatcher:
+    """Bounded queue of Telegram updates drained by a pool of worker tasks.
+
+    Webhook requests (and the polling fallback) only enqueue, so Telegram gets its acknowledgement right away
+    however long verifications take. Updates are deduplicated by update_id, since Telegram redelivers a
+    webhook it thinks failed and polling may overlap a webhook switch; the claim is an insert into the
+    telegram_updates table, so a redelivery that lands on another worker process is still dropped. When the
+    queue is full the webhook answers 503 and Telegram retries the update later instead of it being dropped.
+    """
+
+    def __init__(self):
+        self.queue_size = int(os.getenv("TELEGRAM_DISPATCH_QUEUE_SIZE", "10000"))
+        self.worker_count = int(os.getenv("TELEGRAM_DISPATCH_WORKERS", "100"))
+        # Telegram gives up on an update after 24 hours, so older claims can be pruned
+        self.dedupe_seconds = int(os.getenv("TELEGRAM_DEDUPE_SECONDS", "86400"))
+        self.prune_interval = int(os.getenv("TELEGRAM_DEDUPE_PRUNE_INTERVAL", "600"))
+        self._handler = None
+        self._queue = None
+        self._workers = []
+        self._last_prune = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.processed = 0
+        self.errors = 0
+
+    def start(self, handler):
+        """Start the workers; handler(update) is awaited once per accepted update"""
+        self._handler = handler
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.queue_size)
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+            logger.info("Telegram update dispatcher started (%s workers, queue %s)", self.worker_count, self.queue_size)
+
+    async def stop(self, drain_seconds=10):
+        """Give queued updates a moment to finish, then stop the workers"""
+        if self._queue is not None and not self._queue.empty():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=drain_seconds)
+            except asyncio.TimeoutError:
+                logger.warning("Telegram dispatcher stopping with %s updates unprocessed", self._queue.qsize())
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @property
+    def running(self):
+        return bool(self._workers)
+
+    async def submit(self, update):
+        """Enqueue without waiting for room: returns 'queued', 'duplicate' or 'full'"""
+        update_id = update.get("update_id")
+        if not await self._claim(update_id):
+            return "duplicate"
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            # Forget it so Telegram's redelivery is accepted
+            await self._release(update_id)
+            self.rejected += 1
+            return "full"
+        self.accepted += 1
+        return "queued"
+
+    async def put(self, update):
+        """Enqueue, waiting for room (polling applies backpressure to its next getUpdates instead)"""
+        if not await self._claim(update.get("update_id")):
+            return "duplicate"
+        await self._queue.put(update)
+        self.accepted += 1
+        return "queued"
+
+    async def _claim(self, update_id):
+        """Record update_id in telegram_updates; False if some worker process already has it"""
+        if update_id is None:
+            return True
+        now = time.time()
+        try:
+            query, params = convert_sql_for_postgres(
+                """INSERT INTO telegram_updates (update_id, received_at) VALUES (?, ?)
+                   ON CONFLICT (update_id) DO NOTHING RETURNING update_id""",
+                [update_id, now]
+            )
+            claimed = await db_manager.execute_returning(query, params)
+        except Exception as e:
+            # Handling an update twice beats dropping it
+            logger.warning("Could not record Telegram update %s: %s", update_id, e)
+            return True
+        if not claimed:
+            self.duplicates += 1
+            return False
+        if now - self._last_prune >= self.prune_interval:
+            self._last_prune = now
+            await self._prune(now)
+        return True
+
+    async def _release(self, update_id):
+        if update_id is None:
+            return
+        try:
+            query, params = convert_sql_for_postgres("DELETE FROM telegram_updates WHERE update_id = ?", [update_id])
+            await db_manager.execute_query(query, params)
+        except Exception as e:
+            logger.warning("Could not release Telegram update %s: %s", update_id, e)
+
+    async def _prune(self, now):
+        try:
+            query, params = convert_sql_for_postgres(
+                "DELETE FROM telegram_updates WHERE received_at < ?", [now - self.dedupe_seconds]
+            )
+            await db_manager.execute_query(query, params)
+        except Exception as e:
+            logger.warning("Could not prune Telegram update claims: %s", e)
+
+    async def _work(self):
+        while True:
+            update = await self._queue.get()
+            try:
+                await self._handler(update)
+                self.processed += 1
+            except Exception as e:
+                self.errors += 1
+                logger.exception("Telegram update %s failed: %s", update.get('update_id'), e)
+            finally:
+                self._queue.task_done()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "capacity": self.queue_size,
+            "workers": len(self._workers),
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "rejected_full": self.rejected,
+            "processed": self.processed,
+            "errors": self.errors
+        }
+
+
+# Global Telegram update dispatcher instance
+update_dispatcher = UpdateDispatcher()
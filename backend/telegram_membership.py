@@ -0,0 +1,76 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+MEMBER_STATUSES = ("member", "administrator", "creator")
+
+
+class MembershipCache:
+    """TTL cache of community membership keyed by Telegram user_id, with a lowercased-username index.
+
+    Entries are written when a user verifies via /0xday, when getChatMember is consulted, and proactively
+    from the bot's chat_member updates, so /verify-telegram-membership only goes to Telegram for stale entries.
+    Each worker process has its own cache, so callers confirm a hit against telegram_verified_users, the
+    record every worker shares.
+    """
+
+    def __init__(self):
+        self.ttl = float(os.getenv("TELEGRAM_MEMBERSHIP_TTL_SECONDS", "900"))
+        self.max_entries = int(os.getenv("TELEGRAM_MEMBERSHIP_CACHE_SIZE", "50000"))
+        self._entries = OrderedDict()  # user_id -> entry
+        self._by_username = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, user_id, username=None, status=None, verified=None, verified_at=None):
+        """Record fresh membership information; fields left as None keep their cached value"""
+        with self._lock:
+            entry = self._entries.pop(user_id, None) or {"user_id": user_id, "verified": False}
+            if username:
+                old = entry.get("username")
+                if old and old.lower() != username.lower():
+                    self._by_username.pop(old.lower(), None)
+                entry["username"] = username
+                self._by_username[username.lower()] = user_id
+            if status is not None:
+                entry["status"] = status
+            if verified is not None:
+                entry["verified"] = verified
+            if verified_at is not None:
+                entry["verified_at"] = verified_at
+            entry["checked_at"] = time.monotonic()
+            self._entries[user_id] = entry
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                if evicted.get("username"):
+                    self._by_username.pop(evicted["username"].lower(), None)
+
+    def lookup(self, username):
+        """Return (entry, fresh) for a username; entry is None when unknown"""
+        with self._lock:
+            user_id = self._by_username.get(username.lower())
+            entry = self._entries.get(user_id) if user_id is not None else None
+            if entry is None:
+                self.misses += 1
+                return None, False
+            fresh = time.monotonic() - entry["checked_at"] < self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return dict(entry), fresh
+
+    def forget(self, user_id):
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+            if entry and entry.get("username"):
+                self._by_username.pop(entry["username"].lower(), None)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl_seconds": self.ttl}
+
+
+# Global membership cache instance
+membership_cache = MembershipCache()
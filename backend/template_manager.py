@@ -2,6 +2,9 @@ import os
 import tempfile
 from typing import Optional, List, Dict, Any
 from database import db_manager
+from logging_config import get_logger
+
+logger = get_logger(__name__)
 
 class TemplateManager:
     """Manages certificate templates stored in database"""
@@ -86,7 +89,7 @@ class TemplateManager:
                 return template
             return None
         except Exception as e:
-            print(f"Error getting template by name: {e}")
+            logger.exception("Error getting template by name: %s", e)
             return None
 
     async def get_template_by_id(self, template_id: int) -> Optional[Dict[str, Any]]:
@@ -113,7 +116,7 @@ class TemplateManager:
                 return template
             return None
         except Exception as e:
-            print(f"Error getting template by ID: {e}")
+            logger.exception("Error getting template by ID: %s", e)
             return None
 
     async def get_all_templates(self) -> List[Dict[str, Any]]:
@@ -141,7 +144,7 @@ class TemplateManager:
                 return templates
             return []
         except Exception as e:
-            print(f"Error getting all templates: {e}")
+            logger.exception("Error getting all templates: %s", e)
             return []
 
     async def get_default_template(self) -> Optional[Dict[str, Any]]:
@@ -168,7 +171,7 @@ class TemplateManager:
                 return template
             return None
         except Exception as e:
-            print(f"Error getting default template: {e}")
+            logger.exception("Error getting default template: %s", e)
             return None
 
     async def create_temp_file(self, template_name: str) -> Optional[str]:
@@ -195,7 +198,7 @@ class TemplateManager:
 
             return temp_file_path
         except Exception as e:
-            print(f"Error creating temp file for template: {e}")
+            logger.exception("Error creating temp file for template: %s", e)
             return None
 
     async def delete_template(self, template_id: int) -> Dict[str, Any]:
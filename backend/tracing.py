@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import queue
+import atexit
+import secrets
+import threading
+import contextvars
+import multiprocessing
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+# Span of the code currently running (file exporter); copied into tasks and to_thread calls by asyncio
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _parse_traceparent(value):
+    """W3C traceparent '00-<trace id>-<span id>-<flags>' -> (trace_id, span_id), or None"""
+    parts = (value or "").split("-")
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+        return parts[1], parts[2]
+    return None
+
+
+class Span:
+    """A span recorded by the JSON-lines file exporter"""
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.status = "OK"
+        self.start_ns = time.time_ns()
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def update_name(self, name):
+        self.name = name
+
+    def record_error(self, error):
+        self.status = "ERROR"
+        self.attributes["error.message"] = str(error)
+
+    def to_dict(self, end_ns):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": end_ns,
+            "duration_ms": round((end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class _OTelSpan:
+    """Adapter giving an OpenTelemetry span the same small interface as Span"""
+
+    def __init__(self, span):
+        self._span = span
+
+    def set_attribute(self, key, value):
+        self._span.set_attribute(key, value)
+
+    def update_name(self, name):
+        self._span.update_name(name)
+
+    def record_error(self, error):
+        from opentelemetry.trace import Status, StatusCode
+        self._span.record_exception(error)
+        self._span.set_status(Status(StatusCode.ERROR, str(error)))
+
+
+class Tracer:
+    """Request tracing across API handlers, database, chain RPC, IPFS and SMTP.
+
+    TRACING_EXPORTER=otlp sends spans to an OpenTelemetry collector (OTEL_EXPORTER_OTLP_ENDPOINT) when the
+    opentelemetry SDK is installed; TRACING_EXPORTER=file (or otlp without the SDK) appends one JSON span per
+    line to TRACE_FILE from a writer thread. Unset, every span() is a no-op. Context follows asyncio tasks
+    and to_thread calls on its own; other thread pools use wrap(), process pools run_in_span(), and
+    background jobs store traceparent() with the job.
+    """
+
+    def __init__(self):
+        self.exporter = os.getenv("TRACING_EXPORTER", "none").lower()
+        self.service_name = os.getenv("TRACING_SERVICE_NAME", "0x-certs-backend")
+        self.trace_file = os.getenv("TRACE_FILE", "traces.jsonl")
+        self.enabled = self.exporter in ("otlp", "file")
+        self._otel = None
+        self._provider = None
+        self._queue = None
+        self._writer = None
+        self._setup_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.exported = 0
+
+    def _setup(self):
+        """Create the exporter on first use (also in each process-pool worker)"""
+        with self._setup_lock:
+            if self._otel is not None or self._queue is not None:
+                return
+            if self.exporter == "otlp":
+                try:
+                    from opentelemetry import trace
+                    from opentelemetry.sdk.resources import Resource
+                    from opentelemetry.sdk.trace import TracerProvider
+                    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+                    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                except ImportError:
+                    logger.warning("opentelemetry SDK not installed - writing spans to TRACE_FILE instead")
+                else:
+                    self._provider = TracerProvider(resource=Resource.create({"service.name": self.service_name}))
+                    self._provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                    trace.set_tracer_provider(self._provider)
+                    self._otel = trace.get_tracer(self.service_name)
+                    return
+            self._queue = queue.SimpleQueue()
+            self._writer = threading.Thread(target=self._write_spans, name="trace-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+
+    @contextmanager
+    def span(self, name, parent=None, **attributes):
+        """Time a block as a child of the current span (or of the `parent` traceparent string)"""
+        if not self.enabled:
+            yield None
+            return
+        if self._otel is None and self._queue is None:
+            self._setup()
+        if self._otel is not None:
+            yield from self._otel_span(name, parent, attributes)
+            return
+
+        current = _current_span.get()
+        remote = _parse_traceparent(parent) if parent else None
+        if remote:
+            trace_id, parent_id = remote
+        elif current is not None:
+            trace_id, parent_id = current.trace_id, current.span_id
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+        span = Span(name, trace_id, parent_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._queue.put(span.to_dict(time.time_ns()))
+
+    @contextmanager
+    def child_span(self, name, **attributes):
+        """Like span(), but only inside an existing trace (database/RPC calls from untraced loops stay silent)"""
+        if not self.enabled or not self._in_trace():
+            yield None
+            return
+        with self.span(name, **attributes) as span:
+            yield span
+
+    def _in_trace(self):
+        if self._otel is not None:
+            from opentelemetry import trace
+            return trace.get_current_span().get_span_context().is_valid
+        return _current_span.get() is not None
+
+    def _otel_span(self, name, parent, attributes):
+        from opentelemetry.propagate import extract
+        context = extract({"traceparent": parent}) if parent else None
+        with self._otel.start_as_current_span(name, context=context, attributes=attributes,
+                                              record_exception=False) as span:
+            wrapped = _OTelSpan(span)
+            try:
+                yield wrapped
+            except BaseException as e:
+                wrapped.record_error(e)
+                raise
+
+    def traceparent(self):
+        """W3C traceparent of the current span, for handing the trace to a job or another process"""
+        if not self.enabled:
+            return None
+        if self._otel is not None:
+            from opentelemetry.propagate import inject
+            carrier = {}
+            inject(carrier)
+            return carrier.get("traceparent")
+        current = _current_span.get()
+        return f"00-{current.trace_id}-{current.span_id}-01" if current is not None else None
+
+    def wrap(self, func):
+        """Bind func to the current context so it runs inside the caller's span on a pool thread (wrap per submit)"""
+        if not self.enabled:
+            return func
+        context = contextvars.copy_context()
+        return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+    def flush(self):
+        """Write out finished spans now (process-pool workers exit without running atexit)"""
+        if self._provider is not None:
+            self._provider.force_flush()
+        elif self._queue is not None:
+            self._drain()
+
+    def _write_spans(self):
+        while True:
+            self._drain(self._queue.get())
+
+    def _drain(self, first=None):
+        records = [first] if first is not None else []
+        while True:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._write(records)
+
+    def _write(self, records):
+        if not records:
+            return
+        try:
+            with self._write_lock, open(self.trace_file, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + "\n")
+                self.exported += len(records)
+        except OSError as e:
+            logger.warning("Could not write trace spans: %s", e)
+
+
+def run_in_span(traceparent, name, func, *args):
+    """Process-pool entry point: run func(*args) in a span joined to the submitting request's trace"""
+    with tracer.span(name, parent=traceparent):
+        result = func(*args)
+    if multiprocessing.parent_process() is not None:
+        tracer.flush()
+    return result
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per HTTP request (joins an incoming traceparent header)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        parent = headers.get(b"traceparent", b"").decode() or None
+        with tracer.span(f"{scope['method']} {scope['path']}", parent=parent,
+                         **{"http.method": scope["method"], "http.target": scope["path"]}) as span:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get("route")
+                if route is not None and getattr(route, "path", None):
+                    # Name by route template so /event/1 and /event/2 group together
+                    span.update_name(f"{scope['method']} {route.path}")
+                    span.set_attribute("http.route", route.path)
+
+
+# Global tracer instance
+tracer = Tracer()
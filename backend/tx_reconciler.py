@@ -0,0 +1,281 @@
+import os
+import json
+import asyncio
+from web3 import Web3
+from dotenv import load_dotenv
+
+from database import db_manager, convert_sql_for_postgres
+from rpc_batch import batch_call
+from rpc_pool import rpc_pool
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+POA_MINTED_TOPIC = Web3.to_hex(Web3.keccak(text="PoAMinted(address,uint256,uint256)"))
+TRANSFER_TOPIC = Web3.to_hex(Web3.keccak(text="Transfer(address,address,uint256)"))
+
+# Rows per UPDATE ... CASE statement (keeps parameter counts well under SQLite/PostgreSQL limits)
+UPDATE_CHUNK = 400
+
+
+def _topic_address(topic):
+    return "0x" + topic[-40:].lower()
+
+
+def _word(data, index):
+    data = data[2:] if data.startswith("0x") else data
+    return int(data[index * 64:(index + 1) * 64], 16)
+
+
+class TxReconciler:
+    """Turns client-submitted tx hashes into participant updates based on the actual receipts"""
+
+    def __init__(self, w3=None, contract_address=None):
+        self.w3 = w3 or rpc_pool.web3
+        contract_address = contract_address or os.getenv("CONTRACT_ADDRESS")
+        self.contract_address = contract_address.lower() if contract_address else None
+        self.enabled = bool(self.w3 and self.contract_address)
+        self.interval = float(os.getenv("RECONCILE_INTERVAL_SECONDS", "5"))
+        self.timeout = float(os.getenv("RECONCILE_TX_TIMEOUT_SECONDS", "3600"))  # Give up on hashes that never land (approx., counted in polls)
+        self.max_apply_attempts = int(os.getenv("RECONCILE_MAX_APPLY_ATTEMPTS", "10"))  # Errors applying a mined receipt
+        self._lock = asyncio.Lock()
+
+    # ------------------------------------------------------------------
+    # Submission
+    # ------------------------------------------------------------------
+
+    async def prepare_bulk_mint(self, event_id, selection, participant_ids):
+        """Save the ordered participant snapshot a bulk mint was prepared for (selection: requested ids, [] = all)"""
+        sql, params = convert_sql_for_postgres(
+            "INSERT INTO bulk_mint_preparations (event_id, selection, participant_ids) VALUES (?, ?, ?)",
+            [int(event_id), json.dumps(sorted(int(pid) for pid in selection or [])), json.dumps(list(participant_ids))]
+        )
+        await db_manager.execute_query(sql, params)
+
+    async def prepared_bulk_mint(self, event_id, selection):
+        """The latest snapshot prepared for this event and selection, or None"""
+        sql, params = convert_sql_for_postgres(
+            """SELECT participant_ids FROM bulk_mint_preparations WHERE event_id = ? AND selection = ?
+               ORDER BY id DESC LIMIT 1""",
+            [int(event_id), json.dumps(sorted(int(pid) for pid in selection or []))]
+        )
+        rows = await db_manager.execute_query(sql, params, fetch=True)
+        return json.loads(rows[0][0]) if rows else None
+
+    async def submit(self, tx_hash, kind, event_id, participant_ids=None):
+        """Record a submitted transaction; participant_ids is the ordered snapshot a bulk mint was prepared for.
+
+        Resubmitting a hash that ended in 'mismatch' or 'error' (never a confirmed or reverted one) replaces its
+        snapshot and reconciles it again.
+        """
+        if not isinstance(tx_hash, str) or not tx_hash.startswith("0x") or len(tx_hash) != 66:
+            raise ValueError(f"Invalid transaction hash: {tx_hash}")
+        sql, params = convert_sql_for_postgres(
+            """INSERT INTO pending_transactions (tx_hash, kind, event_id, participant_ids, status, attempts, apply_attempts)
+               VALUES (?, ?, ?, ?, 'pending', 0, 0)
+               ON CONFLICT (tx_hash) DO UPDATE SET
+                   participant_ids = excluded.participant_ids, status = 'pending', apply_attempts = 0, error = NULL,
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE pending_transactions.status IN ('mismatch', 'error')""",
+            [tx_hash.lower(), kind, int(event_id), json.dumps(participant_ids or [])]
+        )
+        await db_manager.execute_query(sql, params)
+
+    async def get_status(self, tx_hash):
+        sql, params = convert_sql_for_postgres(
+            "SELECT tx_hash, kind, event_id, status, attempts, error, participants_updated FROM pending_transactions WHERE tx_hash = ?",
+            [tx_hash.lower()]
+        )
+        rows = await db_manager.execute_query(sql, params, fetch=True)
+        if not rows:
+            return None
+        row = rows[0]
+        keys = ["tx_hash", "kind", "event_id", "status", "attempts", "error", "participants_updated"]
+        return dict(row) if hasattr(row, "keys") else dict(zip(keys, row))
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    async def run(self):
+        logger.info("Transaction reconciler started")
+        while True:
+            try:
+                await self.reconcile_pending()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Transaction reconciler error: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def reconcile_pending(self, limit=200):
+        """Fetch receipts for all pending hashes in batched RPC calls and apply each one"""
+        async with self._lock:
+            sql, params = convert_sql_for_postgres(
+                """SELECT tx_hash, kind, event_id, participant_ids, attempts, apply_attempts FROM pending_transactions
+                   WHERE status = 'pending' ORDER BY id LIMIT ?""",
+                [limit]
+            )
+            rows = await db_manager.execute_query(sql, params, fetch=True)
+            if not rows:
+                return 0
+
+            keys = ["tx_hash", "kind", "event_id", "participant_ids", "attempts", "apply_attempts"]
+            pending = [dict(row) if hasattr(row, "keys") else dict(zip(keys, row)) for row in rows]
+            receipts = await asyncio.to_thread(
+                batch_call, self.w3, [("eth_getTransactionReceipt", [p["tx_hash"]]) for p in pending]
+            )
+
+            applied = 0
+            for tx, receipt in zip(pending, receipts):
+                try:
+                    if receipt is None:
+                        await self._mark_missing(tx)
+                    elif int(receipt["status"], 16) != 1:
+                        await self._finish(tx["tx_hash"], "failed", "Transaction reverted", 0)
+                    elif tx["kind"] == "bulk_mint_poa":
+                        applied += await self._apply_bulk_mint(tx, receipt)
+                    elif tx["kind"] == "batch_transfer_poa":
+                        applied += await self._apply_batch_transfer(tx, receipt)
+                    elif tx["kind"] == "direct_mint_poa":
+                        applied += await self._apply_direct_mint(tx, receipt)
+                    else:
+                        await self._finish(tx["tx_hash"], "failed", f"Unknown kind {tx['kind']}", 0)
+                except Exception as e:
+                    logger.warning("Reconciliation of %s failed: %s", tx['tx_hash'], e)
+                    try:
+                        await self._retry_later(tx, str(e))
+                    except Exception as retry_error:
+                        logger.warning("Could not record reconciliation error for %s: %s", tx['tx_hash'], retry_error)
+            return applied
+
+    # ------------------------------------------------------------------
+    # Receipt handling
+    # ------------------------------------------------------------------
+
+    def _contract_logs(self, receipt, topic):
+        logs = [
+            log for log in receipt.get("logs", [])
+            if log.get("address", "").lower() == self.contract_address and log.get("topics") and log["topics"][0].lower() == topic
+        ]
+        return sorted(logs, key=lambda log: int(log["logIndex"], 16))
+
+    async def _apply_bulk_mint(self, tx, receipt):
+        """Assign the minted token IDs (log order) to the participants the mint was prepared for"""
+        event_id = int(tx["event_id"])
+        token_ids = [
+            _word(log["data"], 0) for log in self._contract_logs(receipt, POA_MINTED_TOPIC)
+            if _word(log["data"], 1) == event_id
+        ]
+        participant_ids = json.loads(tx["participant_ids"] or "[]")
+        if len(token_ids) != len(participant_ids):
+            # The tokens exist: resubmitting the hash with the right snapshot reconciles it
+            await self._finish(tx["tx_hash"], "mismatch",
+                               f"Receipt minted {len(token_ids)} PoAs for event {event_id}, expected {len(participant_ids)}", 0)
+            return 0
+
+        statements = []
+        pairs = list(zip(participant_ids, token_ids))
+        for start in range(0, len(pairs), UPDATE_CHUNK):
+            chunk = pairs[start:start + UPDATE_CHUNK]
+            cases = " ".join("WHEN ? THEN CAST(? AS INTEGER)" for _ in chunk)
+            placeholders = ", ".join("?" for _ in chunk)
+            params = [value for pair in chunk for value in pair] + [event_id] + [pid for pid, _ in chunk]
+            statements.append((
+                f"""UPDATE participants
+                    SET poa_status = 'minted', poa_token_id = CASE id {cases} END, poa_minted_at = CURRENT_TIMESTAMP
+                    WHERE event_id = ? AND id IN ({placeholders}) AND (poa_status = 'not_minted' OR poa_status IS NULL)""",
+                params
+            ))
+        await self._finish(tx["tx_hash"], "confirmed", None, len(pairs), statements)
+        logger.info("Reconciled bulk mint %s: %s participants, tokens %s", tx['tx_hash'], len(pairs), token_ids)
+        return len(pairs)
+
+    async def _apply_direct_mint(self, tx, receipt):
+        """Server-side bulkMintPoA straight to participant wallets: match PoAMinted(recipient) to each wallet"""
+        event_id = int(tx["event_id"])
+        minted = {}
+        for log in self._contract_logs(receipt, POA_MINTED_TOPIC):
+            if len(log["topics"]) >= 2 and _word(log["data"], 1) == event_id:
+                minted[_topic_address(log["topics"][1])] = _word(log["data"], 0)
+        participant_ids = json.loads(tx["participant_ids"] or "[]")
+
+        statements = []
+        items = list(minted.items()) if participant_ids else []
+        for start in range(0, len(items), UPDATE_CHUNK):
+            chunk = items[start:start + UPDATE_CHUNK]
+            cases = " ".join("WHEN ? THEN CAST(? AS INTEGER)" for _ in chunk)
+            wallets = ", ".join("?" for _ in chunk)
+            ids = ", ".join("?" for _ in participant_ids)
+            params = [value for item in chunk for value in item] + [event_id] + [wallet for wallet, _ in chunk] + participant_ids
+            statements.append((
+                f"""UPDATE participants
+                    SET poa_status = 'transferred', poa_token_id = CASE LOWER(wallet_address) {cases} END,
+                        poa_minted_at = CURRENT_TIMESTAMP, poa_transferred_at = CURRENT_TIMESTAMP
+                    WHERE event_id = ? AND LOWER(wallet_address) IN ({wallets}) AND id IN ({ids})""",
+                params
+            ))
+        await self._finish(tx["tx_hash"], "confirmed", None, len(items), statements)
+        logger.info("Reconciled direct PoA mint %s: %s of %s participants", tx['tx_hash'], len(items), len(participant_ids))
+        return len(items)
+
+    async def _apply_batch_transfer(self, tx, receipt):
+        """Mark participants transferred by matching Transfer(to, tokenId) logs to the minted token they hold"""
+        event_id = int(tx["event_id"])
+        transfers = [
+            (_topic_address(log["topics"][2]), int(log["topics"][3], 16))
+            for log in self._contract_logs(receipt, TRANSFER_TOPIC) if len(log["topics"]) == 4
+        ]
+
+        statements = []
+        for start in range(0, len(transfers), UPDATE_CHUNK):
+            chunk = transfers[start:start + UPDATE_CHUNK]
+            matches = " OR ".join("(LOWER(wallet_address) = ? AND poa_token_id = CAST(? AS INTEGER))" for _ in chunk)
+            params = [event_id] + [value for transfer in chunk for value in transfer]
+            statements.append((
+                f"""UPDATE participants SET poa_status = 'transferred', poa_transferred_at = CURRENT_TIMESTAMP
+                    WHERE event_id = ? AND poa_status = 'minted' AND ({matches})""",
+                params
+            ))
+        await self._finish(tx["tx_hash"], "confirmed", None, len(transfers), statements)
+        logger.info("Reconciled batch transfer %s: %s transfers", tx['tx_hash'], len(transfers))
+        return len(transfers)
+
+    async def _mark_missing(self, tx):
+        if (tx["attempts"] or 0) * self.interval > self.timeout:
+            await self._finish(tx["tx_hash"], "dropped", "No receipt before timeout", 0)
+            return
+        sql, params = convert_sql_for_postgres(
+            "UPDATE pending_transactions SET attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP WHERE tx_hash = ?",
+            [tx["tx_hash"]]
+        )
+        await db_manager.execute_query(sql, params)
+
+    async def _retry_later(self, tx, error):
+        """Keep the row pending after a transient error (e.g. the database); give up after max_apply_attempts"""
+        if (tx["apply_attempts"] or 0) + 1 >= self.max_apply_attempts:
+            await self._finish(tx["tx_hash"], "error", error, 0)
+            return
+        sql, params = convert_sql_for_postgres(
+            """UPDATE pending_transactions SET apply_attempts = apply_attempts + 1, error = ?, updated_at = CURRENT_TIMESTAMP
+               WHERE tx_hash = ?""",
+            [error, tx["tx_hash"]]
+        )
+        await db_manager.execute_query(sql, params)
+
+    async def _finish(self, tx_hash, status, error, updated, statements=None):
+        """Apply participant updates and close the pending row in one transaction"""
+        statements = list(statements or [])
+        statements.append((
+            """UPDATE pending_transactions
+               SET status = ?, error = ?, participants_updated = ?, attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+               WHERE tx_hash = ?""",
+            [status, error, updated, tx_hash]
+        ))
+        await db_manager.execute_many([convert_sql_for_postgres(sql, params) for sql, params in statements])
+
+
+# Global reconciler instance
+tx_reconciler = TxReconciler()
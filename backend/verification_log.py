@@ -0,0 +1,213 @@
+import os
+import asyncio
+import itertools
+from collections import OrderedDict
+from datetime import datetime
+from dotenv import load_dotenv
+
+from database import db_manager, convert_sql_for_postgres
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+load_dotenv()
+
+LOG_KEYS = ["seq", "user_id", "username", "first_name", "status", "error", "logged_at"]
+
+
+def _rows(rows, keys):
+    return [dict(row) if hasattr(row, "keys") else dict(zip(keys, row)) for row in rows or []]
+
+
+class VerificationLog:
+    """Fixed-capacity log of /0xday verification attempts, indexed by user_id and status.
+
+    The newest VERIFICATION_LOG_CAPACITY attempts stay in memory (older ones are evicted, with their index
+    entries), while per-status totals count every attempt since startup. With VERIFICATION_LOG_PERSIST on,
+    finished attempts are also written to telegram_verification_logs in batches for the full history.
+    """
+
+    def __init__(self):
+        self.capacity = int(os.getenv("VERIFICATION_LOG_CAPACITY", "10000"))
+        self.persist = os.getenv("VERIFICATION_LOG_PERSIST", "false").lower() == "true"
+        self.flush_interval = float(os.getenv("VERIFICATION_LOG_FLUSH_SECONDS", "5"))
+        self.flush_batch = int(os.getenv("VERIFICATION_LOG_FLUSH_BATCH", "200"))
+        self._entries = OrderedDict()  # seq -> entry, oldest first
+        self._by_user = {}
+        self._by_status = {}
+        self._seq = itertools.count(1)
+        self.totals = {}  # status -> attempts since startup that ended in it
+        self.evicted = 0
+        self._unflushed = []
+        self._flusher = None
+        self._wake = None
+        self.flushed = 0
+        self.flush_dropped = 0
+
+    def record(self, user_id, username, first_name, status="processing"):
+        """Log a new attempt and return its entry (pass it to set_status as the attempt progresses)"""
+        entry = {
+            "seq": next(self._seq),
+            "timestamp": datetime.now().isoformat(),
+            "user_id": user_id,
+            "username": username,
+            "first_name": first_name,
+            "status": status
+        }
+        self._entries[entry["seq"]] = entry
+        self._by_user.setdefault(user_id, set()).add(entry["seq"])
+        self._by_status.setdefault(status, set()).add(entry["seq"])
+        while len(self._entries) > self.capacity:
+            _, evicted = self._entries.popitem(last=False)
+            self._unindex(evicted)
+            self.evicted += 1
+        return entry
+
+    def set_status(self, entry, status, error=None):
+        """Move an attempt to a new status; any status other than 'processing' finishes it"""
+        seqs = self._by_status.get(entry["status"])
+        if seqs is not None and entry["seq"] in self._entries:
+            seqs.discard(entry["seq"])
+            if not seqs:
+                del self._by_status[entry["status"]]
+            self._by_status.setdefault(status, set()).add(entry["seq"])
+        entry["status"] = status
+        if error is not None:
+            entry["error"] = error
+        if status != "processing":
+            self.totals[status] = self.totals.get(status, 0) + 1
+            if self.persist:
+                self._queue_flush(entry)
+
+    def query(self, user_id=None, status=None, limit=100, offset=0):
+        """Newest-first page of in-memory attempts, optionally filtered; returns (matching count, page)"""
+        if user_id is None and status is None:
+            matching = len(self._entries)
+            page = itertools.islice(reversed(self._entries.values()), offset, offset + limit)
+            return matching, list(page)
+        seqs = None
+        if user_id is not None:
+            seqs = self._by_user.get(user_id, set())
+        if status is not None:
+            by_status = self._by_status.get(status, set())
+            seqs = by_status if seqs is None else seqs & by_status
+        ordered = sorted(seqs, reverse=True)
+        return len(ordered), [self._entries[seq] for seq in ordered[offset:offset + limit]]
+
+    def aggregate(self):
+        """Attempt counts per status: in the in-memory window and in total since startup"""
+        in_window = {status: len(seqs) for status, seqs in self._by_status.items()}
+        return {
+            "window": in_window,
+            "since_startup": dict(self.totals, processing=in_window.get("processing", 0)),
+            "unique_users": len(self._by_user)
+        }
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "evicted": self.evicted,
+            "persist": self.persist,
+            "unflushed": len(self._unflushed),
+            "flushed": self.flushed,
+            "flush_dropped": self.flush_dropped
+        }
+
+    async def query_table(self, user_id=None, status=None, limit=100, offset=0):
+        """Newest-first page of the persisted history (VERIFICATION_LOG_PERSIST)"""
+        conditions, params = [], []
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql, count_params = convert_sql_for_postgres(f"SELECT COUNT(*) FROM telegram_verification_logs {where}", params)
+        rows = await db_manager.execute_query(sql, count_params, fetch=True)
+        matching = rows[0][0] if rows else 0
+        sql, page_params = convert_sql_for_postgres(
+            f"""SELECT {', '.join(LOG_KEYS)} FROM telegram_verification_logs {where}
+                ORDER BY id DESC LIMIT ? OFFSET ?""",
+            params + [limit, offset]
+        )
+        return matching, _rows(await db_manager.execute_query(sql, page_params, fetch=True), LOG_KEYS)
+
+    async def aggregate_table(self):
+        sql, params = convert_sql_for_postgres(
+            "SELECT status, COUNT(*), COUNT(DISTINCT user_id) FROM telegram_verification_logs GROUP BY status", []
+        )
+        rows = await db_manager.execute_query(sql, params, fetch=True)
+        return {row[0]: {"attempts": row[1], "users": row[2]} for row in rows or []}
+
+    def start(self):
+        if self.persist and (self._flusher is None or self._flusher.done()):
+            self._wake = asyncio.Event()
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out whatever is still buffered"""
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._flusher = None
+        await self.flush()
+
+    def _queue_flush(self, entry):
+        self._unflushed.append(entry)
+        # Never let a database outage grow the buffer past the log's own capacity
+        if len(self._unflushed) > self.capacity:
+            del self._unflushed[0]
+            self.flush_dropped += 1
+        if self._wake and len(self._unflushed) >= self.flush_batch:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        while self._unflushed:
+            batch, self._unflushed = self._unflushed[:self.flush_batch], self._unflushed[self.flush_batch:]
+            if not await self._write(batch):
+                self._unflushed[:0] = batch
+                return
+
+    async def _write(self, batch):
+        statements = [
+            convert_sql_for_postgres(
+                """INSERT INTO telegram_verification_logs (seq, user_id, username, first_name, status, error, logged_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [entry["seq"], entry["user_id"], entry["username"], entry["first_name"],
+                 entry["status"], entry.get("error"), entry["timestamp"]]
+            )
+            for entry in batch
+        ]
+        try:
+            await db_manager.execute_many(statements)
+            self.flushed += len(batch)
+            return True
+        except Exception as e:
+            logger.warning("Verification log flush failed, will retry: %s", e)
+            return False
+
+    def _unindex(self, entry):
+        for index, key in ((self._by_user, entry["user_id"]), (self._by_status, entry["status"])):
+            seqs = index.get(key)
+            if seqs is not None:
+                seqs.discard(entry["seq"])
+                if not seqs:
+                    del index[key]
+
+
+# Global verification log instance
+verification_log = VerificationLog()
@@ -152,7 +152,7 @@ export default function OrganizerDashboard() {
 
             // Start polling for each active task
             Object.entries(activeTasks).forEach(([eventId, task]: [string, any]) => {
-              pollBackgroundTask(parseInt(eventId), task.taskId);
+              watchBackgroundTask(parseInt(eventId), task.taskId);
             });
           }
         }
@@ -1337,8 +1337,8 @@ export default function OrganizerDashboard() {
         }
       }));
 
-      // Start polling for progress
-      pollBackgroundTask(eventId, result.task_id);
+      // Follow progress (server-sent events, polling as fallback)
+      watchBackgroundTask(eventId, result.task_id);
 
       toast({
         title: "Background Certificate Generation Started",
@@ -1356,6 +1356,79 @@ export default function OrganizerDashboard() {
     }
   };
 
+  // Toast and refresh once a background task reaches a final state
+  const finishBackgroundTask = (result: any) => {
+    if (result.status === 'completed') {
+      const successfulEmails = result.successful_emails || 0;
+      const failedEmails = result.failed_emails || 0;
+      const totalEmails = successfulEmails + failedEmails;
+
+      toast({
+        title: "Certificate Generation Completed!",
+        description: `✅ Certificates: ${result.completed}/${result.total_participants}\n📧 Emails sent: ${successfulEmails}/${totalEmails}${failedEmails > 0 ? `\n⚠️ ${failedEmails} email(s) failed` : ''}`,
+        duration: 10000,
+      });
+      // Refresh events to show updated certificate counts
+      queryClient.invalidateQueries({ queryKey: ['events'] });
+      refetchEvents();
+    } else if (result.status === 'failed') {
+      toast({
+        title: "Certificate Generation Failed",
+        description: result.error || 'Unknown error occurred',
+        variant: "destructive",
+        duration: 10000,
+      });
+      // Still refresh to show any partial progress
+      queryClient.invalidateQueries({ queryKey: ['events'] });
+      refetchEvents();
+    }
+  };
+
+  // Follow background task progress pushed by the server (only changed fields are sent)
+  const watchBackgroundTask = (eventId: number, taskId: string) => {
+    if (typeof EventSource === 'undefined') {
+      pollBackgroundTask(eventId, taskId);
+      return;
+    }
+
+    const source = new EventSource(`${API_BASE_URL}/background_task_stream/${eventId}`);
+    let task: any = { taskId };
+    let received = false;
+
+    source.addEventListener('progress', (message) => {
+      const delta = JSON.parse((message as MessageEvent).data);
+      if (delta.taskId !== taskId) return;  // An older job of this event
+      received = true;
+      task = { ...task, ...delta };
+
+      setBackgroundTasks(prev => ({
+        ...prev,
+        [eventId]: {
+          taskId: taskId,
+          status: task.status,
+          total_participants: task.total_participants,
+          completed: task.completed,
+          failed: task.failed,
+          current_step: task.current_step,
+          error: task.error
+        }
+      }));
+
+      if (task.status === 'completed' || task.status === 'failed' || task.status === 'cancelled') {
+        source.close();
+        finishBackgroundTask(task);
+      }
+    });
+
+    source.onerror = () => {
+      // EventSource reconnects by itself once it has streamed; if it never connected, poll instead
+      if (!received) {
+        source.close();
+        pollBackgroundTask(eventId, taskId);
+      }
+    };
+  };
+
   // Poll background task progress
   const pollBackgroundTask = async (eventId: number, taskId: string) => {
     try {
@@ -1379,29 +1452,8 @@ export default function OrganizerDashboard() {
         // Continue polling if task is still running
         if (result.status === 'running' || result.status === 'starting') {
           setTimeout(() => pollBackgroundTask(eventId, taskId), 2000); // Poll every 2 seconds
-        } else if (result.status === 'completed') {
-          const successfulEmails = result.successful_emails || 0;
-          const failedEmails = result.failed_emails || 0;
-          const totalEmails = successfulEmails + failedEmails;
-
-          toast({
-            title: "Certificate Generation Completed!",
-            description: `✅ Certificates: ${result.completed}/${result.total_participants}\n📧 Emails sent: ${successfulEmails}/${totalEmails}${failedEmails > 0 ? `\n⚠️ ${failedEmails} email(s) failed` : ''}`,
-            duration: 10000,
-          });
-          // Refresh events to show updated certificate counts
-          queryClient.invalidateQueries({ queryKey: ['events'] });
-          refetchEvents();
-        } else if (result.status === 'failed') {
-          toast({
-            title: "Certificate Generation Failed",
-            description: result.error || 'Unknown error occurred',
-            variant: "destructive",
-            duration: 10000,
-          });
-          // Still refresh to show any partial progress
-          queryClient.invalidateQueries({ queryKey: ['events'] });
-          refetchEvents();
+        } else {
+          finishBackgroundTask(result);
         }
       }
     } catch (error) {
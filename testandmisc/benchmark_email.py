@@ -0,0 +1,309 @@
+"""
+Email pipeline throughput benchmark against a local SMTP sink.
+
+Starts an SMTP sink in a child process (so its CPU is not counted), points the
+backend at it and drives three paths with synthetic recipients/attachments:
+
+  single  - EmailService.send_certificate_email, one call per recipient
+  bulk    - EmailService.send_bulk_certificate_emails (batched, pipelined)
+  outbox  - email_outbox dispatching main.send_email_sync (throwaway SQLite outbox)
+
+Reports messages/sec, p50/p99 per-message latency and CPU ms per message.
+Latency is the whole send per message for single (connect, STARTTLS, login,
+transaction) and outbox (send_email_sync); bulk shares one connection per
+batch, so its latency is the SMTP transaction only.
+
+Usage (from backend/):
+    python ../testandmisc/benchmark_email.py -n 500 --sink-latency 20
+    python ../testandmisc/benchmark_email.py --save baseline.json
+    python ../testandmisc/benchmark_email.py --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socketserver
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+# ---------------------------------------------------------------------------
+# SMTP sink
+# ---------------------------------------------------------------------------
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Minimal ESMTP server: advertises PIPELINING, accepts everything, discards message bodies"""
+
+    # Pipelined replies are written back-to-back; without this Nagle + delayed ACK adds ~40ms per message
+    disable_nagle_algorithm = True
+
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line)
+
+    def handle(self):
+        self.wfile.write(b"220 benchmark-sink ESMTP\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().upper()
+            if command.startswith(b"EHLO"):
+                self.reply(b"250-benchmark-sink\r\n250-PIPELINING\r\n250-8BITMIME\r\n250 SIZE 52428800\r\n")
+            elif command.startswith(b"DATA"):
+                self.reply(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.delivered.get_lock():
+                    self.server.delivered.value += 1
+                self.reply(b"250 OK queued\r\n")
+            elif command.startswith(b"QUIT"):
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            else:
+                self.reply(b"250 OK\r\n")
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def run_sink(port, latency, delivered, ready):
+    server = SinkServer(("127.0.0.1", port), SinkHandler)
+    server.latency = latency
+    server.delivered = delivered
+    ready.set()
+    server.serve_forever()
+
+
+# ---------------------------------------------------------------------------
+# Measurement helpers
+# ---------------------------------------------------------------------------
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(name, count, wall, cpu, latencies, delivered):
+    return {
+        "scenario": name,
+        "messages": count,
+        "delivered": delivered,
+        "msgs_per_sec": round(count / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+        "cpu_ms_per_msg": round(cpu / count * 1000, 3) if count else 0.0,
+        "wall_s": round(wall, 3)
+    }
+
+
+def synthetic_participants(count, attachment_kb):
+    attachment = os.urandom(attachment_kb * 1024)
+    return [
+        {
+            "name": f"Bench User {i}",
+            "email": f"bench{i}@domain{i % 10}.example",
+            "certificate_path": None,
+            "certificate_bytes": attachment,
+            "token_id": str(i),
+            "poa_token_id": str(i)
+        }
+        for i in range(count)
+    ]
+
+
+def timed_sends(service, latencies):
+    """Wrap EmailService._send_pipelined so every SMTP transaction records its latency (bulk: connection setup is shared)"""
+    original = service._send_pipelined
+
+    def timed(server, to_email, text):
+        started = time.perf_counter()
+        try:
+            return original(server, to_email, text)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    service._send_pipelined = timed
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+def bench_single(email_service_module, participants, delivered):
+    service = email_service_module.EmailService()
+    service.tracking_file = os.path.join(tempfile.mkdtemp(), "sent_emails.log")
+    latencies = []
+
+    start_delivered = delivered.value
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for p in participants:
+        # Time the whole call: each single send opens (and logs in on) its own connection
+        started = time.perf_counter()
+        service.send_certificate_email(
+            to_email=p["email"], participant_name=p["name"], event_name="Benchmark Event",
+            certificate_path=None, contract_address="0x0", token_id=p["token_id"],
+            poa_token_id=p["poa_token_id"], certificate_bytes=p["certificate_bytes"]
+        )
+        latencies.append(time.perf_counter() - started)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return summarize("single", len(participants), wall, cpu, latencies, delivered.value - start_delivered)
+
+
+def bench_bulk(email_service_module, participants, delivered):
+    service = email_service_module.EmailService()
+    service.tracking_file = os.path.join(tempfile.mkdtemp(), "sent_emails.log")
+    latencies = []
+    timed_sends(service, latencies)
+
+    start_delivered = delivered.value
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    service.send_bulk_certificate_emails(participants, "Benchmark Event", "0x0")
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return summarize("bulk", len(participants), wall, cpu, latencies, delivered.value - start_delivered)
+
+
+def bench_outbox(participants, workers, delivered):
+    import main
+    from database import init_database_tables
+    from email_outbox import email_outbox
+
+    latencies = []
+
+    def timed_send(to_email, subject, body):
+        started = time.perf_counter()
+        try:
+            return main.send_email_sync(to_email, subject, body)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    async def run():
+        await init_database_tables()
+        email_outbox.concurrency = workers
+        email_outbox.start(timed_send)
+        for p in participants:
+            await email_outbox.enqueue(p["email"], "Benchmark", f"Hello {p['name']}, this is a benchmark message.")
+        while await email_outbox.depth():
+            await asyncio.sleep(0.05)
+        await email_outbox.stop()
+
+    start_delivered = delivered.value
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    asyncio.run(run())
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return summarize("outbox", len(participants), wall, cpu, latencies, delivered.value - start_delivered)
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def print_table(results, baseline=None):
+    baseline = {r["scenario"]: r for r in (baseline or [])}
+    header = f"{'scenario':<8} {'msgs':>6} {'msg/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'cpu ms/msg':>11} {'delivered':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = (f"{r['scenario']:<8} {r['messages']:>6} {r['msgs_per_sec']:>9} {r['p50_ms']:>9} "
+                f"{r['p99_ms']:>9} {r['cpu_ms_per_msg']:>11} {r['delivered']:>9}")
+        base = baseline.get(r["scenario"])
+        if base and base["msgs_per_sec"]:
+            change = (r["msgs_per_sec"] - base["msgs_per_sec"]) / base["msgs_per_sec"] * 100
+            line += f"   ({change:+.1f}% msg/s vs baseline)"
+        print(line)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the email pipeline against a local SMTP sink")
+    parser.add_argument("-n", "--messages", type=int, default=200, help="messages per scenario")
+    parser.add_argument("--attachment-kb", type=int, default=150, help="synthetic certificate size")
+    parser.add_argument("--sink-latency", type=float, default=0.0, help="ms of delay before each sink reply (simulated RTT)")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--workers", type=int, default=25, help="concurrent sends (EMAIL_OUTBOX_CONCURRENCY) for the outbox scenario")
+    parser.add_argument("--scenarios", default="single,bulk,outbox")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="benchmark with the configured EMAIL_RATE_* budgets")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against a previously saved JSON file")
+    args = parser.parse_args()
+
+    # Point the backend at the sink before any backend module reads its configuration
+    os.environ.update({
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(args.port),
+        "SMTP_USER": "",
+        "SMTP_PASS": "",
+        "SMTP_USE_TLS": "false",
+        "FROM_EMAIL": "bench@localhost",
+        # The outbox scenario queues rows in a scratch database, never the configured one
+        "DATABASE_URL": "sqlite:///" + os.path.join(tempfile.mkdtemp(), "benchmark_outbox.db")
+    })
+    if not args.keep_rate_limits:
+        for key in ("EMAIL_RATE_LIMIT", "EMAIL_RATE_BURST", "EMAIL_DOMAIN_RATE_LIMIT", "EMAIL_DOMAIN_RATE_BURST"):
+            os.environ[key] = "100000"
+        os.environ["EMAIL_PROVIDER_RATE_LIMITS"] = ""
+        os.environ["EMAIL_DOMAIN_RATE_LIMITS"] = ""
+
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+
+    delivered = multiprocessing.Value("i", 0)
+    ready = multiprocessing.Event()
+    sink = multiprocessing.Process(
+        target=run_sink, args=(args.port, args.sink_latency / 1000.0, delivered, ready), daemon=True
+    )
+    sink.start()
+    if not ready.wait(10):
+        sys.exit("SMTP sink did not start")
+
+    import email_service
+
+    participants = synthetic_participants(args.messages, args.attachment_kb)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    results = []
+    try:
+        for scenario in scenarios:
+            print(f"Running {scenario} ({args.messages} messages)...")
+            if scenario == "single":
+                results.append(bench_single(email_service, participants, delivered))
+            elif scenario == "bulk":
+                results.append(bench_bulk(email_service, participants, delivered))
+            elif scenario == "outbox":
+                results.append(bench_outbox(participants, args.workers, delivered))
+            else:
+                print(f"Unknown scenario: {scenario}")
+    finally:
+        sink.terminate()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    print()
+    print_table(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "messages": args.messages,
+                "attachment_kb": args.attachment_kb,
+                "sink_latency_ms": args.sink_latency,
+                "results": results
+            }, f, indent=2)
+        print(f"\nResults saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main_cli()